@@ -0,0 +1,30 @@
+import qibo
+from qibo import Circuit, gates
+import microbench
+from grover_runner import mcz_gates, ORACLES
+
+
+def _circuit(n: int, gate_list=()) -> Circuit:
+    c = Circuit(n)
+    c.add(gate_list)
+    return c
+
+
+def kernels(n: int, threads: int) -> dict:
+    """Cada núcleo ejecuta un circuito con una puerta; el circuito vacío mide la inicialización del estado."""
+    qibo.set_threads(threads)
+    circuits = {
+        microbench.EMPTY_KERNEL: _circuit(n),
+        'H': _circuit(n, [gates.H(0)]),
+        'X': _circuit(n, [gates.X(0)]),
+        # Una variante de la Z multicontrolada por cada implementación del oráculo
+        **{f'MCZ ({oracle})': _circuit(n, mcz_gates(n, oracle)) for oracle in ORACLES},
+    }
+    result = {name: ((lambda c=c: c()), None) for name, c in circuits.items()}
+    measured = _circuit(n, [gates.M(*range(n))])
+    result['measure'] = (lambda: measured(nshots=microbench.MEASURE_SHOTS), None)
+    return result
+
+
+if __name__ == "__main__":
+    microbench.main("qibo", kernels)
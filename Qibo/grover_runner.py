@@ -1,63 +1,221 @@
+import qibo
 from qibo import Circuit, gates
 import math
+import os
+import numpy as np
 import statistics
 import time
 from rich.console import Console
-import threading
 from datetime import datetime
+from sweep_config import DEFAULT_SAMPLING, engine_platform
+import bench_stats
+import circuit_ir
+import memory_traffic
+import shot_sampler
+import tuning
+from timing import SampleTimer
+from ResourceMonitor import SampleProbe, time_to_first_sample
+
+# Implementaciones de la Z multicontrolada usada por el oráculo y el difusor
+ORACLES = {
+    "native": lambda n: [gates.Z(n - 1).controlled_by(*range(n - 1))],
+    "mcx_h": lambda n: [gates.H(n - 1), gates.X(n - 1).controlled_by(*range(n - 1)), gates.H(n - 1)],
+    # Fase pi controlada (U1), aplicada como cambio de fase de |1...1>
+    "phase": lambda n: [gates.U1(n - 1, math.pi).controlled_by(*range(n - 1))],
+    # Matriz densa 2x2 de Z aplicada como puerta Unitary controlada
+    "dense": lambda n: [gates.Unitary(np.diag([1, -1]).astype(complex), n - 1).controlled_by(*range(n - 1))],
+}
+DEFAULT_ORACLE = "native"
+
+def mcz_gates(n: int, oracle: str = DEFAULT_ORACLE) -> list:
+    """Puertas de la Z sobre el último qubit controlada por los demás, con la implementación indicada."""
+    if oracle not in ORACLES:
+        raise ValueError(f"Unknown Qibo oracle '{oracle}' (choose from {', '.join(ORACLES)})")
+    return ORACLES[oracle](n)
+
+# Puertas de un qubit con nombre propio del IR (circuit_ir)
+IR_GATES = {"h": gates.H, "x": gates.X}
+
+def lower(circuit: circuit_ir.Circuit, oracle: str = DEFAULT_ORACLE) -> Circuit:
+    """Traduce un circuito del IR a Qibo."""
+    c = Circuit(circuit.n)
+    for gate in circuit.gates:
+        if gate.name == "mcz":
+            c.add(mcz_gates(circuit.n, oracle))
+        elif gate.name == "unitary":
+            # Qibo toma el primer qubit de la matriz como el más significativo: orden inverso al del IR
+            c.add(gates.Unitary(gate.matrix, *reversed(gate.targets)))
+        elif gate.name == "measure":
+            c.add(gates.M(*gate.targets))
+        else:
+            c.add(IR_GATES[gate.name](gate.targets[0]))
+    return c
+
+# Nombre del simulador (caché de ajuste) y opciones propias del runner: implementación del oráculo,
+# motor de Qibo, hilos, fusión de puertas de Qibo, pase de fusión del IR común y muestreo de los shots
+FRAMEWORK = "qibo"
+RUNNER_OPTIONS = {'oracle', 'engine', 'platform', 'threads', 'fusion', 'max_fused_qubits', 'ir_fusion',
+                  'sampler', 'rng'}
+
+# Motores con número de hilos configurable; numpy y los motores nativos de Qibo solo admiten un hilo
+THREADED_ENGINES = ("qibojit",)
+# Backend por defecto de Qibo (nombre, plataforma), leído antes de que set_engine cambie el backend global
+_default_engine = None
+
+def set_engine(engine: str = None, platform: str = None) -> str:
+    """
+    Selecciona el backend de Qibo (numpy, qibojit, qibojit:numba...) y devuelve su nombre con la plataforma.
+
+    La plataforma solo se aplica a los motores que la admiten (sweep_config.engine_platform). Sin motor se
+    vuelve al backend por defecto: el backend de Qibo es global y una ejecución anterior puede haberlo cambiado.
+    """
+    global _default_engine
+    if _default_engine is None:
+        backend = qibo.get_backend()
+        _default_engine = (backend.name, getattr(backend, 'platform', None))
+    engine, platform = engine_platform(engine, platform)
+    if not engine:
+        engine, platform = _default_engine
+    if platform:
+        qibo.set_backend(engine, platform=platform)
+    else:
+        qibo.set_backend(engine)
+    backend = qibo.get_backend()
+    platform = getattr(backend, 'platform', None)
+    return f"{backend.name} ({platform})" if platform else backend.name
 
 class GroverRunner:
     """Clase para ejecutar el algoritmo de Grover y medir su rendimiento."""
     
-    def __init__(self, n: int, num_iterations: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str):
+    def __init__(self, n: int, num_iterations: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str,
+                 precision: str = "double", backend_options: dict = None, sampling: dict = None, ram_trace=None,
+                 tuned_options: dict = None, state_reuse: bool = False):
+        unsupported = (set(backend_options or {}) | set(tuned_options or {})) - RUNNER_OPTIONS
+        if unsupported:
+            raise ValueError(f"Unsupported Qibo options: {', '.join(sorted(unsupported))}")
         self.n = n
         self.num_iterations = num_iterations
         self.cores = cores
         self.ram_monitor = ram_monitor
         self.cpu_monitor = cpu_monitor
         self.console = console
+        self.probe = SampleProbe()
+        self.readings = []
+        self.ram_trace = ram_trace
+        self.precision = precision
+        self.backend_options = dict(backend_options or {})
+        # Opciones ajustadas para este nodo (tuning.py); las opciones explícitas tienen prioridad
+        self.tuned_options = dict(tuned_options or {})
+        self.options = {**self.tuned_options, **self.backend_options}
+        self.oracle = self.options.get('oracle', DEFAULT_ORACLE)
+        self.fusion = bool(self.options.get('fusion', False))
+        self.ir_fusion = int(self.options.get('ir_fusion', 0))
+        # native: el circuito termina en una puerta M; vector: sin medida, los shots se extraen del estado con shot_sampler
+        self.sampler = self.options.get('sampler', shot_sampler.DEFAULT_SAMPLER)
+        if self.sampler not in shot_sampler.SAMPLERS:
+            raise ValueError(f"Unknown Qibo sampler '{self.sampler}' (choose from {', '.join(shot_sampler.SAMPLERS)})")
+        self.rng = shot_sampler.make_rng(self.options.get('rng', shot_sampler.DEFAULT_BIT_GENERATOR))
+        self.sampling = {**DEFAULT_SAMPLING, **(sampling or {})}
+        self.timer = SampleTimer(self.sampling['min_sample_time'])
+        # El backend se fija antes que la precisión, que se aplica al backend activo
+        self.engine = set_engine(self.options.get('engine'), self.options.get('platform'))
+        # Los hilos se fijan en cada ejecución (por defecto, los núcleos de la ejecución): qibo.set_threads es global
+        # y los hilos ajustados de otra configuración no deben pasar a esta
+        self.threads = int(self.options.get('threads', self.cores or os.cpu_count()))
+        if 'threads' in self.options or qibo.get_backend().name in THREADED_ENGINES:
+            qibo.set_threads(self.threads)
+        qibo.set_precision(precision)
+        self.jit_warmup_s = None
+        # state_reuse (--state-reuse, para todas las ejecuciones del proceso): un único vector de estado, reservado
+        # y tocado aquí, se pasa como initial_state en cada ejecución en lugar de que Qibo reserve uno nuevo por muestra
+        self.state_reuse = state_reuse
+        self.state_buffer = None
+        self.state_alloc_s = self._allocate_state() if self.state_reuse else None
+        # Reinicio del vector antes de cada ejecución, fuera de la región medida (None sin state_reuse)
+        self.state_reset = self._reset_state if self.state_reuse else None
         self.circuit = self._build_circuit()
+        if self.fusion:
+            # Las capas H/X del difusor se agrupan en puertas fusionadas de hasta max_fused_qubits qubits
+            self.circuit = self.circuit.fuse(max_qubits=self.options.get('max_fused_qubits', 2))
         self.ram_csv_file = ram_csv_file
 
     def _build_circuit(self) -> Circuit:
-        """Construye el circuito cuántico de Grover con iteraciones óptimas."""
-        c = Circuit(self.n)
-        optimal_num_iterations = math.floor(math.pi / (4 * math.asin(math.sqrt(1 / 2**self.n))))
-        
-        # Inicialización con puertas Hadamard
-        for qubit in range(self.n):
-            c.add(gates.H(qubit))
-        
-        # Iteraciones de Grover (oráculo + difusor)
-        for _ in range(optimal_num_iterations):
-            # Oráculo
-            c.add(gates.Z(self.n - 1).controlled_by(*range(self.n - 1)))
-            # Difusor
-            for qubit in range(self.n):
-                c.add(gates.H(qubit))
-            for qubit in range(self.n):
-                c.add(gates.X(qubit))
-            c.add(gates.Z(self.n - 1).controlled_by(*range(self.n - 1)))
-            for qubit in range(self.n):
-                c.add(gates.X(qubit))
-            for qubit in range(self.n):
-                c.add(gates.H(qubit))
-        
-        # Medición
-        c.add(gates.M(*range(self.n)))
-        return c
+        """Construye el circuito de Grover desde el IR común, con el pase de fusión ir_fusion."""
+        circuit = circuit_ir.grover_circuit(self.n)
+        if self.sampler == "vector":
+            circuit = circuit_ir.without_measurements(circuit)
+        return lower(circuit_ir.optimize(circuit, self.ir_fusion), self.oracle)
+
+    def gate_list(self) -> list:
+        """Puertas del circuito como (nombre, número de controles), para estimar el tráfico de memoria."""
+        return [(gate.name, len(gate.control_qubits)) for gate in self.circuit.queue]
+
+    def _allocate_state(self) -> float:
+        """Reserva el vector de estado reutilizable y escribe todas sus páginas; devuelve el tiempo (s)."""
+        t1 = time.perf_counter()
+        self.state_buffer = np.empty(2**self.n, dtype=np.complex128 if self.precision == "double" else np.complex64)
+        self._reset_state()
+        t2 = time.perf_counter()
+        return t2 - t1
+
+    def _reset_state(self) -> None:
+        """Devuelve el vector de estado reutilizable a |0...0> sin reservar memoria."""
+        self.state_buffer.fill(0)
+        self.state_buffer[0] = 1
+
+    def _execute(self):
+        """
+        Ejecuta el circuito; con state_reuse, sobre el vector reservado (qibojit lo modifica en el sitio),
+        que debe haberse devuelto antes a |0...0> con state_reset.
+        """
+        if not self.state_reuse:
+            return self.circuit()
+        return self.circuit(initial_state=self.state_buffer)
+
+    def _jit_warmup(self) -> float:
+        """Primera ejecución, separada de las muestras: incluye la compilación JIT de los kernels (qibojit)."""
+        if self.state_reset:
+            self.state_reset()
+        t1 = time.perf_counter()
+        self._execute()
+        t2 = time.perf_counter()
+        return t2 - t1
+
+    def _final_state(self) -> np.ndarray:
+        """Ejecuta el circuito (como _execute) y devuelve el vector de estado final, sin copia con el backend numpy."""
+        return self._execute().state(numpy=True)
+
+    def _sample(self, state: np.ndarray) -> np.ndarray:
+        """Conteos de todos los shots, extraídos del vector de estado con shot_sampler."""
+        return shot_sampler.sample_counts(state, self.num_iterations, self.rng)
 
     def _run_simulation(self, num_executions: int) -> list[float]:
         """Ejecuta la simulación num_executions veces y devuelve los tiempos."""
+        def execute():
+            if self.sampler == "vector":
+                self._sample(self._final_state())
+            else:
+                self._execute()
+
+        # La primera vez se calibran las repeticiones internas de cada muestra
+        if self.timer.inner_repeats is None:
+            self.timer.calibrate(execute, self.state_reset)
         times = []
         for _ in range(num_executions):
-            t1 = time.perf_counter_ns()
-            self.circuit()
-            #self.console.print(f"Resultado del circuito: {result.frequencies()}", style="yellow")
-            t2 = time.perf_counter_ns()
-            times.append(t2 - t1)
+            self.probe.reset()
+            times.append(self.timer.measure(execute, reset=self.state_reset))
+            self.readings.append(self.probe.read())
         return times
 
+    def sample_times(self, count: int) -> list[float]:
+        """Tiempos (ns) de count muestras, medidas como en run() pero sin monitores (tuning.py, cold_start.py)."""
+        return self._run_simulation(count)
+
+    def _mark(self, phase: str) -> None:
+        """Marca una fase en la traza de memoria, si está activa."""
+        if self.ram_trace:
+            self.ram_trace.mark(phase)
+
     def run(self) -> dict:
         """Ejecuta el algoritmo de Grover y devuelve los resultados."""
         self.console.print(f"Comienza la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
@@ -67,41 +225,56 @@ class GroverRunner:
             self.cpu_monitor.start()
         
         # Iniciar monitoreo de RAM si existe
-        # monitor_thread = None
         if self.ram_monitor:
             self.ram_monitor.start()
-            # Hilo para escribir en el archivo CSV (ajusta según tu implementación)
-            # monitor_thread = threading.Thread(target=self.ram_monitor.real_time_memory_usage, 
-            #                                 args=(self.ram_csv_file,))
-            # monitor_thread.daemon = True
-            # monitor_thread.start()
 
+        # Desde el arranque del proceso hasta la primera ejecución medida (importaciones, inicialización...);
+        # None en las ejecuciones siguientes del mismo proceso
+        time_to_first_sample_s = time_to_first_sample()
+        self._mark("jit")
+        self.jit_warmup_s = self._jit_warmup()
+        self._mark("warmup")
         # Iteraciones iniciales
-        n_iterations_in = 10
+        n_iterations_in = self.sampling['min_samples']
         t_for_loop = self._run_simulation(n_iterations_in)
         t_grover = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
-        std_grover = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
         
         #Si t_grover es mayot que 2,4 horas significa que el algoritmo tarda mas de un dia en ejecutar y se detiene de forma segura
-        if t_grover > 8640:
+        if t_grover > self.sampling['time_limit']:
             self.console.print(f"El algoritmo tarda más de un día en ejecutarse. Deteniendo la ejecución a las {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="red")
             exit(0)
 
         # Calcular iteraciones óptimas
-        iterations_number = (math.ceil((2 * 1.96 * std_grover) / (0.05 * t_grover)) ** 2 
+        iterations_number = (bench_stats.required_samples(t_for_loop, self.sampling['z'], self.sampling['rel_error'])
                              if t_grover > 0 else n_iterations_in)
+        if self.sampling['max_samples']:
+            iterations_number = min(iterations_number, self.sampling['max_samples'])
         self.console.print(f"Optimal number of iterations: {iterations_number}", style="blue")
+        self._mark("sampling")
 
         # Más iteraciones si es necesario
         if iterations_number > n_iterations_in:
-            t_for_loop = (self._run_simulation(iterations_number - n_iterations_in) + 
-                          t_for_loop)
+            t_for_loop = t_for_loop + self._run_simulation(iterations_number - n_iterations_in)
         else:
             iterations_number = n_iterations_in
 
         t_grover_final = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
         std_grover_final = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
+        timing_stats = bench_stats.summarize(t_for_loop)
+        traffic = memory_traffic.circuit_traffic(self.gate_list(), self.n, self.precision)
+        achieved_gbs = memory_traffic.achieved_bandwidth(traffic['bytes_total'], timing_stats['t_median'] or t_grover_final)
+        # Coste extra de la primera ejecución (reserva y primer acceso al estado, y JIT con qibojit) sobre la mediana
+        first_touch_s = max(self.jit_warmup_s - (timing_stats['t_median'] or t_grover_final), 0)
 
+        t_exec_s = t_sampling_s = None
+        if self.sampler == "vector":
+            self._mark("split")
+            t_exec_s, t_sampling_s = shot_sampler.split_times(self._final_state, self._sample,
+                                                              self.sampling['min_samples'], self.state_reset)
+            self.console.print(f"Execution: {t_exec_s:.6f} s, sampling {self.num_iterations} shots: {t_sampling_s:.6f} s",
+                               style="blue")
+
+        self._mark("done")
         # Obtener métricas de recursos
         cpu_avg = self.cpu_monitor.average() if self.cpu_monitor else 0
         ram_avg = self.ram_monitor.average() if self.ram_monitor else 0
@@ -113,8 +286,6 @@ class GroverRunner:
             self.cpu_monitor.stop()
         if self.ram_monitor:
             self.ram_monitor.stop()
-            # if monitor_thread and monitor_thread.is_alive():
-            #     monitor_thread.join()
                 
         self.console.print(f"Termina la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
 
@@ -124,9 +295,50 @@ class GroverRunner:
             'iterations_number': iterations_number,
             't_grover': t_grover_final,
             'std_grover': std_grover_final,
+            **timing_stats,
+            'inner_repeats': self.timer.inner_repeats,
+            'timer_overhead_ns': self.timer.overhead_ns,
+            **traffic,
+            'achieved_gbs': achieved_gbs,
             'cpu_avg': cpu_avg,
             'ram_avg': ram_avg,
             'ram_mb': ram_mb,
             'max_ram_peak': max_ram_peak,
-            'cores': self.cores
-        }
\ No newline at end of file
+            'cores': self.cores,
+            'backend': 'qibo',
+            'shots': self.num_iterations,
+            'precision': self.precision,
+            'options': self.backend_options,
+            'tuned_options': self.tuned_options or None,
+            'oracle': self.oracle,
+            'engine': self.engine,
+            'fusion': int(self.fusion),
+            'gate_count': sum(1 for gate in self.circuit.queue if gate.name != 'measure'),
+            'depth': self.circuit.depth,
+            'jit_warmup_s': self.jit_warmup_s,
+            'ir_fusion': self.ir_fusion,
+            'sampler': self.sampler,
+            't_exec_s': t_exec_s,
+            't_sampling_s': t_sampling_s,
+            'state_reuse': int(self.state_reuse),
+            'state_alloc_s': self.state_alloc_s,
+            'first_touch_s': first_touch_s,
+            'time_to_first_sample_s': time_to_first_sample_s,
+            'samples': {
+                't_ns': t_for_loop,
+                'rss_mb': [rss for rss, _ in self.readings],
+                'cpu_s': [cpu for _, cpu in self.readings],
+            }
+        }
+
+def tuning_space(n: int, cores: int) -> list[dict]:
+    """Configuraciones candidatas para tuning.py (la primera es la de defecto): hilos y fusión de puertas."""
+    fusion = [{'fusion': False}] + [{'fusion': True, 'max_fused_qubits': qubits} for qubits in (2, 3, 4)]
+    return [{'threads': threads, **variant} for variant in fusion
+            for threads in sorted(tuning.thread_candidates(cores), key=lambda threads: threads != cores)]
+
+def build_runner(n: int, cores: int, options: dict, shots: int = 1024, precision: str = "double",
+                 console: Console = None) -> GroverRunner:
+    """Runner sin monitores con las opciones dadas, para tuning.py y shot_scaling.py."""
+    return GroverRunner(n, shots, cores, None, None, console or Console(), None, precision=precision,
+                        backend_options=options)
@@ -0,0 +1,150 @@
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import psutil
+from rich.console import Console
+from rich.table import Table
+from sweep_config import parse_int_axis
+from thread_env import thread_env
+from timing import SampleTimer
+
+# Variable que marca el proceso hijo que mide con un número de hilos fijo
+CHILD_ENV = "GATE_BENCH_CHILD"
+
+# Núcleo de referencia (inicialización del estado sin puertas) que se resta al resto
+EMPTY_KERNEL = "empty"
+
+# Shots del núcleo measure, los mismos en todos los simuladores
+MEASURE_SHOTS = 1024
+
+# Margen de memoria libre exigido respecto al tamaño del vector de estado
+MEMORY_MARGIN = 3
+
+
+def time_kernel(call, reset=None, samples: int = 20, min_sample_time: float = 0.01) -> float:
+    """Mediana del tiempo por llamada (ns) de un núcleo, con repeticiones internas calibradas."""
+    timer = SampleTimer(min_sample_time)
+    timer.calibrate(call, reset)
+    return statistics.median(timer.measure(call, reset) for _ in range(samples))
+
+
+def run_kernels(framework: str, kernels, n_values: list[int], threads: int, samples: int,
+                min_sample_time: float, amplitude_bytes: int = 16, extra_bytes=None) -> list[dict]:
+    """
+    Mide todos los núcleos de un simulador para cada n con un número de hilos fijo.
+
+    Parámetros:
+    framework: str - Nombre del simulador.
+    kernels: callable - kernels(n, threads) -> {nombre: (llamada, reinicio o None)}.
+    n_values: list - Números de qubits.
+    threads: int - Hilos del simulador (el proceso ya tiene fijadas las variables OMP).
+    samples: int - Muestras por núcleo.
+    min_sample_time: float - Duración mínima de cada muestra (s).
+    amplitude_bytes: int - Bytes por amplitud, para descartar los n que no caben en memoria.
+    extra_bytes: callable - extra_bytes(n) -> bytes que reservan los núcleos además del estado
+                 (p. ej. la diagonal de la MCZ), o None.
+    """
+    rows = []
+    for n in n_values:
+        needed = MEMORY_MARGIN * amplitude_bytes * 2**n + (extra_bytes(n) if extra_bytes else 0)
+        if needed > psutil.virtual_memory().available:
+            rows.append({'framework': framework, 'n': n, 'threads': threads, 'kernel': None,
+                         'skipped': "not enough memory"})
+            continue
+        times = {name: time_kernel(call, reset, samples, min_sample_time)
+                 for name, (call, reset) in kernels(n, threads).items()}
+        empty = times.get(EMPTY_KERNEL, 0.0)
+        for name, t_ns in times.items():
+            rows.append({'framework': framework, 'n': n, 'threads': threads, 'kernel': name,
+                         't_ns': t_ns, 'net_ns': t_ns if name == EMPTY_KERNEL else max(0.0, t_ns - empty)})
+    return rows
+
+
+def _launch(script: str, threads: int, args) -> tuple:
+    """Relanza el script en un proceso hijo con las variables de hilos fijadas antes de importar el simulador."""
+    env = {**thread_env(threads), CHILD_ENV: "1"}
+    command = [sys.executable, script, "--n", args.n, "--threads", str(threads), "--samples", str(args.samples),
+               "--min-sample-time", str(args.min_sample_time)]
+    process = subprocess.run(command, env=env, capture_output=True, text=True)
+    rows = [json.loads(line) for line in process.stdout.splitlines() if line.startswith("{")]
+    return rows, process
+
+
+def print_gate_costs(console: Console, framework: str, rows: list[dict]) -> None:
+    """Tabla de coste por puerta: una fila por (núcleo, n) y una columna por número de hilos."""
+    threads = sorted({row['threads'] for row in rows})
+    # Sin núcleo vacío (Qulacs aplica las puertas a un estado ya creado) no hay inicialización que restar
+    if any(row['kernel'] == EMPTY_KERNEL for row in rows):
+        detail = "state initialization subtracted"
+    else:
+        detail = "applied to an existing state"
+    table = Table(title=f"Gate costs ({framework}, µs per gate, {detail}; measure: {MEASURE_SHOTS} shots)")
+    table.add_column("Kernel", style="cyan")
+    table.add_column("n", justify="right", style="cyan")
+    for count in threads:
+        table.add_column(f"{count} threads", justify="right")
+    costs = {(row['kernel'], row['n'], row['threads']): row['net_ns'] for row in rows if row.get('kernel')}
+    for kernel, n in sorted({(kernel, n) for kernel, n, _ in costs}, key=lambda key: (key[0] != EMPTY_KERNEL, key)):
+        table.add_row(kernel, str(n), *(f"{costs[(kernel, n, count)] / 1e3:.2f}" if (kernel, n, count) in costs
+                                          else "-" for count in threads))
+    console.print(table)
+
+
+def main(framework: str, kernels, amplitude_bytes: int = 16, extra_bytes=None) -> None:
+    """
+    Punto de entrada común de gate_bench.py en cada simulador.
+
+    Parámetros:
+    framework: str - Nombre del simulador.
+    kernels: callable - kernels(n, threads) -> {nombre: (llamada, reinicio o None)}.
+    amplitude_bytes: int - Bytes por amplitud del vector de estado.
+    extra_bytes: callable - extra_bytes(n) -> bytes que reservan los núcleos además del estado, o None.
+    """
+    parser = argparse.ArgumentParser(description=f"Per-gate microbenchmark for {framework}")
+    parser.add_argument("--n", type=str, default="10,15,20,25,30", help="Qubit counts (e.g. '10,15,20' or '10-14')")
+    parser.add_argument("--threads", type=str, default=f"1,{os.cpu_count()}", help="Thread counts (e.g. '1,4,16')")
+    parser.add_argument("--samples", type=int, default=20, help="Samples per kernel (default: 20)")
+    parser.add_argument("--min-sample-time", type=float, default=0.01, help="Minimum duration of each sample in seconds")
+    parser.add_argument("--out", type=str, default=f"gate_costs_{framework}.csv", help="Output CSV file")
+    args = parser.parse_args()
+    try:
+        n_values = parse_int_axis(args.n, "n")
+        thread_counts = parse_int_axis(args.threads, "threads")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if os.environ.get(CHILD_ENV):
+        # Proceso hijo: un único número de hilos, resultados como JSON por la salida estándar
+        for row in run_kernels(framework, kernels, n_values, thread_counts[0], args.samples,
+                               args.min_sample_time, amplitude_bytes, extra_bytes):
+            print(json.dumps(row), flush=True)
+        return
+
+    console = Console()
+    script = os.path.abspath(sys.argv[0])
+    rows = []
+    for threads in thread_counts:
+        console.print(f"Measuring {framework} gates with {threads} threads...", style="bright_magenta")
+        child_rows, process = _launch(script, threads, args)
+        rows.extend(child_rows)
+        for row in child_rows:
+            if row.get('skipped'):
+                console.print(f"Skipped n={row['n']} with {threads} threads: {row['skipped']}", style="yellow")
+        if process.returncode != 0:
+            console.print(f"Child with {threads} threads failed:\n{process.stderr[-2000:]}", style="bold red")
+
+    rows = [row for row in rows if row.get('kernel')]
+    if not rows:
+        sys.exit(1)
+    print_gate_costs(console, framework, rows)
+    with open(args.out, "w", newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=['framework', 'kernel', 'n', 'threads', 't_ns', 'net_ns'],
+                                extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    console.print(f"Gate costs saved to {args.out}", style="bold green")
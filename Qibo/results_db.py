@@ -0,0 +1,354 @@
+import argparse
+import csv
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from rich.console import Console
+from rich.table import Table
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Base de datos compartida por los cuatro simuladores (se puede cambiar con GROVER_RESULTS_DB)
+DEFAULT_DB = os.environ.get("GROVER_RESULTS_DB", os.path.join(REPO_ROOT, "grover_results.sqlite"))
+
+# Columnas escalares de la tabla results y clave del diccionario de resultados
+RESULT_COLUMNS = [
+    ('backend', 'TEXT', 'backend'),
+    ('n', 'INTEGER', 'n'),
+    ('shots', 'INTEGER', 'shots'),
+    ('cores', 'INTEGER', 'cores'),
+    ('precision', 'TEXT', 'precision'),
+    ('options', 'TEXT', 'options'),
+    ('iterations_number', 'INTEGER', 'iterations_number'),
+    ('t_grover', 'REAL', 't_grover'),
+    ('std_grover', 'REAL', 'std_grover'),
+    ('cpu_avg', 'REAL', 'cpu_avg'),
+    ('ram_avg', 'REAL', 'ram_avg'),
+    ('ram_mb', 'REAL', 'ram_mb'),
+    ('ram_peak', 'REAL', 'max_ram_peak'),
+    ('spec_hash', 'TEXT', 'spec_hash'),
+    ('t_median', 'REAL', 't_median'),
+    ('t_p5', 'REAL', 't_p5'),
+    ('t_p95', 'REAL', 't_p95'),
+    ('t_p99', 'REAL', 't_p99'),
+    ('t_mad', 'REAL', 't_mad'),
+    ('t_ci_low', 'REAL', 't_ci_low'),
+    ('t_ci_high', 'REAL', 't_ci_high'),
+    ('n_outliers', 'INTEGER', 'n_outliers'),
+    ('inner_repeats', 'INTEGER', 'inner_repeats'),
+    ('timer_overhead_ns', 'INTEGER', 'timer_overhead_ns'),
+    ('bytes_per_iteration', 'INTEGER', 'bytes_per_iteration'),
+    ('bytes_total', 'INTEGER', 'bytes_total'),
+    ('achieved_gbs', 'REAL', 'achieved_gbs'),
+    ('stream_gbs', 'REAL', 'stream_gbs'),
+    ('oracle', 'TEXT', 'oracle'),
+    ('mcx_mode', 'TEXT', 'mcx_mode'),
+    ('ancillas', 'INTEGER', 'ancillas'),
+    ('gate_count', 'INTEGER', 'gate_count'),
+    ('depth', 'INTEGER', 'depth'),
+    ('transpile_s', 'REAL', 'transpile_s'),
+    ('engine', 'TEXT', 'engine'),
+    ('fusion', 'INTEGER', 'fusion'),
+    ('jit_warmup_s', 'REAL', 'jit_warmup_s'),
+    ('tuned_options', 'TEXT', 'tuned_options'),
+    ('optimizer', 'TEXT', 'optimizer'),
+    ('gate_count_raw', 'INTEGER', 'gate_count_raw'),
+    ('optimize_s', 'REAL', 'optimize_s'),
+    ('optimizer_speedup', 'REAL', 'optimizer_speedup'),
+    ('ir_fusion', 'INTEGER', 'ir_fusion'),
+    ('sampler', 'TEXT', 'sampler'),
+    ('t_exec_s', 'REAL', 't_exec_s'),
+    ('t_sampling_s', 'REAL', 't_sampling_s'),
+    ('state_reuse', 'INTEGER', 'state_reuse'),
+    ('state_alloc_s', 'REAL', 'state_alloc_s'),
+    ('first_touch_s', 'REAL', 'first_touch_s'),
+    ('time_to_first_sample_s', 'REAL', 'time_to_first_sample_s'),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT,
+    host TEXT,
+    commit_id TEXT,
+    results_dir TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    host TEXT,
+    commit_id TEXT,
+    created TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    result_id INTEGER REFERENCES results(id),
+    idx INTEGER,
+    t_ns INTEGER,
+    rss_mb REAL,
+    cpu_s REAL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_result ON samples(result_id);
+"""
+
+RESULTS_INDEX = ("CREATE INDEX IF NOT EXISTS idx_results_config "
+                 "ON results(backend, n, cores, precision, host, commit_id)")
+
+
+def current_commit() -> str:
+    """Commit del repositorio con el que se ejecuta el benchmark ('unknown' si no hay git)."""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def _db_value(value):
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+class ResultsDB:
+    """Almacén SQLite de resultados, con escritura por lotes en transacciones."""
+
+    def __init__(self, path: str = DEFAULT_DB, batch_size: int = 1):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.host = socket.gethostname()
+        self.commit_id = current_commit()
+        self.run_id = None
+        self._pending = []
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            existing = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+            # Las columnas nuevas se añaden a bases de datos antiguas sin perder datos
+            for column, sql_type, _ in RESULT_COLUMNS:
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE results ADD COLUMN {column} {sql_type}")
+            self.conn.execute(RESULTS_INDEX)
+
+    def start_run(self, results_dir: str) -> int:
+        """Registra una ejecución del benchmark (una carpeta de resultados)."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started, host, commit_id, results_dir) VALUES (?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec="seconds"), self.host, self.commit_id,
+                 os.path.abspath(results_dir)))
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def add_result(self, data: dict) -> None:
+        """Encola una fila de resultados (con sus muestras) y escribe el lote si está lleno."""
+        self._pending.append(data)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Escribe todas las filas pendientes en una única transacción."""
+        if not self._pending:
+            return
+        columns = [column for column, _, _ in RESULT_COLUMNS]
+        insert = (f"INSERT INTO results (run_id, host, commit_id, created, {', '.join(columns)}) "
+                  f"VALUES ({', '.join('?' * (len(columns) + 4))})")
+        with self.conn:
+            for data in self._pending:
+                cursor = self.conn.execute(insert, [
+                    self.run_id, data.get('host', self.host), data.get('commit_id', self.commit_id),
+                    datetime.now().isoformat(timespec="seconds"),
+                    *(_db_value(data.get(key)) for _, _, key in RESULT_COLUMNS)])
+                samples = data.get('samples')
+                if samples:
+                    count = len(samples['t_ns'])
+                    rss = samples.get('rss_mb') or [None] * count
+                    cpu = samples.get('cpu_s') or [None] * count
+                    self.conn.executemany(
+                        "INSERT INTO samples (result_id, idx, t_ns, rss_mb, cpu_s) VALUES (?, ?, ?, ?, ?)",
+                        ((cursor.lastrowid, i, int(t), r, c)
+                         for i, (t, r, c) in enumerate(zip(samples['t_ns'], rss, cpu))))
+        self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+
+def import_results_dir(db: ResultsDB, results_dir: str, host: str = None, commit_id: str = None) -> int:
+    """
+    Importa en la base de datos una carpeta de resultados existente (CSV y muestras), o un árbol de ellas.
+
+    Las filas de cada CSV toman sus muestras de la carpeta samples/ de su propio directorio.
+    """
+    from sample_store import load_tree
+
+    samples_by_dir = {os.path.abspath(sample_set.results_dir): sample_set for sample_set in load_tree(results_dir)}
+    db.start_run(results_dir)
+    imported = 0
+    for dirpath, dirnames, filenames in os.walk(results_dir):
+        dirnames.sort()
+        samples = samples_by_dir.get(os.path.abspath(dirpath))
+        for file_name in sorted(filenames):
+            if not (file_name.startswith("Grover_data_") and file_name.endswith(".csv")):
+                continue
+            backend = file_name[len("Grover_data_"):].split("_")[0]
+            with open(os.path.join(dirpath, file_name), newline='') as csv_file:
+                for row in csv.DictReader(csv_file):
+                    data = {key: row.get(column) or None for column, _, key in RESULT_COLUMNS}
+                    data['backend'] = data['backend'] or backend
+                    data['host'] = host or db.host
+                    data['commit_id'] = commit_id or db.commit_id
+                    if samples is not None and row.get('samples_row'):
+                        columns = samples.samples(int(row['samples_row']))
+                        data['samples'] = {key: values.tolist() for key, values in columns.items()}
+                    db.add_result(data)
+                    imported += 1
+    db.flush()
+    return imported
+
+
+def query_results(paths: list[str], metric: str, filters: dict, agg: str) -> list[tuple]:
+    """
+    Agrega una métrica por configuración en una o varias bases de datos.
+
+    Una configuración es (n, cores, precision, backend, shots, options): las ejecuciones con distintas
+    opciones o shots no se mezclan en la misma media.
+    """
+    if metric not in {column for column, _, _ in RESULT_COLUMNS}:
+        raise ValueError(f"Unknown metric '{metric}'")
+    where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+    # COUNT(metric) cuenta solo las filas con la métrica: son las que pesan en la media combinada
+    sql = (f"SELECT n, cores, precision, backend, shots, options, {agg}({metric}), COUNT({metric}) FROM results "
+           f"WHERE {where} GROUP BY n, cores, precision, backend, shots, options")
+    merged = {}
+    for path in paths:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        for *key, value, count in conn.execute(sql, list(filters.values())):
+            key = tuple(key)
+            if key not in merged or value is None:
+                merged.setdefault(key, (value, count))
+                continue
+            # Combinar la misma configuración procedente de varias bases de datos
+            previous, previous_count = merged[key]
+            if previous is None:
+                merged[key] = (value, count)
+            elif agg == "avg":
+                merged[key] = ((previous * previous_count + value * count) / (previous_count + count),
+                               previous_count + count)
+            else:
+                merged[key] = ((min if agg == "min" else max)(previous, value), previous_count + count)
+        conn.close()
+    return [(*key, value, count) for key, (value, count) in merged.items()]
+
+
+def configuration_label(backend: str, shots, options) -> str:
+    """Nombre de columna de una configuración: el backend, con sus shots y opciones si los tiene."""
+    try:
+        options = json.loads(options) if options else {}
+    except (TypeError, ValueError):
+        options = {"options": options}
+    parts = ([f"shots={shots}"] if shots else []) + [f"{key}={value}" for key, value in sorted(options.items())]
+    return f"{backend} ({', '.join(parts)})" if parts else backend
+
+
+def print_comparison(console: Console, rows: list[tuple], metric: str, reference: str = None) -> None:
+    """
+    Muestra una tabla con una columna por configuración (backend, shots y opciones) y, opcionalmente,
+    el speedup frente a una referencia: una columna por su nombre completo o el backend si solo tiene una.
+    """
+    table_rows = {}
+    backends = {}
+    for n, cores, precision, backend, shots, options, value, _ in rows:
+        label = configuration_label(backend, shots, options)
+        backends[label] = backend
+        table_rows.setdefault((n, cores, precision), {})[label] = value
+    labels = sorted(backends)
+    if reference and reference not in labels:
+        candidates = [label for label in labels if backends[label] == reference]
+        reference = candidates[0] if len(candidates) == 1 else None
+        if len(candidates) > 1:
+            console.print(f"Backend has several configurations; pass one of them as reference: {', '.join(candidates)}",
+                          style="yellow")
+
+    table = Table(title=f"{metric} by configuration")
+    for column in ("n", "cores", "precision"):
+        table.add_column(column, justify="right", style="cyan")
+    for label in labels:
+        table.add_column(label, justify="right")
+        if reference and label != reference:
+            table.add_column(f"{reference}/{label}", justify="right", style="green")
+    for (n, cores, precision), values in sorted(table_rows.items(), key=lambda item: tuple(map(str, item[0]))):
+        cells = [str(n), str(cores), str(precision)]
+        for label in labels:
+            value = values.get(label)
+            cells.append("-" if value is None else f"{value:.6g}")
+            if reference and label != reference:
+                ref = values.get(reference)
+                cells.append(f"{ref / value:.2f}x" if ref and value else "-")
+        table.add_row(*cells)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the Grover benchmark results database")
+    parser.add_argument("--db", action="append", default=None,
+                        help=f"Database file (repeatable, default: {DEFAULT_DB})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compare = subparsers.add_parser("compare", help="Compare a metric across backends")
+    compare.add_argument("--metric", default="t_grover", help="Result column to compare (default: t_grover)")
+    compare.add_argument("--agg", default="avg", choices=["avg", "min", "max"], help="Aggregation across runs")
+    compare.add_argument("--reference", default=None,
+                         help="Column (or backend with a single column) used as reference for speedups")
+    for column in ("backend", "n", "shots", "cores", "precision", "host", "commit_id"):
+        compare.add_argument(f"--{column.replace('_', '-')}", dest=column, default=None)
+
+    importer = subparsers.add_parser("import", help="Import existing results directories")
+    importer.add_argument("results_dirs", nargs="+")
+    importer.add_argument("--host", default=None, help="Host that produced the results (default: this host)")
+    importer.add_argument("--commit", dest="commit_id", default=None, help="Commit that produced the results")
+
+    subparsers.add_parser("runs", help="List the recorded benchmark runs")
+    args = parser.parse_args()
+    paths = args.db or [DEFAULT_DB]
+    console = Console()
+
+    if args.command == "import":
+        db = ResultsDB(paths[0])
+        for results_dir in args.results_dirs:
+            console.print(f"Imported {import_results_dir(db, results_dir, args.host, args.commit_id)} rows from {results_dir}", style="green")
+        db.close()
+    elif args.command == "runs":
+        table = Table(title="Runs")
+        for column in ("id", "started", "host", "commit", "results_dir", "rows"):
+            table.add_column(column)
+        for path in paths:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            for row in conn.execute("SELECT runs.id, started, runs.host, runs.commit_id, results_dir, "
+                                    "COUNT(results.id) FROM runs LEFT JOIN results ON results.run_id = runs.id "
+                                    "GROUP BY runs.id ORDER BY runs.id"):
+                table.add_row(*map(str, row))
+            conn.close()
+        console.print(table)
+    else:
+        filters = {column: getattr(args, column)
+                   for column in ("backend", "n", "shots", "cores", "precision", "host", "commit_id")
+                   if getattr(args, column) is not None}
+        try:
+            rows = query_results(paths, args.metric, filters, args.agg)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print_comparison(console, rows, args.metric, args.reference)
+
+
+if __name__ == "__main__":
+    main()
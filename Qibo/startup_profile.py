@@ -0,0 +1,153 @@
+import argparse
+import csv
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import time
+from rich.console import Console
+from rich.table import Table
+
+# Directorio de los scripts: los módulos se importan como en las entradas del benchmark
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Prefijo de las líneas que escribe el intérprete con -X importtime
+IMPORTTIME_PREFIX = "import time:"
+
+CSV_FIELDS = ['target', 'module', 'package', 'depth', 'self_us', 'cumulative_us']
+
+
+def default_targets() -> list[str]:
+    """Puntos de entrada del benchmark (grover_*_main) y el runner, que importa el simulador."""
+    entry_points = sorted(os.path.splitext(os.path.basename(path))[0]
+                          for path in glob.glob(os.path.join(SCRIPT_DIR, "grover_*_main.py")))
+    return entry_points + ["grover_runner"]
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """
+    Entradas de -X importtime, en el orden en que terminan de importarse.
+
+    Cada entrada tiene el módulo, su paquete raíz, la profundidad en el árbol de importación
+    (0: el propio objetivo) y los tiempos propio y acumulado en microsegundos.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        fields = line[len(IMPORTTIME_PREFIX):].split("|")
+        # La cabecera ("self [us] | cumulative | imported package") no tiene tiempos
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        # El nombre va tras un espacio y dos espacios más por nivel de anidamiento
+        name = fields[2][1:]
+        module = name.lstrip()
+        entries.append({'module': module, 'package': module.split(".")[0], 'depth': (len(name) - len(module)) // 2,
+                        'self_us': int(fields[0]), 'cumulative_us': int(fields[1])})
+    return entries
+
+
+def profile_import(target: str) -> tuple:
+    """
+    Importa target en un intérprete nuevo con -X importtime.
+
+    Devuelve (entradas de parse_importtime, tiempo de pared del proceso en s). Un target vacío
+    solo arranca el intérprete, como referencia.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", f"import {target}" if target else "pass"]
+    t1 = time.perf_counter()
+    completed = subprocess.run(command, cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    t2 = time.perf_counter()
+    if completed.returncode != 0:
+        error = [line for line in completed.stderr.splitlines() if not line.startswith(IMPORTTIME_PREFIX)]
+        raise RuntimeError(f"Importing {target} failed: {error[-1] if error else completed.returncode}")
+    return parse_importtime(completed.stderr), t2 - t1
+
+
+def profile_target(target: str, repeats: int, exclude: set = frozenset()) -> tuple:
+    """
+    Perfil de importación de target: mediana por módulo de repeats procesos nuevos.
+
+    Parámetros:
+    target: str - Módulo importado ("" para el intérprete sin importar nada).
+    repeats: int - Procesos nuevos medidos.
+    exclude: set - Módulos que no se cuentan (los que ya carga el arranque del intérprete).
+
+    Devuelve (entradas con los tiempos medianos, mediana del tiempo de pared del proceso en s).
+    """
+    runs = [profile_import(target) for _ in range(repeats)]
+    times = {}
+    for entries, _ in runs:
+        for entry in entries:
+            times.setdefault(entry['module'], []).append((entry['self_us'], entry['cumulative_us']))
+    entries = []
+    for entry in runs[0][0]:
+        if entry['module'] in exclude:
+            continue
+        samples = times[entry['module']]
+        entries.append({**entry, 'self_us': statistics.median(sample[0] for sample in samples),
+                        'cumulative_us': statistics.median(sample[1] for sample in samples)})
+    return entries, statistics.median(wall for _, wall in runs)
+
+
+def package_totals(entries: list[dict]) -> list[tuple]:
+    """Tiempo propio (µs) y número de módulos por paquete raíz, de mayor a menor tiempo."""
+    totals = {}
+    for entry in entries:
+        total, modules = totals.get(entry['package'], (0, 0))
+        totals[entry['package']] = (total + entry['self_us'], modules + 1)
+    return sorted(((package, total, modules) for package, (total, modules) in totals.items()),
+                  key=lambda item: item[1], reverse=True)
+
+
+def print_profile(console: Console, target: str, entries: list[dict], wall_s: float, interpreter_s: float,
+                  top: int) -> None:
+    total_us = sum(entry['self_us'] for entry in entries)
+    table = Table(title=f"Import time of {target}: {total_us / 1e6:.3f} s in {len(entries)} modules "
+                        f"(process {wall_s:.3f} s, bare interpreter {interpreter_s:.3f} s)")
+    for column in ("Package", "Modules", "Self (ms)", "% of imports"):
+        table.add_column(column, justify="left" if column == "Package" else "right")
+    for package, package_us, modules in package_totals(entries)[:top]:
+        table.add_row(package, str(modules), f"{package_us / 1e3:.1f}", f"{100 * package_us / max(total_us, 1):.1f}")
+    console.print(table)
+
+    table = Table(title=f"Slowest imports of {target} (cumulative)")
+    for column in ("Module", "Depth", "Self (ms)", "Cumulative (ms)"):
+        table.add_column(column, justify="left" if column == "Module" else "right")
+    for entry in sorted(entries, key=lambda entry: entry['cumulative_us'], reverse=True)[:top]:
+        table.add_row(entry['module'], str(entry['depth']), f"{entry['self_us'] / 1e3:.1f}",
+                      f"{entry['cumulative_us'] / 1e3:.1f}")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the import time of the benchmark entry points "
+                                                 "(structured -X importtime, one fresh interpreter per repeat)")
+    parser.add_argument("targets", nargs="*",
+                        help="Modules to import (default: the grover_*_main entry points and grover_runner)")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh interpreters per target (default: 3)")
+    parser.add_argument("--top", type=int, default=15, help="Rows shown per table (default: 15)")
+    parser.add_argument("--out", type=str, default="startup_profile.csv", help="Output CSV file")
+    args = parser.parse_args()
+
+    console = Console()
+    # Los módulos que carga el intérprete al arrancar no son coste de ningún objetivo
+    startup, interpreter_s = profile_target("", args.repeats)
+    startup_modules = {entry['module'] for entry in startup}
+    with open(args.out, "w", newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for target in args.targets or default_targets():
+            try:
+                entries, wall_s = profile_target(target, args.repeats, startup_modules)
+            except RuntimeError as e:
+                console.print(str(e), style="red")
+                continue
+            writer.writerows({'target': target, **entry} for entry in entries)
+            print_profile(console, target, entries, wall_s, interpreter_s, args.top)
+    console.print(f"Import profile saved to {args.out}", style="bold green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import hashlib
+import itertools
+import json
+import os
+
+# Backends conocidos y precisiones que soporta cada simulador
+BACKENDS = ("qiskit", "qibo", "qulacs", "qsimov")
+SUPPORTED_PRECISIONS = {
+    "qiskit": ("single", "double"),
+    "qibo": ("single", "double"),
+    "qulacs": ("double",),
+    "qsimov": ("double",),
+}
+
+# Motores nativos de Qibo, que no tienen plataforma: en sus ejecuciones se descarta la opción platform
+QIBO_NATIVE_ENGINES = ("numpy", "qulacs", "clifford", "hamming_weight")
+
+# Ejes de la matriz de barrido (en el orden en que se recorren)
+AXES = ("cores", "precision", "n", "shots")
+
+# Parámetros del muestreo adaptativo de GroverRunner.run()
+DEFAULT_SAMPLING = {
+    "min_samples": 10,
+    "max_samples": None,
+    "rel_error": 0.05,
+    "z": 1.96,
+    "time_limit": 8640,
+    # Duración mínima de cada muestra (s): las llamadas más cortas se repiten dentro de la muestra
+    "min_sample_time": 0.01,
+}
+
+SPEC_FILE_NAME = "sweep_spec.json"
+
+# Opciones que afectan a todo el proceso (state_reuse cambia el asignador de glibc en Qiskit y no se revierte):
+# solo se aceptan como opción de la línea de comandos, no como eje del barrido
+PROCESS_OPTIONS = ("state_reuse",)
+
+_KNOWN_KEYS = {"name", "backends", "n", "shots", "cores", "precision",
+               "options", "sampling", "include", "exclude"}
+
+
+def parse_int_axis(value, name: str, minimum: int = 1) -> list[int]:
+    """
+    Convierte un eje entero del barrido en una lista explícita de valores.
+
+    Acepta un entero, una cadena ('4', '4-7' o '4,6,8'), una lista de cualquiera
+    de ellos o una tabla {start, stop, step} con stop inclusivo.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid value for '{name}': {value!r}")
+    if isinstance(value, int):
+        values = [value]
+    elif isinstance(value, str):
+        values = []
+        for part in value.replace(" ", "").split(","):
+            if '-' in part:
+                start, end = map(int, part.split('-'))
+                if start >= end:
+                    raise ValueError(f"Invalid range of {name}: '{part}'")
+                values.extend(range(start, end + 1))
+            else:
+                values.append(int(part))
+    elif isinstance(value, dict):
+        start, stop = int(value["start"]), int(value["stop"])
+        step = int(value.get("step", 1))
+        if start > stop or step <= 0:
+            raise ValueError(f"Invalid range of {name}: {value!r}")
+        values = list(range(start, stop + 1, step))
+    elif isinstance(value, (list, tuple)):
+        values = [v for item in value for v in parse_int_axis(item, name, minimum)]
+    else:
+        raise ValueError(f"Invalid value for '{name}': {value!r}")
+
+    for v in values:
+        if v < minimum:
+            raise ValueError(f"Values of '{name}' must be at least {minimum} (got {v})")
+    return values
+
+
+def _as_list(value) -> list:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _normalize_axes(data: dict) -> dict:
+    """Normaliza los ejes presentes en una tabla (spec, include o exclude)."""
+    axes = {}
+    if "n" in data:
+        axes["n"] = parse_int_axis(data["n"], "n", minimum=3)
+    if "shots" in data:
+        axes["shots"] = parse_int_axis(data["shots"], "shots")
+    if "cores" in data:
+        cores = data["cores"]
+        axes["cores"] = [None] if cores is None else parse_int_axis(cores, "cores")
+    if "precision" in data:
+        axes["precision"] = [str(p) for p in _as_list(data["precision"])]
+        for p in axes["precision"]:
+            if p not in ("single", "double"):
+                raise ValueError(f"Unknown precision '{p}'")
+    if "backend" in data:
+        axes["backend"] = _as_list(data["backend"])
+    return axes
+
+
+def _normalize_options(options: dict) -> dict:
+    """Cada opción de backend se convierte en la lista de valores a barrer."""
+    for key in PROCESS_OPTIONS:
+        if key in options:
+            raise ValueError(f"'{key}' applies to the whole process and cannot be swept: "
+                             f"use --{key.replace('_', '-')} on the command line")
+    return {key: _as_list(value) for key, value in sorted(options.items())}
+
+
+def normalize_spec(data: dict) -> dict:
+    """Valida un barrido leído de fichero y lo deja en forma canónica."""
+    unknown = set(data) - _KNOWN_KEYS
+    if unknown:
+        raise ValueError(f"Unknown keys in sweep spec: {', '.join(sorted(unknown))}")
+    if "n" not in data:
+        raise ValueError("Sweep spec must define 'n'")
+
+    backends = [str(b).lower() for b in _as_list(data.get("backends", list(BACKENDS)))]
+    for backend in backends:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'")
+
+    sampling = dict(DEFAULT_SAMPLING)
+    for key, value in data.get("sampling", {}).items():
+        if key not in DEFAULT_SAMPLING:
+            raise ValueError(f"Unknown sampling option '{key}'")
+        sampling[key] = value
+
+    options = {}
+    for backend, backend_options in data.get("options", {}).items():
+        if backend not in BACKENDS:
+            raise ValueError(f"Options given for unknown backend '{backend}'")
+        options[backend] = _normalize_options(backend_options)
+
+    def _rules(entries):
+        rules = []
+        for entry in entries:
+            rule = _normalize_axes(entry)
+            extra = {k: v for k, v in entry.items() if k not in AXES + ("backend", "options")}
+            rule["options"] = _normalize_options({**entry.get("options", {}), **extra})
+            rules.append(rule)
+        return rules
+
+    spec = {
+        "name": str(data.get("name", "sweep")),
+        "backends": backends,
+        "n": [],
+        "shots": [1024],
+        "cores": [None],
+        "precision": ["double"],
+        "options": options,
+        "sampling": sampling,
+        "include": _rules(data.get("include", [])),
+        "exclude": _rules(data.get("exclude", [])),
+    }
+    spec.update(_normalize_axes({k: v for k, v in data.items() if k in AXES}))
+    return spec
+
+
+def load_sweep(path: str) -> dict:
+    """
+    Lee un fichero de barrido TOML, YAML o JSON y lo normaliza.
+
+    Parámetros:
+    path: str - Ruta al fichero de barrido.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "rb") as f:
+        raw = f.read()
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        data = tomllib.loads(raw.decode("utf-8"))
+    elif ext in (".yaml", ".yml"):
+        import yaml
+        data = yaml.safe_load(raw)
+    elif ext == ".json":
+        data = json.loads(raw)
+    else:
+        raise ValueError(f"Unsupported sweep file format: '{ext}'")
+    return normalize_spec(data or {})
+
+
+def spec_from_args(backend: str, n: str, shots=None, cores=None, options: dict = None) -> dict:
+    """Construye el barrido equivalente a los argumentos clásicos de la línea de comandos."""
+    data = {"name": str(n), "backends": [backend], "n": n, "cores": cores}
+    if shots is not None:
+        data["shots"] = shots
+    if options:
+        data["options"] = {backend: options}
+    return normalize_spec(data)
+
+
+def spec_hash(spec: dict) -> str:
+    """Huella SHA-256 del barrido normalizado, para reproducir un conjunto de datos."""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def save_spec(spec: dict, results_dir: str) -> str:
+    """Guarda el barrido normalizado y su huella junto a los resultados."""
+    path = os.path.join(results_dir, SPEC_FILE_NAME)
+    with open(path, "w") as f:
+        json.dump({"hash": spec_hash(spec), "spec": spec}, f, indent=2, sort_keys=True)
+    return path
+
+
+def engine_platform(engine: str = None, platform: str = None) -> tuple:
+    """
+    Motor y plataforma de Qibo de una ejecución.
+
+    'motor:plataforma' fija la plataforma de ese motor; si no, platform se aplica solo a los motores
+    que la admiten (no a los de QIBO_NATIVE_ENGINES).
+    """
+    if engine and ":" in engine:
+        engine, platform = engine.split(":", 1)
+    if engine in QIBO_NATIVE_ENGINES:
+        platform = None
+    return engine, platform
+
+
+def _without_unused_platform(combo: dict) -> dict:
+    """Quita la opción platform de las ejecuciones de Qibo a las que no se aplica (ver engine_platform)."""
+    options = combo["options"]
+    if combo["backend"] != "qibo" or "platform" not in options:
+        return combo
+    engine = options.get("engine")
+    if engine_platform(engine, options["platform"])[1] != options["platform"] or (engine and ":" in engine):
+        options = {key: value for key, value in options.items() if key != "platform"}
+    return {**combo, "options": options}
+
+
+def _matches(rule: dict, combo: dict) -> bool:
+    for key, values in rule.items():
+        if key == "options":
+            if any(combo["options"].get(k) not in v for k, v in values.items()):
+                return False
+        elif combo.get(key) not in values:
+            return False
+    return True
+
+
+def _matrix(axes: dict, options: dict, backend: str, axis_names) -> list[dict]:
+    option_keys = list(options)
+    combos = []
+    for cores, precision in itertools.product(axes["cores"], axes["precision"]):
+        for option_values in itertools.product(*(options[k] for k in option_keys)):
+            for n in axes["n"]:
+                for shots in (axes["shots"] if "shots" in axis_names else [None]):
+                    combos.append({
+                        "backend": backend,
+                        "n": n,
+                        "shots": shots,
+                        "cores": cores,
+                        "precision": precision,
+                        "options": dict(zip(option_keys, option_values)),
+                    })
+    return combos
+
+
+def expand_sweep(spec: dict, backend: str, axes=AXES) -> list[dict]:
+    """
+    Expande el barrido en la lista de configuraciones a ejecutar por un backend.
+
+    Parámetros:
+    spec: dict - Barrido normalizado (ver normalize_spec).
+    backend: str - Backend que va a ejecutar las configuraciones.
+    axes: tuple - Ejes que tienen sentido para el backend (Qulacs no usa 'shots').
+    """
+    if backend not in spec["backends"]:
+        return []
+
+    base_options = spec["options"].get(backend, {})
+    combos = [c for c in _matrix(spec, base_options, backend, axes)
+              if not any(_matches(rule, c) for rule in spec["exclude"])]
+
+    for rule in spec["include"]:
+        if backend not in rule.get("backend", [backend]):
+            continue
+        include_axes = {k: rule.get(k, spec[k]) for k in AXES}
+        combos += _matrix(include_axes, {**base_options, **rule["options"]}, backend, axes)
+
+    supported = SUPPORTED_PRECISIONS[backend]
+    seen = set()
+    runs = []
+    # Una plataforma que no se aplica no distingue ejecuciones: las repetidas se descartan
+    for combo in map(_without_unused_platform, combos):
+        key = json.dumps(combo, sort_keys=True)
+        if combo["precision"] in supported and key not in seen:
+            seen.add(key)
+            runs.append(combo)
+    return runs
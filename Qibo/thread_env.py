@@ -0,0 +1,22 @@
+import os
+import psutil
+
+# Variables que fijan los hilos de OpenMP y de las bibliotecas numéricas. Los simuladores las leen al
+# importarse, así que solo sirven en el entorno de un proceso hijo que aún no ha cargado el simulador
+THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+               "VECLIB_MAXIMUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def thread_env(threads: int) -> dict:
+    """Entorno del proceso actual con las variables de hilos fijadas a threads, para lanzar un proceso hijo."""
+    return {**os.environ, **{var: str(threads) for var in THREAD_VARS}}
+
+
+def pin_cores(cores: int) -> None:
+    """
+    Limita el proceso a sus primeros cores núcleos (todos si cores es 0 o None).
+
+    La afinidad se fija siempre, también con todos los núcleos, para no heredar la de un proceso ya
+    limitado. Los simuladores que no leen OMP_NUM_THREADS (qibojit) toman el número de hilos de la afinidad.
+    """
+    psutil.Process().cpu_affinity(list(range(cores or os.cpu_count())))
@@ -0,0 +1,97 @@
+import math
+import statistics
+import time
+
+# Rondas usadas para estimar el coste del propio temporizador y del bucle interno
+OVERHEAD_ROUNDS = 1000
+
+
+def timer_overhead_ns(rounds: int = OVERHEAD_ROUNDS) -> int:
+    """Coste de dos lecturas consecutivas de perf_counter_ns (mediana de varias rondas)."""
+    deltas = []
+    for _ in range(rounds):
+        t1 = time.perf_counter_ns()
+        t2 = time.perf_counter_ns()
+        deltas.append(t2 - t1)
+    return int(statistics.median(deltas))
+
+
+def _noop():
+    pass
+
+
+class SampleTimer:
+    """
+    Temporizador de muestras con calibración de repeticiones internas.
+
+    Cada muestra repite la llamada inner_repeats veces para que dure al menos
+    min_sample_time, y devuelve el tiempo por llamada descontando el coste del
+    temporizador, del bucle y, si hay función de reinicio, del propio reinicio.
+    first_call_ns guarda la primera llamada de la calibración, la única en frío.
+    """
+
+    def __init__(self, min_sample_time: float = 0.0, max_repeats: int = 1 << 16):
+        self.min_sample_ns = int(min_sample_time * 1e9)
+        self.max_repeats = max(1, max_repeats)
+        self.overhead_ns = timer_overhead_ns()
+        self.loop_overhead_ns = self._loop_overhead_ns()
+        self.reset_ns = 0.0
+        self.inner_repeats = None
+        self.first_call_ns = None
+
+    def _loop_overhead_ns(self) -> float:
+        """Coste por iteración del bucle interno con una llamada vacía."""
+        repeats = OVERHEAD_ROUNDS
+        t1 = time.perf_counter_ns()
+        for _ in range(repeats):
+            _noop()
+        t2 = time.perf_counter_ns()
+        return max(0.0, (t2 - t1 - self.overhead_ns) / repeats)
+
+    def _batch_ns(self, call, reset, repeats: int) -> int:
+        if repeats == 1:
+            # Sin repeticiones el reinicio queda fuera de la región medida, como antes
+            if reset:
+                reset()
+            t1 = time.perf_counter_ns()
+            call()
+            t2 = time.perf_counter_ns()
+            return t2 - t1
+        t1 = time.perf_counter_ns()
+        for _ in range(repeats):
+            if reset:
+                reset()
+            call()
+        t2 = time.perf_counter_ns()
+        return t2 - t1
+
+    def calibrate(self, call, reset=None) -> int:
+        """
+        Elige inner_repeats para que cada muestra dure al menos min_sample_time.
+
+        Parámetros:
+        call: callable - Llamada medida (una ejecución del circuito).
+        reset: callable - Reinicio del estado antes de cada llamada (opcional).
+        """
+        repeats = 1
+        elapsed = self.first_call_ns = self._batch_ns(call, reset, repeats)
+        while elapsed < self.min_sample_ns and repeats < self.max_repeats:
+            # Estimar directamente las repeticiones necesarias, al menos duplicando
+            needed = math.ceil(repeats * self.min_sample_ns / max(elapsed, 1))
+            repeats = min(self.max_repeats, max(2 * repeats, needed))
+            elapsed = self._batch_ns(call, reset, repeats)
+        self.inner_repeats = repeats
+        if reset and repeats > 1:
+            # El reinicio se ejecuta dentro del bucle: se mide aparte para descontarlo
+            self.reset_ns = self._batch_ns(reset, None, repeats) / repeats
+        return repeats
+
+    def measure(self, call, reset=None) -> float:
+        """Tiempo por llamada (ns) de una muestra, con los costes fijos descontados."""
+        if self.inner_repeats is None:
+            self.calibrate(call, reset)
+        repeats = self.inner_repeats
+        elapsed = self._batch_ns(call, reset, repeats) - self.overhead_ns
+        if repeats > 1:
+            elapsed -= repeats * (self.loop_overhead_ns + self.reset_ns)
+        return max(0.0, elapsed / repeats)
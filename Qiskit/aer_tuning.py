@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import qiskit_aer
+from qiskit_aer import AerSimulator
+from rich.console import Console
+from rich.table import Table
+from grover_runner import GroverRunner, run_checked
+from sweep_config import parse_int_axis
+import tuning
+
+# Valores probados para cada opción de Aer, en el orden en que se ajustan.
+# El primer valor de cada lista es el de defecto de Aer (None: opción sin fijar).
+SEARCH_SPACE = {
+    "fusion_enable": [True, False],
+    "fusion_max_qubit": [5, 2, 3, 4],
+    "fusion_threshold": [14, 10, 12, 18],
+    "statevector_parallel_threshold": [14, 10, 12, 16],
+    "blocking_qubits": [None, 12, 16, 20, 24],
+}
+
+# Mejora relativa mínima para aceptar un valor (por debajo se considera ruido)
+MIN_GAIN = 0.02
+
+
+def namespace() -> str:
+    """Espacio de nombres en la caché de ajuste: la versión de Aer (un cambio invalida el ajuste)."""
+    return f"aer-{qiskit_aer.__version__}"
+
+
+def lookup(n: int, cores: int, precision: str = "double", path: str = tuning.DEFAULT_CACHE) -> dict:
+    """Opciones de AerSimulator ajustadas para (n, cores, precision) en este nodo y esta versión de Aer, o {}."""
+    return aer_options(tuning.lookup(namespace(), n, cores, precision, path))
+
+
+def aer_options(options: dict) -> dict:
+    """Traduce una configuración del espacio de búsqueda a opciones de AerSimulator."""
+    options = {key: value for key, value in options.items() if value is not None}
+    if "blocking_qubits" in options:
+        options["blocking_enable"] = True
+    return options
+
+
+class AerTuner:
+    """Búsqueda por coordenadas de las opciones de Aer para un circuito de Grover, con presupuesto de tiempo."""
+
+    def __init__(self, n: int, cores: int, shots: int, precision: str = "double", repeats: int = 3,
+                 console: Console = None):
+        self.n = n
+        self.cores = cores
+        self.shots = shots
+        self.precision = precision
+        self.repeats = repeats
+        self.console = console or Console()
+        # El circuito se construye y transpila una sola vez; las opciones de Aer solo afectan a la ejecución
+        runner = GroverRunner(n, shots, cores, None, None, self.console, None, precision=precision)
+        self.transpiled_qc = runner.transpiled_qc
+        self.trials = []
+
+    def measure(self, options: dict) -> float:
+        """Mediana del tiempo de ejecución (s) con las opciones dadas, tras una ejecución de calentamiento."""
+        simulator = AerSimulator(method='statevector', precision=self.precision,
+                                 max_parallel_threads=self.cores, **aer_options(options))
+        run_checked(simulator, self.transpiled_qc, self.shots)
+        times = []
+        for _ in range(self.repeats):
+            t1 = time.perf_counter_ns()
+            run_checked(simulator, self.transpiled_qc, self.shots)
+            t2 = time.perf_counter_ns()
+            times.append((t2 - t1) / 1e9)
+        t = statistics.median(times)
+        self.trials.append((dict(options), t))
+        return t
+
+    def tune(self, budget: float) -> tuple:
+        """
+        Ajusta las opciones una a una partiendo de los valores de defecto.
+
+        Cada opción toma el valor más rápido manteniendo fijas las demás; la búsqueda
+        se detiene al agotar el presupuesto y devuelve la mejor configuración encontrada.
+
+        Parámetros:
+        budget: float - Tiempo máximo de ajuste en segundos.
+        """
+        deadline = time.perf_counter() + budget
+        best = {}
+        default_t = best_t = self.measure(best)
+        for option, values in SEARCH_SPACE.items():
+            for value in values[1:]:
+                if option == "blocking_qubits" and value >= self.n:
+                    continue
+                if time.perf_counter() > deadline:
+                    return best, best_t, default_t
+                candidate = {**best, option: value}
+                t = self.measure(candidate)
+                if t < best_t * (1 - MIN_GAIN):
+                    best, best_t = candidate, t
+        return best, best_t, default_t
+
+
+def tune_configurations(n_values: list, cores_values: list, shots: int, precision: str, budget: float,
+                        repeats: int, path: str, console: Console) -> list:
+    """
+    Ajusta cada (n, cores) y guarda las opciones ganadoras en la caché.
+
+    Parámetros:
+    n_values: list - Números de qubits.
+    cores_values: list - Números de núcleos.
+    shots: int - Shots de cada ejecución.
+    precision: str - Precisión del simulador.
+    budget: float - Presupuesto de tiempo por configuración (s).
+    repeats: int - Ejecuciones medidas por candidato.
+    path: str - Fichero de la caché.
+    """
+    rows = []
+    for cores in cores_values:
+        for n in n_values:
+            console.print(f"Tuning Aer options for n={n}, {cores} cores...", style="bright_magenta")
+            tuner = AerTuner(n, cores, shots, precision, repeats, console)
+            best, best_t, default_t = tuner.tune(budget)
+            tuning.store(namespace(), n, cores, precision, {"options": best, "t_median": best_t,
+                                                            "t_default": default_t, "trials": len(tuner.trials)}, path)
+            rows.append((n, cores, best, best_t, default_t, len(tuner.trials)))
+    return rows
+
+
+def print_tuning(console: Console, rows: list) -> None:
+    table = Table(title="Tuned Aer options")
+    for column in ("n", "Cores", "Options", "Default (s)", "Tuned (s)", "Speedup", "Trials"):
+        table.add_column(column, justify="left" if column == "Options" else "right")
+    for n, cores, best, best_t, default_t, trials in rows:
+        table.add_row(str(n), str(cores), json.dumps(best, sort_keys=True) if best else "defaults",
+                      f"{default_t:.4f}", f"{best_t:.4f}", f"{default_t / best_t:.2f}x", str(trials))
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune AerSimulator options for Grover circuits and cache the winners")
+    parser.add_argument("n", type=str, help="Qubit counts (e.g. '20', '20-24' or '20,22,24')")
+    parser.add_argument("--cores", type=str, default=str(os.cpu_count()), help="Core counts (e.g. '8,16')")
+    parser.add_argument("--shots", type=int, default=1024, help="Shots per execution (default: 1024)")
+    parser.add_argument("--precision", type=str, default="double", choices=["double", "single"])
+    parser.add_argument("--budget", type=float, default=60.0, help="Tuning time budget per configuration in seconds")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed executions per candidate (default: 3)")
+    parser.add_argument("--cache", type=str, default=tuning.DEFAULT_CACHE, help="Tuning cache file")
+    args = parser.parse_args()
+    try:
+        n_values = parse_int_axis(args.n, "n")
+        cores_values = parse_int_axis(args.cores, "cores")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    console = Console()
+    rows = tune_configurations(n_values, cores_values, args.shots, args.precision, args.budget, args.repeats,
+                               args.cache, console)
+    print_tuning(console, rows)
+    console.print(f"Tuned options saved in {args.cache} for {tuning.cache_key(namespace())}", style="bold green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import cmath
+import math
+import numpy as np
+from memory_traffic import grover_iterations
+
+# Matrices de las puertas de un qubit con nombre propio en el IR
+GATE_MATRICES = {
+    "h": np.array([[1, 1], [1, -1]], dtype=np.complex128) / math.sqrt(2),
+    "x": np.array([[0, 1], [1, 0]], dtype=np.complex128),
+}
+
+# Umbral para tratar como nulo un elemento de una matriz unitaria
+EPSILON = 1e-12
+
+
+class Gate:
+    """
+    Operación del IR: nombre, qubits objetivo, controles y, en las puertas fusionadas, su matriz.
+
+    Las matrices de varios qubits siguen el orden little-endian de Qulacs y Qiskit: targets[0]
+    es el bit menos significativo del índice. parts guarda las puertas originales de una puerta
+    fusionada, para los simuladores que no aceptan matrices arbitrarias.
+    """
+
+    __slots__ = ("name", "targets", "controls", "matrix", "parts")
+
+    def __init__(self, name: str, targets, controls=(), matrix: np.ndarray = None, parts: tuple = ()):
+        self.name = name
+        self.targets = tuple(targets)
+        self.controls = tuple(controls)
+        self.matrix = matrix
+        self.parts = parts
+
+    def is_single_qubit(self) -> bool:
+        return len(self.targets) == 1 and not self.controls and (self.name in GATE_MATRICES or self.name == "unitary")
+
+    def unitary(self) -> np.ndarray:
+        return self.matrix if self.matrix is not None else GATE_MATRICES[self.name]
+
+    def expand(self) -> tuple:
+        """Puertas originales de una puerta fusionada (o la propia puerta)."""
+        return self.parts or (self,)
+
+    def __repr__(self) -> str:
+        controls = f", controls={list(self.controls)}" if self.controls else ""
+        return f"Gate({self.name}, targets={list(self.targets)}{controls})"
+
+
+class Circuit:
+    """Circuito del IR: número de qubits y lista ordenada de puertas."""
+
+    def __init__(self, n: int, gates: list = None):
+        self.n = n
+        self.gates = list(gates or [])
+
+    def add(self, name: str, targets, controls=()) -> None:
+        self.gates.append(Gate(name, targets, controls))
+
+    def counts(self) -> dict:
+        """Número de puertas de cada tipo."""
+        counts = {}
+        for gate in self.gates:
+            counts[gate.name] = counts.get(gate.name, 0) + 1
+        return counts
+
+    def __len__(self) -> int:
+        return len(self.gates)
+
+
+def grover_circuit(n: int, iterations: int = None) -> Circuit:
+    """
+    Circuito de Grover común a los cuatro simuladores: capa de Hadamard, iteraciones de oráculo
+    y difusor (H, X, MCZ, X, H sobre todos los qubits) y medida de todos los qubits.
+
+    La puerta "mcz" es la Z sobre el último qubit controlada por los demás; cada simulador la
+    sustituye por la implementación de oráculo elegida al traducir el circuito.
+
+    Parámetros:
+    n: int - Número de qubits.
+    iterations: int - Iteraciones de Grover (por defecto, las óptimas para n qubits).
+    """
+    circuit = Circuit(n)
+    qubits = range(n)
+    for qubit in qubits:
+        circuit.add("h", [qubit])
+    for _ in range(grover_iterations(n) if iterations is None else iterations):
+        # Oráculo
+        circuit.add("mcz", [n - 1], range(n - 1))
+        # Difusor
+        for name in ("h", "x"):
+            for qubit in qubits:
+                circuit.add(name, [qubit])
+        circuit.add("mcz", [n - 1], range(n - 1))
+        for name in ("x", "h"):
+            for qubit in qubits:
+                circuit.add(name, [qubit])
+    circuit.add("measure", qubits)
+    return circuit
+
+
+def without_measurements(circuit: Circuit) -> Circuit:
+    """Copia del circuito sin medidas, para los runners que muestrean los shots del vector de estado final."""
+    return Circuit(circuit.n, [gate for gate in circuit.gates if gate.name != "measure"])
+
+
+def _fused(gates: list, targets: tuple, matrix: np.ndarray) -> Gate:
+    parts = tuple(part for gate in gates for part in gate.expand())
+    return Gate("unitary", targets, matrix=matrix, parts=parts)
+
+
+def fuse_single_qubit(circuit: Circuit) -> Circuit:
+    """
+    Fusiona las puertas de un qubit consecutivas sobre cada qubit (p. ej. H·X) en una única matriz 2x2.
+
+    Las puertas pendientes de un qubit se emiten justo antes de la primera puerta de varios qubits
+    que lo toca; las de qubits no tocados conmutan con ella y siguen acumulándose.
+    """
+    fused = Circuit(circuit.n)
+    pending = {}
+
+    def flush(qubits) -> None:
+        for qubit in sorted(qubits):
+            gates = pending.pop(qubit, None)
+            if not gates:
+                continue
+            if len(gates) == 1:
+                fused.gates.append(gates[0])
+                continue
+            matrix = gates[0].unitary()
+            for gate in gates[1:]:
+                matrix = gate.unitary() @ matrix
+            fused.gates.append(_fused(gates, (qubit,), matrix))
+
+    for gate in circuit.gates:
+        if gate.is_single_qubit():
+            pending.setdefault(gate.targets[0], []).append(gate)
+            continue
+        flush(set(pending) & (set(gate.targets) | set(gate.controls)))
+        fused.gates.append(gate)
+    flush(list(pending))
+    return fused
+
+
+def fuse_blocks(circuit: Circuit, block_size: int) -> Circuit:
+    """
+    Agrupa las puertas de un qubit consecutivas sobre qubits distintos en bloques densos de
+    hasta block_size qubits (producto tensorial de sus matrices), uno por barrido del estado.
+    """
+    blocked = Circuit(circuit.n)
+    layer = {}
+
+    def flush() -> None:
+        qubits = sorted(layer)
+        for start in range(0, len(qubits), block_size):
+            block = qubits[start:start + block_size]
+            if len(block) == 1:
+                blocked.gates.append(layer[block[0]])
+                continue
+            # targets[0] es el bit menos significativo: su matriz es el factor derecho del producto
+            matrix = layer[block[0]].unitary()
+            for qubit in block[1:]:
+                matrix = np.kron(layer[qubit].unitary(), matrix)
+            blocked.gates.append(_fused([layer[qubit] for qubit in block], tuple(block), matrix))
+        layer.clear()
+
+    for gate in circuit.gates:
+        if gate.is_single_qubit():
+            if gate.targets[0] in layer:
+                flush()
+            layer[gate.targets[0]] = gate
+            continue
+        flush()
+        blocked.gates.append(gate)
+    flush()
+    return blocked
+
+
+def optimize(circuit: Circuit, fusion: int = 0) -> Circuit:
+    """
+    Pase de optimización del IR.
+
+    Parámetros:
+    circuit: Circuit - Circuito del IR.
+    fusion: int - 0: sin cambios; 1: fusiona las puertas de un qubit de cada qubit;
+                  k > 1: además agrupa las de qubits distintos en bloques densos de k qubits.
+    """
+    if fusion < 0:
+        raise ValueError(f"IR fusion must be a non-negative block size, got {fusion}")
+    if fusion >= 1:
+        circuit = fuse_single_qubit(circuit)
+    if fusion >= 2:
+        circuit = fuse_blocks(circuit, fusion)
+    return circuit
+
+
+def zyz_angles(matrix: np.ndarray) -> tuple:
+    """
+    Ángulos (theta, phi, lambda) de la puerta U de un qubit igual a matrix salvo fase global:
+    U = [[cos(t/2), -e^(il) sin(t/2)], [e^(ip) sin(t/2), e^(i(p+l)) cos(t/2)]].
+    """
+    a, b, c, d = matrix[0, 0], matrix[0, 1], matrix[1, 0], matrix[1, 1]
+    theta = 2 * math.atan2(abs(c), abs(a))
+    if abs(c) < EPSILON:
+        return 0.0, 0.0, cmath.phase(d) - cmath.phase(a)
+    if abs(a) < EPSILON:
+        return math.pi, 0.0, cmath.phase(-b) - cmath.phase(c)
+    phase = cmath.phase(a)
+    return theta, cmath.phase(c) - phase, cmath.phase(-b) - phase
@@ -0,0 +1,174 @@
+import time
+# Arranque del script, antes de cualquier otra importación: todo lo importado después cuenta como importación
+SCRIPT_START = time.time()
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+from rich.console import Console
+from rich.table import Table
+import bench_stats
+from sweep_config import parse_int_axis
+from thread_env import pin_cores, thread_env
+
+# Prefijo de la línea con la que el proceso hijo devuelve sus medidas por la salida estándar
+RESULT_PREFIX = "COLD_START "
+
+# Muestras en caliente como máximo mientras se espera al régimen estacionario
+DEFAULT_MAX_SAMPLES = 200
+
+CSV_FIELDS = ['framework', 'n', 'cores', 'trial', 'interpreter_s', 'import_s', 'init_s', 'first_run_s',
+              'cold_total_s', 'warmup_samples', 'warm_samples', 'warm_median_s', 'warm_mad_s', 'converged']
+
+
+def measure_cold_start(n: int, cores: int, options: dict, shots: int, precision: str, spawned_at: float,
+                       window: int = bench_stats.STEADY_WINDOW, rel_tol: float = bench_stats.STEADY_REL_TOL,
+                       max_samples: int = DEFAULT_MAX_SAMPLES) -> dict:
+    """
+    Fases del arranque en frío de un proceso recién creado y su régimen estacionario en caliente.
+
+    Se ejecuta en el proceso hijo: intérprete (desde que el padre lanza el proceso hasta la primera
+    línea del script), importaciones (incluido el simulador), construcción del runner (inicialización
+    del backend y del circuito) y primera ejecución; después se toman muestras hasta que
+    bench_stats.steady_state_start detecta el régimen estacionario o se llega a max_samples.
+
+    Parámetros:
+    n: int - Número de qubits.
+    cores: int - Número de núcleos.
+    options: dict - Opciones del runner.
+    shots: int - Shots de cada ejecución (si el simulador los usa).
+    precision: str - Precisión del simulador.
+    spawned_at: float - Instante (time.time()) en que el padre lanzó el proceso.
+    window, rel_tol - Parámetros de steady_state_start.
+    max_samples: int - Muestras en caliente como máximo.
+    """
+    from grover_runner import FRAMEWORK, build_runner
+    imported_at = time.time()
+    runner = build_runner(n, cores, options, shots, precision, Console(stderr=True))
+    built_at = time.time()
+    # La primera muestra calibra el temporizador: su primera llamada es la ejecución en frío
+    times = runner.sample_times(1)
+    first_run_s = runner.timer.first_call_ns / 1e9
+    start = None
+    while start is None and len(times) < max_samples:
+        times += runner.sample_times(window)
+        start = bench_stats.steady_state_start(times, window, rel_tol)
+    # Sin régimen estacionario se resume la última ventana
+    warm = times[start:] if start is not None else times[-window:]
+    interpreter_s = SCRIPT_START - spawned_at
+    import_s = imported_at - SCRIPT_START
+    init_s = built_at - imported_at
+    return {
+        'framework': FRAMEWORK,
+        'n': n,
+        'cores': cores,
+        'interpreter_s': interpreter_s,
+        'import_s': import_s,
+        'init_s': init_s,
+        'first_run_s': first_run_s,
+        'cold_total_s': interpreter_s + import_s + init_s + first_run_s,
+        'warmup_samples': start if start is not None else len(times),
+        'warm_samples': len(warm),
+        'warm_median_s': statistics.median(warm) / 1e9,
+        'warm_mad_s': bench_stats.mad(warm) / 1e9,
+        'converged': int(start is not None),
+    }
+
+
+def run_trial(n: int, cores: int, options: dict, args) -> dict:
+    """
+    Lanza un proceso nuevo que mide su propio arranque en frío y devuelve sus medidas.
+
+    Las variables de hilos se fijan en el entorno del hijo: el simulador las lee al importarse.
+    """
+    command = [sys.executable, os.path.abspath(__file__), str(n), "--child", "--cores", str(cores),
+               "--options", json.dumps(options), "--shots", str(args.shots), "--precision", args.precision,
+               "--window", str(args.window), "--rel-tol", str(args.rel_tol), "--max-samples", str(args.max_samples)]
+    env = thread_env(cores)
+    spawned_at = time.time()
+    output = subprocess.run(command + ["--spawned-at", repr(spawned_at)], env=env, stdout=subprocess.PIPE, text=True,
+                            check=True).stdout
+    line = next(line for line in reversed(output.splitlines()) if line.startswith(RESULT_PREFIX))
+    return json.loads(line[len(RESULT_PREFIX):])
+
+
+def print_cold_start(console: Console, rows: list) -> None:
+    table = Table(title=f"Cold start vs warm steady state ({rows[0]['framework']}, median of trials)")
+    for column in ("n", "Cores", "Trials", "Interpreter (s)", "Imports (s)", "Init (s)", "First run (s)",
+                   "Cold total (s)", "Warm-up samples", "Warm median (s)", "First / warm"):
+        table.add_column(column, justify="right")
+    for n, cores in sorted({(row['n'], row['cores']) for row in rows}):
+        trials = [row for row in rows if (row['n'], row['cores']) == (n, cores)]
+
+        def median(key):
+            return statistics.median(row[key] for row in trials)
+
+        table.add_row(str(n), str(cores), str(len(trials)), f"{median('interpreter_s'):.3f}",
+                      f"{median('import_s'):.3f}", f"{median('init_s'):.3f}", f"{median('first_run_s'):.6f}",
+                      f"{median('cold_total_s'):.3f}", f"{median('warmup_samples'):g}",
+                      f"{median('warm_median_s'):.6f}", f"{median('first_run_s') / median('warm_median_s'):.2f}x")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start latency (fresh process: interpreter, imports, "
+                                                 "backend init, first run) separately from the warm steady state")
+    parser.add_argument("n", type=str, help="Qubit counts (e.g. '20', '20-24' or '20,22,24')")
+    parser.add_argument("--cores", type=str, default=str(os.cpu_count()), help="Core counts (e.g. '8,16')")
+    parser.add_argument("--trials", type=int, default=5, help="Fresh processes per configuration (default: 5)")
+    parser.add_argument("--options", type=str, default="{}",
+                        help="Runner options as JSON, e.g. '{\"engine\": \"qibojit\"}' (default: none)")
+    parser.add_argument("--shots", type=int, default=1024, help="Shots per execution (default: 1024)")
+    parser.add_argument("--precision", type=str, default="double", choices=["double", "single"])
+    parser.add_argument("--window", type=int, default=bench_stats.STEADY_WINDOW,
+                        help="Samples per window of the steady-state detection (default: 5)")
+    parser.add_argument("--rel-tol", type=float, default=bench_stats.STEADY_REL_TOL,
+                        help="Relative change between consecutive window medians accepted as steady (default: 0.05)")
+    parser.add_argument("--max-samples", type=int, default=DEFAULT_MAX_SAMPLES,
+                        help="Warm samples taken at most while waiting for the steady state (default: 200)")
+    parser.add_argument("--out", type=str, default=None, help="Output CSV file (default: cold_start_<framework>.csv)")
+    parser.add_argument("--child", action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    try:
+        n_values = parse_int_axis(args.n, "n")
+        cores_values = parse_int_axis(args.cores, "cores")
+        options = json.loads(args.options)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.child:
+        pin_cores(cores_values[0])
+        result = measure_cold_start(n_values[0], cores_values[0], options, args.shots, args.precision,
+                                    args.spawned_at, args.window, args.rel_tol, args.max_samples)
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return
+
+    console = Console()
+    rows = []
+    for cores in cores_values:
+        for n in n_values:
+            for trial in range(args.trials):
+                console.print(f"Cold start n={n}, {cores} cores, trial {trial + 1}/{args.trials}...",
+                              style="bright_magenta")
+                try:
+                    rows.append({**run_trial(n, cores, options, args), 'trial': trial})
+                except subprocess.CalledProcessError as e:
+                    console.print(f"Trial failed with exit code {e.returncode}", style="red")
+    if not rows:
+        sys.exit(1)
+    out = args.out or f"cold_start_{rows[0]['framework']}.csv"
+    with open(out, "w", newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print_cold_start(console, rows)
+    console.print(f"Cold start results saved to {out}", style="bold green")
+
+
+if __name__ == "__main__":
+    main()
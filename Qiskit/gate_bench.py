@@ -0,0 +1,39 @@
+from qiskit import QuantumCircuit, transpile
+from qiskit_aer import AerSimulator
+import microbench
+from grover_runner import append_mcz, available_oracles, diagonal_bytes
+
+
+def _circuit(n: int, add_gate=None) -> QuantumCircuit:
+    """Circuito de n qubits con una sola puerta; guarda una amplitud para forzar la simulación."""
+    qc = QuantumCircuit(n)
+    if add_gate:
+        add_gate(qc)
+    qc.save_amplitudes([0])
+    return qc
+
+
+def kernels(n: int, threads: int) -> dict:
+    """Cada núcleo ejecuta un circuito con una puerta; el circuito vacío mide la inicialización del estado."""
+    simulator = AerSimulator(method='statevector', max_parallel_threads=threads)
+    measured = QuantumCircuit(n)
+    measured.measure_all()
+    circuits = {
+        microbench.EMPTY_KERNEL: _circuit(n),
+        'H': _circuit(n, lambda qc: qc.h(0)),
+        'X': _circuit(n, lambda qc: qc.x(0)),
+        # Una variante de la Z multicontrolada por cada implementación del oráculo que cabe con n qubits
+        **{f'MCZ ({oracle})': _circuit(n, lambda qc, oracle=oracle: append_mcz(qc, n, oracle))
+           for oracle in available_oracles(n)},
+        'measure': measured,
+    }
+    result = {}
+    for name, qc in circuits.items():
+        transpiled = transpile(qc, simulator)
+        shots = microbench.MEASURE_SHOTS if name == 'measure' else 1
+        result[name] = ((lambda transpiled=transpiled, shots=shots: simulator.run(transpiled, shots=shots).result()), None)
+    return result
+
+
+if __name__ == "__main__":
+    microbench.main("qiskit", kernels, extra_bytes=diagonal_bytes)
@@ -1,73 +1,309 @@
-from qiskit import QuantumCircuit, transpile
+from qiskit import QuantumCircuit, QuantumRegister, AncillaRegister, ClassicalRegister, transpile
 from qiskit_aer import AerSimulator
-from qiskit.primitives import StatevectorSampler
-from qiskit.circuit.library import MCXGate
+from qiskit.circuit.library import MCXGate, MCPhaseGate, DiagonalGate, ZGate
+import ctypes
 import math
+import numpy as np
+import psutil
 import statistics
 import time
 from rich.console import Console
-import threading
 from datetime import datetime
+from sweep_config import DEFAULT_SAMPLING
+import bench_stats
+import circuit_ir
+import memory_traffic
+import shot_sampler
+from timing import SampleTimer
+from ResourceMonitor import SampleProbe, time_to_first_sample
+
+
+# Síntesis de la MCX: nombre de la función de qiskit.synthesis y ancillas necesarias para k controles.
+# Los circuitos sintetizados ordenan los qubits como controles, objetivo y ancillas.
+# Las funciones se importan al usarlas: las versiones antiguas de Qiskit no las tienen y el modo nativo no las necesita
+MCX_MODES = {
+    # Instrucción mcx nativa de Aer, sin descomponer
+    "native": (None, lambda k: 0),
+    "noaux": ("synth_mcx_noaux_v24", lambda k: 0),
+    "gray_code": ("synth_mcx_gray_code", lambda k: 0),
+    # V-chain con k-2 ancillas limpias (en |0>) o sucias (en cualquier estado)
+    "clean_vchain": ("synth_mcx_n_clean_m15", lambda k: max(0, k - 2)),
+    "dirty_vchain": ("synth_mcx_n_dirty_i15", lambda k: max(0, k - 2)),
+    # Recursión con una ancilla limpia
+    "recursion": ("synth_mcx_1_clean_b95", lambda k: 1),
+}
+DEFAULT_MCX_MODE = "native"
+
+# Nombre del simulador, para la caché de ajuste
+FRAMEWORK = "qiskit"
+
+# Opciones propias del runner, que no se pasan al simulador
+RUNNER_OPTIONS = {'oracle', 'mcx_mode', 'ir_fusion', 'sampler', 'rng'}
+
+# Parámetros de mallopt de glibc (malloc.h)
+M_TRIM_THRESHOLD = -1
+M_MMAP_MAX = -4
+
+
+def retain_freed_memory() -> bool:
+    """
+    Hace que glibc sirva todas las reservas desde el heap y no devuelva al sistema la memoria liberada.
+
+    Aer reserva un vector de estado nuevo en cada run() y no permite pasarle uno propio: sin mmap
+    ni recorte del heap, el bloque liberado por la ejecución anterior se reutiliza con sus páginas
+    ya asignadas y solo la primera ejecución paga los fallos de página. Afecta a todo el proceso.
+    Devuelve False si la libc no es glibc (sin efecto).
+    """
+    try:
+        mallopt = ctypes.CDLL("libc.so.6").mallopt
+    except (OSError, AttributeError):
+        return False
+    # mallopt devuelve 1 si acepta el valor; un umbral de recorte de -1 desactiva el recorte
+    return bool(mallopt(M_MMAP_MAX, 0)) and bool(mallopt(M_TRIM_THRESHOLD, -1))
+
+
+def check_state_memory(num_qubits: int, precision: str = "double") -> None:
+    """Lanza MemoryError si el vector de estado de num_qubits qubits no cabe en la memoria disponible."""
+    needed = memory_traffic.AMPLITUDE_BYTES.get(precision, 16) * 2**num_qubits
+    available = psutil.virtual_memory().available
+    if needed > available:
+        raise MemoryError(f"The state vector of {num_qubits} qubits needs {needed / 2**30:.1f} GiB "
+                          f"but only {available / 2**30:.1f} GiB are available")
+
+
+def run_checked(simulator: AerSimulator, circuit: QuantumCircuit, shots: int):
+    """Ejecuta circuit en Aer y devuelve el resultado; Aer no lanza excepciones, así que se comprueba result.success."""
+    result = simulator.run([circuit], shots=shots).result()
+    if not result.success:
+        raise RuntimeError(f"Aer run failed: {result.status}")
+    return result
+
+
+def mcx_ancillas(mcx_mode: str, controls: int) -> int:
+    """Número de ancillas que necesita la síntesis de una MCX con controls controles."""
+    if mcx_mode not in MCX_MODES:
+        raise ValueError(f"Unknown Qiskit MCX mode '{mcx_mode}' (choose from {', '.join(MCX_MODES)})")
+    return MCX_MODES[mcx_mode][1](controls)
+
+
+def _mcx_synthesis(name: str):
+    """Función de síntesis de la MCX de qiskit.synthesis, importada al usarla."""
+    from qiskit import synthesis
+    if not hasattr(synthesis, name):
+        raise ValueError(f"This Qiskit version has no qiskit.synthesis.{name}; upgrade Qiskit or use mcx_mode 'native'")
+    return getattr(synthesis, name)
+
+
+def _mcx_h(qc: QuantumCircuit, n: int, mcx_mode: str = DEFAULT_MCX_MODE) -> None:
+    """MCX entre dos Hadamard sobre el último qubit; las ancillas, si hacen falta, siguen a los n qubits."""
+    qc.h(n - 1)
+    synth, ancillas = MCX_MODES[mcx_mode]
+    if synth is None:
+        qc.append(MCXGate(num_ctrl_qubits=n - 1), range(n))
+    else:
+        qc.compose(_mcx_synthesis(synth)(n - 1), qubits=list(range(n + ancillas(n - 1))), inplace=True)
+    qc.h(n - 1)
+
+
+# La transpilación y Aer copian cada instrucción con sus parámetros: la diagonal de 2^n elementos
+# se limita a circuitos pequeños
+DIAGONAL_MAX_QUBITS = 16
+
+
+def diagonal_bytes(n: int) -> int:
+    """Bytes de la diagonal de la MCZ sobre n qubits en Aer (complex128), o 0 si el oráculo diagonal no se admite."""
+    return 16 * 2**n if n <= DIAGONAL_MAX_QUBITS else 0
+
+
+def _diagonal_gate(n: int) -> DiagonalGate:
+    """Cambio de fase de |1...1> como puerta diagonal sobre n qubits."""
+    if n > DIAGONAL_MAX_QUBITS:
+        raise ValueError(f"The diagonal oracle stores a 2^n diagonal: at most {DIAGONAL_MAX_QUBITS} qubits (got {n})")
+    diagonal = np.ones(2**n, dtype=np.complex128)
+    diagonal[-1] = -1
+    return DiagonalGate(diagonal)
+
+
+def _diagonal(qc: QuantumCircuit, n: int, mcx_mode: str = None) -> None:
+    """Cambio de fase de |1...1> como puerta diagonal sobre todos los qubits."""
+    qc.append(_diagonal_gate(n), range(n))
+
+
+# Implementaciones de la Z multicontrolada usada por el oráculo y el difusor
+# (solo mcx_h usa el modo de síntesis de la MCX)
+ORACLES = {
+    "mcx_h": _mcx_h,
+    # Fase pi multicontrolada, instrucción nativa de Aer (mcphase)
+    "mcphase": lambda qc, n, mcx_mode=None: qc.append(MCPhaseGate(math.pi, num_ctrl_qubits=n - 1), range(n)),
+    # Z controlada genérica: la descompone el transpilador
+    "controlled_z": lambda qc, n, mcx_mode=None: qc.append(ZGate().control(n - 1), range(n)),
+    "diagonal": _diagonal,
+}
+DEFAULT_ORACLE = "mcx_h"
+
+
+def append_mcz(qc: QuantumCircuit, n: int, oracle: str = DEFAULT_ORACLE, mcx_mode: str = DEFAULT_MCX_MODE) -> None:
+    """Z sobre el último qubit controlada por los demás, con la implementación indicada."""
+    if oracle not in ORACLES:
+        raise ValueError(f"Unknown Qiskit oracle '{oracle}' (choose from {', '.join(ORACLES)})")
+    ORACLES[oracle](qc, n, mcx_mode)
+
+
+def available_oracles(n: int) -> list[str]:
+    """Oráculos que se pueden construir con n qubits (el diagonal, solo hasta DIAGONAL_MAX_QUBITS)."""
+    return [oracle for oracle in ORACLES if oracle != "diagonal" or n <= DIAGONAL_MAX_QUBITS]
+
+
+def lower(circuit: circuit_ir.Circuit, oracle: str = DEFAULT_ORACLE, mcx_mode: str = DEFAULT_MCX_MODE,
+          ancillas: int = 0) -> QuantumCircuit:
+    """Traduce un circuito del IR a Qiskit; las ancillas de la MCX, si hacen falta, siguen a los n qubits."""
+    n = circuit.n
+    if ancillas:
+        qc = QuantumCircuit(QuantumRegister(n, 'q'), AncillaRegister(ancillas, 'anc'), ClassicalRegister(n, 'meas'))
+    else:
+        qc = QuantumCircuit(n)
+    # La diagonal se construye una sola vez y todas las MCZ comparten la misma puerta
+    diagonal = _diagonal_gate(n) if oracle == "diagonal" else None
+    for gate in circuit.gates:
+        if gate.name == "mcz" and diagonal is not None:
+            qc.append(diagonal, range(n))
+        elif gate.name == "mcz":
+            append_mcz(qc, n, oracle, mcx_mode)
+        elif gate.name == "unitary":
+            # UnitaryGate sigue el mismo orden little-endian que el IR
+            qc.unitary(gate.matrix, list(gate.targets))
+        elif gate.name == "measure":
+            # Medición (solo de los qubits de búsqueda si hay ancillas)
+            if ancillas:
+                qc.measure(list(gate.targets), list(gate.targets))
+            else:
+                qc.measure_all()
+        else:
+            getattr(qc, gate.name)(gate.targets[0])
+    return qc
 
 
 class GroverRunner:
     """Clase para ejecutar el algoritmo de Grover y medir su rendimiento."""
     
-    def __init__(self, n: int, num_iterations: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str):
+    def __init__(self, n: int, num_iterations: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str,
+                 precision: str = "double", backend_options: dict = None, sampling: dict = None, ram_trace=None,
+                 tuned_options: dict = None, state_reuse: bool = False):
         self.n = n
         self.num_iterations = num_iterations
         self.cores = cores
         self.ram_monitor = ram_monitor
         self.cpu_monitor = cpu_monitor
         self.console = console
+        self.probe = SampleProbe()
+        self.readings = []
+        self.ram_trace = ram_trace
+        self.precision = precision
+        self.backend_options = dict(backend_options or {})
+        # Opciones ajustadas para este nodo (tuning.py y aer_tuning.py); las opciones explícitas tienen prioridad
+        self.tuned_options = dict(tuned_options or {})
+        self.options = {**self.tuned_options, **self.backend_options}
+        self.oracle = self.options.get('oracle', DEFAULT_ORACLE)
+        # El modo de síntesis de la MCX solo afecta al oráculo mcx_h
+        self.mcx_mode = self.options.get('mcx_mode', DEFAULT_MCX_MODE) if self.oracle == "mcx_h" else None
+        self.ancillas = mcx_ancillas(self.mcx_mode, self.n - 1) if self.mcx_mode else 0
+        # Las ancillas de la V-chain amplían el estado a 2^(n+ancillas) amplitudes: se comprueba antes de construirlo
+        check_state_memory(self.n + self.ancillas, self.precision)
+        self.ir_fusion = int(self.options.get('ir_fusion', 0))
+        # native: Aer mide los shots (shots=); vector: Aer guarda el estado final y los shots se extraen con shot_sampler
+        self.sampler = self.options.get('sampler', shot_sampler.DEFAULT_SAMPLER)
+        if self.sampler not in shot_sampler.SAMPLERS:
+            raise ValueError(f"Unknown Qiskit sampler '{self.sampler}' (choose from {', '.join(shot_sampler.SAMPLERS)})")
+        self.rng = shot_sampler.make_rng(self.options.get('rng', shot_sampler.DEFAULT_BIT_GENERATOR))
+        self.sampling = {**DEFAULT_SAMPLING, **(sampling or {})}
+        self.timer = SampleTimer(self.sampling['min_sample_time'])
+        # state_reuse: el asignador conserva el vector de estado liberado entre ejecuciones de Aer. Afecta a todo
+        # el proceso, así que llega como argumento (--state-reuse) y no como opción del barrido
+        self.state_reuse = state_reuse
+        if self.state_reuse and not retain_freed_memory():
+            self.console.print("state_reuse needs glibc: Aer will allocate a fresh state on every run", style="yellow")
+        self.first_run_s = None
         self.qc = self._build_circuit()
+        self.simulator, self.transpiled_qc, self.transpile_s = self._transpile()
         self.ram_csv_file = ram_csv_file
 
     def _build_circuit(self) -> QuantumCircuit:
-        """Construye el circuito cuántico de Grover con iteraciones óptimas."""
-        qc = QuantumCircuit(self.n)
-        optimal_num_iterations = math.floor(math.pi / (4 * math.asin(math.sqrt(1 / 2**self.n))))
-        
-        # Inicialización
-        for i in range(self.n):
-            qc.h(i)
-        
-        # Iteraciones de Grover (oráculo + difusor)
-        for _ in range(optimal_num_iterations):
-            # Oráculo
-            qc.h(self.n - 1)
-            qc.append(MCXGate(num_ctrl_qubits=self.n - 1), range(self.n))
-            qc.h(self.n - 1)
-            # Difusor
-            for i in range(self.n):
-                qc.h(i)
-                qc.x(i)
-            qc.h(self.n - 1)
-            qc.append(MCXGate(num_ctrl_qubits=self.n - 1), range(self.n))
-            qc.h(self.n - 1)
-            for i in range(self.n):
-                qc.x(i)
-                qc.h(i)
-        
-        # Medición
-        qc.measure_all()
+        """Construye el circuito de Grover desde el IR común, con el pase de fusión ir_fusion."""
+        circuit = circuit_ir.grover_circuit(self.n)
+        if self.sampler == "vector":
+            circuit = circuit_ir.without_measurements(circuit)
+        qc = lower(circuit_ir.optimize(circuit, self.ir_fusion), self.oracle, self.mcx_mode, self.ancillas)
+        if self.sampler == "vector":
+            qc.save_statevector()
         return qc
 
+    def _transpile(self) -> tuple:
+        """Crea el simulador y transpila el circuito una sola vez, midiendo el tiempo de transpilación."""
+        simulator = AerSimulator(method='statevector', precision=self.precision)
+        simulator_options = {key: value for key, value in self.options.items() if key not in RUNNER_OPTIONS}
+        simulator.set_options(max_parallel_threads=self.cores, **simulator_options)
+        t1 = time.perf_counter()
+        transpiled_qc = transpile(self.qc, simulator, optimization_level=3)
+        t2 = time.perf_counter()
+        return simulator, transpiled_qc, t2 - t1
+
+    def circuit_stats(self) -> dict:
+        """Puertas (sin medidas ni barreras) y profundidad del circuito transpilado."""
+        ops = self.transpiled_qc.count_ops()
+        return {
+            'gate_count': sum(count for name, count in ops.items()
+                              if name not in ('measure', 'barrier', 'save_statevector')),
+            'depth': self.transpiled_qc.depth(),
+        }
+
+    def gate_list(self) -> list:
+        """Puertas del circuito como (nombre, número de controles), para estimar el tráfico de memoria."""
+        return [(instruction.operation.name, getattr(instruction.operation, 'num_ctrl_qubits', 0))
+                for instruction in self.transpiled_qc.data]
+
+    def _execute(self) -> None:
+        """Una ejecución medida: con sampler=vector, estado final más muestreo; si no, los shots de Aer."""
+        if self.sampler == "vector":
+            self._sample(self._final_state())
+        else:
+            run_checked(self.simulator, self.transpiled_qc, self.num_iterations)
+
+    def _first_run(self) -> float:
+        """Primera ejecución, separada de las muestras: incluye la reserva y el primer acceso al vector de estado."""
+        t1 = time.perf_counter()
+        self._execute()
+        t2 = time.perf_counter()
+        return t2 - t1
+
+    def _final_state(self):
+        """Ejecuta el circuito (con save_statevector) y devuelve el Statevector final de Aer."""
+        return run_checked(self.simulator, self.transpiled_qc, 1).get_statevector()
+
+    def _sample(self, state) -> np.ndarray:
+        """Conteos de los shots sobre los n qubits de búsqueda (las ancillas se marginalizan), con shot_sampler."""
+        return shot_sampler.sample_counts(state, self.num_iterations, self.rng, num_qubits=self.n)
+
     def _run_simulation(self, num_executions: int) -> list[float]:
         """Ejecuta la simulación num_executions veces y devuelve los tiempos."""
-        simulator = AerSimulator(method='statevector')
-        simulator.set_options(max_parallel_threads=self.cores)
-        transpiled_qc = transpile(self.qc, simulator, optimization_level=3)
-        #print(self.cores)
-        #simulator.set_options(max_parallel_threads=self.cores)
+        # La primera vez se calibran las repeticiones internas de cada muestra
+        if self.timer.inner_repeats is None:
+            self.timer.calibrate(self._execute)
         times = []
         for _ in range(num_executions):
-            t1 = time.perf_counter_ns()
-            simulator.run([transpiled_qc], shots=self.num_iterations).result()
-            t2 = time.perf_counter_ns()
-            times.append(t2 - t1)
+            self.probe.reset()
+            times.append(self.timer.measure(self._execute))
+            self.readings.append(self.probe.read())
         return times
 
+    def sample_times(self, count: int) -> list[float]:
+        """Tiempos (ns) de count muestras, medidas como en run() pero sin monitores (tuning.py, cold_start.py)."""
+        return self._run_simulation(count)
+
+    def _mark(self, phase: str) -> None:
+        """Marca una fase en la traza de memoria, si está activa."""
+        if self.ram_trace:
+            self.ram_trace.mark(phase)
+
     def run(self) -> dict:
         self.console.print(f"Comienza la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
 
@@ -76,39 +312,54 @@ class GroverRunner:
             self.cpu_monitor.start()
         
         # Iniciar monitoreo de RAM si existe(se ha desactivado por defecto)
-        # monitor_thread = None
         if self.ram_monitor:
             self.ram_monitor.start()
-            # Hilo para escribir en el archivo CSV (ajusta según tu implementación)
-            # monitor_thread = threading.Thread(target=self.ram_monitor.real_time_memory_usage, 
-            #                                 args=(self.ram_csv_file,))
-            # monitor_thread.daemon = True
-            # monitor_thread.start()
 
+        # Desde el arranque del proceso hasta la primera ejecución medida (importaciones, inicialización...);
+        # None en las ejecuciones siguientes del mismo proceso
+        time_to_first_sample_s = time_to_first_sample()
+        self._mark("first_run")
+        self.first_run_s = self._first_run()
         # Ejecutar la simulación
-        n_iterations_in = 10
+        self._mark("warmup")
+        n_iterations_in = self.sampling['min_samples']
         t_for_loop = self._run_simulation(n_iterations_in)
         t_grover = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
-        std_grover = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
         
         #Si t_grover es mayor que 2,4 horas significa que el algoritmo tarda mas de un dia en ejecutar y se detiene
-        if t_grover > 8640:
+        if t_grover > self.sampling['time_limit']:
             self.console.print(f"El algoritmo tarda más de un día en ejecutarse. Deteniendo la ejecución a las {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="red")
             exit(0)
 
-        iterations_number = (math.ceil((2 * 1.96 * std_grover) / (0.05 * t_grover)) ** 2 
-                            if t_grover > 0 else n_iterations_in)
+        iterations_number = (bench_stats.required_samples(t_for_loop, self.sampling['z'], self.sampling['rel_error'])
+                             if t_grover > 0 else n_iterations_in)
+        if self.sampling['max_samples']:
+            iterations_number = min(iterations_number, self.sampling['max_samples'])
         self.console.print(f"Optimal number of iterations: {iterations_number}", style="blue")
+        self._mark("sampling")
 
         if iterations_number > n_iterations_in:
-            t_for_loop = (self._run_simulation(iterations_number - n_iterations_in) + 
-                         t_for_loop)
+            t_for_loop = t_for_loop + self._run_simulation(iterations_number - n_iterations_in)
         else:
             iterations_number = n_iterations_in
 
         t_grover_final = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
         std_grover_final = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
+        timing_stats = bench_stats.summarize(t_for_loop)
+        traffic = memory_traffic.circuit_traffic(self.gate_list(), self.n, self.precision, self.n + self.ancillas)
+        achieved_gbs = memory_traffic.achieved_bandwidth(traffic['bytes_total'], timing_stats['t_median'] or t_grover_final)
+        # Coste extra de la primera ejecución (reserva y primer acceso al estado) sobre la mediana
+        first_touch_s = max(self.first_run_s - (timing_stats['t_median'] or t_grover_final), 0)
+
+        t_exec_s = t_sampling_s = None
+        if self.sampler == "vector":
+            self._mark("split")
+            t_exec_s, t_sampling_s = shot_sampler.split_times(self._final_state, self._sample,
+                                                              self.sampling['min_samples'])
+            self.console.print(f"Execution: {t_exec_s:.6f} s, sampling {self.num_iterations} shots: {t_sampling_s:.6f} s",
+                               style="blue")
 
+        self._mark("done")
         # Obtener métricas de recursos
         cpu_avg = self.cpu_monitor.average() if self.cpu_monitor else 0
         ram_avg = self.ram_monitor.average() if self.ram_monitor else 0
@@ -120,8 +371,6 @@ class GroverRunner:
             self.cpu_monitor.stop()
         if self.ram_monitor:
             self.ram_monitor.stop()
-            # if monitor_thread and monitor_thread.is_alive():
-            #     monitor_thread.join()
                 
         self.console.print(f"Termina la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
 
@@ -130,10 +379,53 @@ class GroverRunner:
             'iterations_number': iterations_number,
             't_grover': t_grover_final,
             'std_grover': std_grover_final,
+            **timing_stats,
+            'inner_repeats': self.timer.inner_repeats,
+            'timer_overhead_ns': self.timer.overhead_ns,
+            **traffic,
+            'achieved_gbs': achieved_gbs,
             'cpu_avg': cpu_avg,
             'ram_avg': ram_avg,
             'ram_mb': ram_mb,
             'max_ram_peak': max_ram_peak,
-            'cores': self.cores
+            'cores': self.cores,
+            'backend': 'qiskit',
+            'shots': self.num_iterations,
+            'precision': self.precision,
+            'options': self.backend_options,
+            'tuned_options': self.tuned_options or None,
+            'oracle': self.oracle,
+            'mcx_mode': self.mcx_mode,
+            'ancillas': self.ancillas,
+            **self.circuit_stats(),
+            'transpile_s': self.transpile_s,
+            'ir_fusion': self.ir_fusion,
+            'sampler': self.sampler,
+            't_exec_s': t_exec_s,
+            't_sampling_s': t_sampling_s,
+            'state_reuse': int(self.state_reuse),
+            'first_touch_s': first_touch_s,
+            'time_to_first_sample_s': time_to_first_sample_s,
+            'samples': {
+                't_ns': t_for_loop,
+                'rss_mb': [rss for rss, _ in self.readings],
+                'cpu_s': [cpu for _, cpu in self.readings],
+            }
         }
         
+
+
+def tuning_space(n: int, cores: int) -> list[dict]:
+    """
+    Configuraciones candidatas para tuning.py (la primera es la de defecto): implementación del oráculo.
+
+    Las opciones de Aer se ajustan aparte con aer_tuning.py.
+    """
+    return [{'oracle': oracle} for oracle in sorted(available_oracles(n), key=lambda oracle: oracle != DEFAULT_ORACLE)]
+
+
+def build_runner(n: int, cores: int, options: dict, shots: int = 1024, precision: str = "double",
+                 console: Console = None) -> GroverRunner:
+    """Runner sin monitores con las opciones dadas, para tuning.py y shot_scaling.py."""
+    return GroverRunner(n, shots, cores, None, None, console or Console(), None, precision=precision,
+                        backend_options=options)
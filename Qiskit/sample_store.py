@@ -0,0 +1,131 @@
+import json
+import os
+import numpy as np
+
+# Directorio (dentro de cada carpeta de resultados) con las muestras en bruto
+SAMPLES_DIR = "samples"
+SCHEMA_FILE = "schema.json"
+INDEX_FILE = "index.jsonl"
+
+# Columnas almacenadas: un fichero binario little-endian por columna
+COLUMNS = {
+    "t_ns": "<i8",
+    "rss_mb": "<f4",
+    "cpu_s": "<f4",
+}
+
+# Campos de configuración que se guardan en el índice junto a cada bloque
+CONFIG_KEYS = ("backend", "n", "shots", "cores", "precision", "options", "spec_hash")
+
+
+class SampleStore:
+    """Almacén columnar de muestras en bruto, ampliado por bloques (uno por configuración)."""
+
+    def __init__(self, results_dir: str, fsync: bool = False):
+        self.path = os.path.join(results_dir, SAMPLES_DIR)
+        self.fsync = fsync
+        self._files = {}
+        os.makedirs(self.path, exist_ok=True)
+        schema_file = os.path.join(self.path, SCHEMA_FILE)
+        if not os.path.isfile(schema_file):
+            with open(schema_file, "w") as f:
+                json.dump({"columns": COLUMNS}, f, indent=2)
+        self._index = _read_index(self.path)
+
+    def append(self, config: dict, t_ns, rss_mb=None, cpu_s=None) -> int:
+        """Añade un bloque de muestras y devuelve su identificador de fila."""
+        count = len(t_ns)
+        values = {"t_ns": t_ns, "rss_mb": rss_mb, "cpu_s": cpu_s}
+        for column, dtype in COLUMNS.items():
+            data = values[column]
+            array = (np.full(count, np.nan, dtype=dtype) if data is None
+                     else np.asarray(data, dtype=dtype))
+            if len(array) != count:
+                raise ValueError(f"Column '{column}' has {len(array)} samples, expected {count}")
+            self._file(column + ".bin", "ab").write(array.tobytes())
+        # Las columnas se vuelcan antes que el índice: un bloque indexado siempre está completo
+        for column in COLUMNS:
+            self._sync(self._files[column + ".bin"])
+
+        offset = self._index[-1]["offset"] + self._index[-1]["count"] if self._index else 0
+        entry = {"row": len(self._index), "offset": offset, "count": count,
+                 **{key: config.get(key) for key in CONFIG_KEYS}}
+        index_file = self._file(INDEX_FILE, "a")
+        index_file.write(json.dumps(entry, sort_keys=True) + "\n")
+        self._sync(index_file)
+        self._index.append(entry)
+        return entry["row"]
+
+    def _file(self, name: str, mode: str):
+        """Los ficheros se abren una vez y se mantienen abiertos entre bloques."""
+        if name not in self._files:
+            self._files[name] = open(os.path.join(self.path, name), mode)
+        return self._files[name]
+
+    def _sync(self, f) -> None:
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+def _read_index(path: str) -> list[dict]:
+    index_file = os.path.join(path, INDEX_FILE)
+    if not os.path.isfile(index_file):
+        return []
+    with open(index_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class SampleSet:
+    """Muestras de una carpeta de resultados, proyectadas en memoria (sin copiar)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.results_dir = os.path.dirname(path)
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            schema = json.load(f)["columns"]
+        self.index = _read_index(path)
+        total = self.index[-1]["offset"] + self.index[-1]["count"] if self.index else 0
+        self.columns = {}
+        for column, dtype in schema.items():
+            if total:
+                # Solo se proyecta la parte indexada (un bloque a medio escribir se ignora)
+                self.columns[column] = np.memmap(os.path.join(path, column + ".bin"),
+                                                 dtype=dtype, mode="r", shape=(total,))
+            else:
+                self.columns[column] = np.empty(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def samples(self, row: int) -> dict:
+        """Devuelve las columnas de un bloque como vistas del fichero proyectado."""
+        entry = self.index[row]
+        start, stop = entry["offset"], entry["offset"] + entry["count"]
+        return {column: values[start:stop] for column, values in self.columns.items()}
+
+    def select(self, **filters):
+        """Itera sobre (configuración, muestras) de los bloques que cumplen los filtros."""
+        for entry in self.index:
+            if all(entry.get(key) == value for key, value in filters.items()):
+                yield entry, self.samples(entry["row"])
+
+
+def load_tree(root: str) -> list[SampleSet]:
+    """
+    Busca recursivamente todas las carpetas de muestras bajo un directorio.
+
+    Parámetros:
+    root: str - Directorio raíz (una carpeta de resultados o un árbol de ellas).
+    """
+    sets = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if os.path.basename(dirpath) == SAMPLES_DIR and SCHEMA_FILE in filenames:
+            sets.append(SampleSet(dirpath))
+    return sets
@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from importlib import metadata
+import psutil
+from rich.console import Console
+from rich.table import Table
+from sweep_config import parse_int_axis
+from thread_env import pin_cores, thread_env
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prefijo de las líneas con las que el proceso hijo de cada número de núcleos devuelve sus resultados
+RESULT_PREFIX = "TUNING "
+
+# Caché de configuraciones ajustadas, compartida por los cuatro simuladores (se puede cambiar con GROVER_TUNING_CACHE)
+DEFAULT_CACHE = os.environ.get("GROVER_TUNING_CACHE", os.path.join(REPO_ROOT, "tuning_cache.json"))
+
+
+def host_fingerprint() -> str:
+    """Huella del nodo: nombre, modelo de CPU, núcleos lógicos y memoria total."""
+    cpu_model = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu_model = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), cpu_model)
+    except OSError:
+        pass
+    description = "|".join([socket.gethostname(), cpu_model, str(os.cpu_count()),
+                            str(psutil.virtual_memory().total // 2**30)])
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()[:16]
+
+
+def package_version(package: str) -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def cache_key(namespace: str) -> str:
+    """Clave de la caché: huella del nodo y espacio de nombres (simulador y versión)."""
+    return f"{host_fingerprint()}|{namespace}"
+
+
+def framework_namespace(framework: str) -> str:
+    """Espacio de nombres de un simulador: un cambio de versión invalida su ajuste."""
+    return f"{framework}-{package_version(framework)}"
+
+
+def _config_key(n: int, cores: int, precision: str) -> str:
+    return f"{n}:{cores}:{precision}"
+
+
+def load_cache(path: str = DEFAULT_CACHE) -> dict:
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(cache: dict, path: str = DEFAULT_CACHE) -> None:
+    """Escribe la caché de forma atómica (fichero temporal y rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def store(namespace: str, n: int, cores: int, precision: str, entry: dict, path: str = DEFAULT_CACHE) -> None:
+    """Guarda el ajuste de una configuración (se relee la caché por si otro ajuste la ha cambiado)."""
+    cache = load_cache(path)
+    cache.setdefault(cache_key(namespace), {})[_config_key(n, cores, precision)] = {
+        **entry, "tuned": datetime.now().isoformat(timespec="seconds")}
+    save_cache(cache, path)
+
+
+def lookup(namespace: str, n: int, cores: int, precision: str = "double", path: str = DEFAULT_CACHE) -> dict:
+    """Opciones ajustadas para (n, cores, precision) en este nodo, o {} si no hay."""
+    entry = load_cache(path).get(cache_key(namespace), {}).get(_config_key(n, cores, precision))
+    return dict(entry["options"]) if entry else {}
+
+
+def thread_candidates(cores: int) -> list[int]:
+    """Números de hilos probados: uno, la mitad y todos los núcleos."""
+    return sorted({1, max(1, cores // 2), cores})
+
+
+def successive_halving(candidates: list[dict], evaluate, eta: int = 2, samples: int = 1,
+                       budget: float = None) -> tuple:
+    """
+    Búsqueda por successive halving: en cada ronda se miden todos los candidatos vivos,
+    se conserva la fracción 1/eta más rápida y se multiplican por eta las muestras por candidato.
+
+    Las muestras de todas las rondas se acumulan y los candidatos se ordenan por su mediana.
+    Si se agota el presupuesto se devuelve el mejor candidato medido hasta entonces.
+
+    Parámetros:
+    candidates: list - Configuraciones (diccionarios de opciones) a comparar.
+    evaluate: callable - evaluate(opciones, muestras) -> lista de tiempos.
+    eta: int - Factor de reducción por ronda.
+    samples: int - Muestras por candidato en la primera ronda.
+    budget: float - Tiempo máximo de búsqueda en segundos (None: sin límite).
+    """
+    deadline = time.perf_counter() + budget if budget else math.inf
+    times = {i: [] for i in range(len(candidates))}
+    alive = list(times)
+    rounds = 0
+    while True:
+        for i in alive:
+            if time.perf_counter() > deadline and times[i]:
+                continue
+            times[i].extend(evaluate(candidates[i], samples))
+        rounds += 1
+        measured = [i for i in alive if times[i]]
+        measured.sort(key=lambda i: statistics.median(times[i]))
+        if len(measured) <= 1 or time.perf_counter() > deadline:
+            break
+        alive = measured[:max(1, math.ceil(len(measured) / eta))]
+        if len(alive) == 1:
+            break
+        samples *= eta
+    best = measured[0]
+    history = [(candidates[i], statistics.median(values), len(values)) for i, values in times.items() if values]
+    return candidates[best], history, rounds
+
+
+def tune(build_runner, space: list[dict], n: int, cores: int, precision: str = "double", shots: int = 1024,
+         eta: int = 2, samples: int = 1, budget: float = None, console: Console = None) -> tuple:
+    """
+    Ajusta las opciones de un GroverRunner para (n, cores, precision).
+
+    Parámetros:
+    build_runner: callable - Fábrica build_runner(n, cores, opciones, shots, precision, console) del simulador.
+    space: list - Configuraciones candidatas, declaradas por tuning_space(n, cores) del simulador.
+    n: int - Número de qubits.
+    cores: int - Número de núcleos.
+    precision: str - Precisión del simulador.
+    shots: int - Shots de cada ejecución (si el simulador los usa).
+    eta, samples, budget - Parámetros de successive_halving.
+    """
+    console = console or Console()
+
+    def evaluate(options: dict, count: int) -> list:
+        # Se construye un runner por evaluación para no mantener varios vectores de estado en memoria
+        runner = build_runner(n, cores, options, shots, precision, console)
+        times = [t / 1e9 for t in runner.sample_times(count)]
+        del runner
+        return times
+
+    return successive_halving(space, evaluate, eta, samples, budget)
+
+
+def print_tuning(console: Console, framework: str, rows: list) -> None:
+    table = Table(title=f"Best {framework} configuration per n")
+    for column in ("n", "Cores", "Best options", "Median (s)", "Default (s)", "Speedup", "Candidates", "Rounds"):
+        table.add_column(column, justify="left" if column == "Best options" else "right")
+    for n, cores, best, history, rounds in rows:
+        medians = {json.dumps(options, sort_keys=True): t for options, t, _ in history}
+        best_t = medians[json.dumps(best, sort_keys=True)]
+        default_t = next(iter(medians.values()))
+        table.add_row(str(n), str(cores), json.dumps(best, sort_keys=True) if best else "defaults",
+                      f"{best_t:.4f}", f"{default_t:.4f}", f"{default_t / best_t:.2f}x",
+                      str(len(history)), str(rounds))
+    console.print(table)
+
+
+def tune_cores(framework: str, build_runner, tuning_space, n_values: list[int], cores: int, args,
+               console: Console) -> list:
+    """Ajusta cada n con un número de núcleos fijo y guarda el mejor resultado en la caché."""
+    namespace = framework_namespace(framework)
+    rows = []
+    for n in n_values:
+        space = tuning_space(n, cores)
+        console.print(f"Tuning {framework} for n={n}, {cores} cores ({len(space)} candidates)...",
+                      style="bright_magenta")
+        best, history, rounds = tune(build_runner, space, n, cores, args.precision, args.shots,
+                                     args.eta, args.samples, args.budget, console)
+        best_t = next(t for options, t, _ in history if options == best)
+        store(namespace, n, cores, args.precision, {"options": best, "t_median": best_t,
+                                                    "candidates": len(history), "rounds": rounds}, args.cache)
+        rows.append((n, cores, best, history, rounds))
+    return rows
+
+
+def run_child(cores: int, args) -> list:
+    """
+    Ajusta un número de núcleos en un proceso hijo con las variables de hilos fijadas antes de importar
+    el simulador (Qulacs toma sus hilos de OMP_NUM_THREADS al cargarse), y devuelve sus filas.
+    """
+    command = [sys.executable, os.path.abspath(__file__), args.n, "--child", "--cores", str(cores),
+               "--shots", str(args.shots), "--precision", args.precision, "--eta", str(args.eta),
+               "--samples", str(args.samples), "--cache", args.cache]
+    if args.budget is not None:
+        command += ["--budget", str(args.budget)]
+    output = subprocess.run(command, env=thread_env(cores), stdout=subprocess.PIPE, text=True, check=True).stdout
+    return [json.loads(line[len(RESULT_PREFIX):]) for line in output.splitlines() if line.startswith(RESULT_PREFIX)]
+
+
+def main():
+    # El simulador declara su espacio de búsqueda y cómo construir un runner con unas opciones
+    from grover_runner import FRAMEWORK, build_runner, tuning_space
+
+    parser = argparse.ArgumentParser(description=f"Tune {FRAMEWORK} options for Grover circuits with successive halving")
+    parser.add_argument("n", type=str, help="Qubit counts (e.g. '20', '20-24' or '20,22,24')")
+    parser.add_argument("--cores", type=str, default=str(os.cpu_count()), help="Core counts (e.g. '8,16')")
+    parser.add_argument("--shots", type=int, default=1024, help="Shots per execution (default: 1024)")
+    parser.add_argument("--precision", type=str, default="double", choices=["double", "single"])
+    parser.add_argument("--eta", type=int, default=2, help="Fraction of candidates dropped per round is 1 - 1/eta (default: 2)")
+    parser.add_argument("--samples", type=int, default=1, help="Samples per candidate in the first round (default: 1)")
+    parser.add_argument("--budget", type=float, default=None, help="Tuning time budget per configuration in seconds")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="Tuning cache file")
+    parser.add_argument("--child", action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    try:
+        n_values = parse_int_axis(args.n, "n")
+        cores_values = parse_int_axis(args.cores, "cores")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.child:
+        # Proceso hijo: un único número de núcleos; las filas salen como JSON por la salida estándar
+        pin_cores(cores_values[0])
+        for row in tune_cores(FRAMEWORK, build_runner, tuning_space, n_values, cores_values[0], args,
+                              Console(stderr=True)):
+            print(RESULT_PREFIX + json.dumps(row), flush=True)
+        return
+
+    console = Console()
+    rows = []
+    for cores in cores_values:
+        try:
+            rows.extend(run_child(cores, args))
+        except subprocess.CalledProcessError as e:
+            console.print(f"Tuning with {cores} cores failed with exit code {e.returncode}", style="red")
+    if not rows:
+        sys.exit(1)
+    print_tuning(console, FRAMEWORK, rows)
+    console.print(f"Best configurations saved in {args.cache} for {cache_key(framework_namespace(FRAMEWORK))}",
+                  style="bold green")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from qsimov import QCircuit
+import microbench
+from grover_runner import mcz_operations, make_executor, ORACLES
+
+
+def _circuit(n: int, operations=()) -> QCircuit:
+    c = QCircuit(n, n, name="GateBench")
+    for gate, kwargs in operations:
+        c.add_operation(gate, **kwargs)
+    return c
+
+
+def kernels(n: int, threads: int) -> dict:
+    """Cada núcleo ejecuta un circuito con una puerta; el circuito vacío mide la inicialización del estado."""
+    executor = make_executor(threads)
+    targets = list(range(n))
+    circuits = {
+        microbench.EMPTY_KERNEL: _circuit(n),
+        'H': _circuit(n, [("H", {"targets": 0})]),
+        'X': _circuit(n, [("X", {"targets": 0})]),
+        # Una variante de la Z multicontrolada por cada implementación del oráculo
+        **{f'MCZ ({oracle})': _circuit(n, mcz_operations(n, oracle)) for oracle in ORACLES},
+    }
+    result = {name: ((lambda c=c: executor.execute(c, iterations=1)), None) for name, c in circuits.items()}
+    # Qsimov mide un shot por iteración sobre el mismo estado inicial; sin devolver los estados colapsados,
+    # que ocuparían MEASURE_SHOTS vectores de estado
+    measure_executor = make_executor(threads, {"return_struct": False})
+    measured = _circuit(n, [("MEASURE", {"targets": targets, "outputs": targets})])
+    result['measure'] = (lambda: measure_executor.execute(measured, iterations=microbench.MEASURE_SHOTS), None)
+    return result
+
+
+if __name__ == "__main__":
+    microbench.main("qsimov", kernels)
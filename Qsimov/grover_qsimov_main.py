@@ -1,94 +1,149 @@
 import argparse
 import os
 import sys
-import threading
 from rich.console import Console
 import ResourceMonitor
-from grover_runner import GroverRunner
-from results_handler import ResultsHandler
+import memory_traffic
+import tuning
+from results_handler import ResultsHandler, StreamingConsole
+import sweep_config
+import results_db
 import psutil
 import rich
 
 def main():
     parser = argparse.ArgumentParser(description="Run Grover's algorithm with a specified number of qubits and iterations")
-    parser.add_argument("n", type=str, help="Number of qubits or range (e.g., '4' or '4-7')")
-    parser.add_argument("num_iterations", type=str, help="Number of iterations or range (e.g., '512' or '512-1024')")
+    parser.add_argument("n", type=str, nargs='?', help="Number of qubits or range (e.g., '4' or '4-7')")
+    parser.add_argument("num_iterations", type=str, nargs='?', help="Number of iterations or range (e.g., '512' or '512-1024')")
     parser.add_argument("--cores", type=int, default=-1, help="Number of CPU cores to use")
     parser.add_argument("--no-ram", action='store_false', dest='ram', default=True, help="Do not monitor real time RAM")
     parser.add_argument("--no-cpu", action='store_false', dest='cpu', default=True, help="Do not monitor CPU")
+    parser.add_argument("--db", type=str, default=results_db.DEFAULT_DB, help="SQLite results database shared by all frameworks")
+    parser.add_argument("--no-db", action='store_const', const=None, dest='db', help="Do not write results to the database")
+    parser.add_argument("--flush-every", type=int, default=1, help="Write results to disk every N rows")
+    parser.add_argument("--fsync", action='store_true', default=False, help="fsync results files on every flush")
+    parser.add_argument("--ram-trace-hz", type=int, default=0, help="Record a binary RAM trace of every run at this rate (max 1000 Hz, 0 = off)")
+    parser.add_argument("--min-sample-time", type=float, default=None,
+                        help="Minimum duration of each timed sample in seconds; faster runs are repeated inside the sample (default: 0.01)")
+    parser.add_argument("--roofline", action='store_true', default=False,
+                        help="Run a STREAM-like NumPy triad per core count and report the fraction of it each run achieves")
+    parser.add_argument("--oracle", type=str, default=None,
+                        help="Multi-controlled Z implementation(s) for the oracle and diffuser, compared side by side "
+                             "(e.g. 'native,mcx_h'; default: native)")
+    parser.add_argument("--ir-fusion", type=str, default=None,
+                        help="Fusion pass(es) of the shared circuit IR, compared side by side: 0 = off, 1 = fuse the "
+                             "single-qubit gates of each qubit, k = also group them into k-qubit dense blocks (e.g. '0,1,2')")
+    parser.add_argument("--sampler", type=str, default=None,
+                        help="Shot sampling mode(s), compared side by side: 'native' reruns the circuit for every shot, "
+                             "'vector' simulates once and draws all shots with shot_sampler.py (default: native)")
+    parser.add_argument("--rng", type=str, default=None,
+                        help="NumPy bit generator(s) used by the measurements and the vector sampler: 'pcg64' or 'philox' (default: pcg64)")
+    parser.add_argument("--tuning-cache", type=str, default=tuning.DEFAULT_CACHE,
+                        help="Tuning cache written by tuning.py; tuned options for this host are applied automatically")
+    parser.add_argument("--no-tuning", action='store_const', const=None, dest='tuning_cache',
+                        help="Run with the default options even if tuned ones are cached")
+    parser.add_argument("--config", type=str, default=None, help="Sweep file (TOML/YAML) describing the runs to execute")
     args = parser.parse_args()
+    if args.config is None and (args.n is None or args.num_iterations is None):
+        parser.error("n and num_iterations are required unless --config is given")
 
-    # Parsear qubits
-    if '-' in args.n:
-        start, end = map(int, args.n.split('-'))
-        if start >= end:
-            print("Error: Invalid range of qubits.")
-            sys.exit(1)
-        qubits_list = range(start, end + 1)
-    else:
-        n = int(args.n)
-        if n <= 2:
-            print("Error: Number of qubits must be greater than 2.")
-            sys.exit(1)
-        qubits_list = [n]
+    # Construir el barrido (fichero de configuración o argumentos clásicos)
+    try:
+        if args.config:
+            spec = sweep_config.load_sweep(args.config)
+        else:
+            options = {key: value.split(',') for key, value in (('oracle', args.oracle), ('sampler', args.sampler),
+                                                                  ('rng', args.rng)) if value}
+            if args.ir_fusion:
+                options['ir_fusion'] = [int(fusion) for fusion in args.ir_fusion.split(',')]
+            spec = sweep_config.spec_from_args("qsimov", args.n, args.num_iterations, args.cores if args.cores != -1 else None,
+                                               options=options)
+        runs = sweep_config.expand_sweep(spec, "qsimov")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not runs:
+        print("Nothing to run for qsimov in this sweep.")
+        sys.exit(0)
+    # El simulador se importa tras validar los argumentos: --help y los errores de uso no pagan su importación
+    from grover_runner import GroverRunner, FRAMEWORK
+    if args.min_sample_time is not None:
+        spec['sampling']['min_sample_time'] = args.min_sample_time
+    spec_hash = sweep_config.spec_hash(spec)
 
-    # Parsear iteraciones
-    if '-' in args.num_iterations:
-        start, end = map(int, args.num_iterations.split('-'))
-        if start >= end:
-            print("Error: Invalid range of iterations.")
-            sys.exit(1)
-        iterations_list = range(start, end + 1)
+    # Crear directorio de resultados
+    if args.config:
+        results_dir = f"results_sweep_{spec['name']}_{spec_hash[:8]}"
     else:
-        num_iterations = int(args.num_iterations)
-        if num_iterations == 0:
-            print("Error: Number of iterations must be non-zero.")
-            sys.exit(1)
-        iterations_list = [num_iterations]
-
-    # Configurar directorio de resultados
-    results_dir = f"results_{args.n}_qubits_{args.num_iterations}_iterations_{args.cores}_cores"
+        results_dir = f"results_{args.n}_qubits_{args.num_iterations}_iterations_{args.cores}_cores"
     index = 0
     base_dir = results_dir
     while os.path.exists(results_dir):
         index += 1
         results_dir = f"{base_dir}({index})"
     os.makedirs(results_dir)
+    sweep_config.save_spec(spec, results_dir)
 
     # Configurar núcleos
     actual_cores = os.cpu_count()
     args.cores = min(args.cores, actual_cores)
-    console = Console(record=True)
+    console = StreamingConsole(os.path.join(results_dir, "out.txt"))
     if args.cores == -1:
         args.cores = os.cpu_count()
     console.print(f"Using {args.cores} cores", style="bold green")
 
     # Inicializar manejador de resultados
-    times_file_name = f'Grover_data_qsimov_{args.n}'
-    results_handler = ResultsHandler(times_file_name, results_dir, console)
+    times_file_name = f"Grover_data_qsimov_{spec['name']}"
+    results_handler = ResultsHandler(times_file_name, results_dir, console, db_path=args.db,
+                                     flush_every=args.flush_every, fsync=args.fsync)
 
-    # Monitoreo continuo de RAM
-    # file_name = os.path.join(results_dir, f"grover_qsimov_{args.n}_qubits_{args.num_iterations}_iterations_{args.cores}_cores.csv")
-    # if args.ram:
-    #     ram_monitor_continuous = ResourceMonitor.RAMMonitor()
-    #     monitor_thread = threading.Thread(target=ram_monitor_continuous.real_time_memory_usage, args=(file_name,))
-    #     monitor_thread.daemon = True
-    #     monitor_thread.start()
+    namespace = tuning.framework_namespace(FRAMEWORK)
+    stream_gbs = {}
+    # Resumen ligero de cada ejecución para elegir la configuración más rápida por n
+    summaries = []
+    # Ejecutar cada configuración del barrido
+    for i, run in enumerate(runs):
+        n, num_iterations = run['n'], run['shots']
+        cores = min(run['cores'] or actual_cores, actual_cores)
+        console.print(f"Running Grover's algorithm with {n} qubits, {num_iterations} iterations, and {cores} cores...", style="bright_magenta")
+        cpu_monitor = ResourceMonitor.CPUMonitor(interval=0.1) if args.cpu else None
+        ram_monitor = ResourceMonitor.RAMMonitor(interval=0.1) if args.ram else None
+        
+        ram_csv_file = os.path.join(results_dir, f"ram_usage_n{n}.csv")
+        ram_trace = None
+        if args.ram_trace_hz > 0:
+            ram_trace = ResourceMonitor.MemoryTraceRecorder(os.path.join(results_dir, f"ram_trace_{i:03d}_n{n}.bin"),
+                                                            rate_hz=args.ram_trace_hz)
+            ram_trace.start()
+            ram_trace.mark("build")
+        tuned_options = tuning.lookup(namespace, n, cores, run['precision'], args.tuning_cache) if args.tuning_cache else {}
+        if tuned_options:
+            console.print(f"Applying tuned options: {tuned_options}", style="bold blue")
+        grover_runner = GroverRunner(n, num_iterations, cores, ram_monitor, cpu_monitor, console, ram_csv_file,
+                                     precision=run['precision'], backend_options=run['options'],
+                                     sampling=spec['sampling'], ram_trace=ram_trace, tuned_options=tuned_options)
+        results = grover_runner.run()
+        if ram_trace:
+            ram_trace.stop()
+            ResourceMonitor.plot_ram_trace(ram_trace.file_name)
+        results['spec_hash'] = spec_hash
+        if args.roofline:
+            if cores not in stream_gbs:
+                stream_gbs[cores] = memory_traffic.stream_triad(cores)
+                console.print(f"NumPy triad bandwidth with {cores} cores: {stream_gbs[cores]:.2f} GB/s", style="bold blue")
+            results['stream_gbs'] = stream_gbs[cores]
+        
+        results_handler.display_timing_table(results)
+        results_handler.display_usage_table(results)
+        results_handler.display_bandwidth_table(results)
+        results_handler.display_circuit_table(results)
+        results_handler.save_samples(results)
+        results_handler.save_to_csv(results)
+        results_handler.save_to_db(results)
+        summaries.append({key: results.get(key) for key in ('n', 'cores', 'shots', 't_grover', 't_median', 'options')})
 
-    # Ejecutar para cada n y num_iterations
-    for n in qubits_list:
-        for num_iterations in iterations_list:
-            console.print(f"Running Grover's algorithm with {n} qubits, {num_iterations} iterations, and {args.cores} cores...", style="bright_magenta")
-            cpu_monitor = ResourceMonitor.CPUMonitor(interval=0.1) if args.cpu else None
-            ram_monitor = ResourceMonitor.RAMMonitor(interval=0.1) if args.ram else None
-            
-            ram_csv_file = os.path.join(results_dir, f"ram_usage_n{n}.csv")
-            grover_runner = GroverRunner(n, num_iterations, args.cores, ram_monitor, cpu_monitor, console, ram_csv_file)
-            results = grover_runner.run()
-            
-            results_handler.display_timing_table(results)
-            results_handler.display_usage_table(results)
-            results_handler.save_to_csv(results)
+    results_handler.display_fastest_options(summaries)
+    results_handler.close()
 
     # Finalizar
     if args.ram:
@@ -97,6 +152,8 @@ def main():
 
     ResourceMonitor.plot_t_grover_from_csv(os.path.join(results_dir, f"{times_file_name}.csv"))
 
+    results_handler.save_console_output()
+
 if __name__ == "__main__":
     console = Console(record=True)
     main()
\ No newline at end of file
@@ -1,74 +1,173 @@
-from qsimov import *
-import qsimov as qj
-import math
+from qsimov import QCircuit, Drewom
 import statistics
-import time
 from rich.console import Console
 import numpy as np
 from typing import List
-import threading
 from datetime import datetime
+from sweep_config import DEFAULT_SAMPLING
+import bench_stats
+import circuit_ir
+import memory_traffic
+import shot_sampler
+import tuning
+from timing import SampleTimer
+from ResourceMonitor import SampleProbe, time_to_first_sample
+
+# Implementaciones de la Z multicontrolada usada por el oráculo y el difusor,
+# como listas de (puerta, argumentos de add_operation)
+ORACLES = {
+    "native": lambda n: [("Z", {"targets": n - 1, "controls": list(range(n - 1))})],
+    "mcx_h": lambda n: [("H", {"targets": n - 1}),
+                        ("X", {"targets": n - 1, "controls": list(range(n - 1))}),
+                        ("H", {"targets": n - 1})],
+}
+DEFAULT_ORACLE = "native"
+
+def mcz_operations(n: int, oracle: str = DEFAULT_ORACLE) -> list:
+    """Operaciones de la Z sobre el último qubit controlada por los demás, con la implementación indicada."""
+    if oracle not in ORACLES:
+        raise ValueError(f"Unknown Qsimov oracle '{oracle}' (choose from {', '.join(ORACLES)})")
+    return ORACLES[oracle](n)
+
+def lower(circuit: circuit_ir.Circuit, oracle: str = DEFAULT_ORACLE) -> list:
+    """
+    Traduce un circuito del IR a operaciones de Qsimov, como lista de (puerta, argumentos de add_operation).
+
+    Qsimov no acepta matrices arbitrarias: las puertas fusionadas de un qubit se aplican como U(theta,phi,lambda)
+    (igual salvo fase global) y los bloques de varios qubits se deshacen en sus puertas originales.
+    """
+    operations = []
+    for gate in circuit.gates:
+        if gate.name == "mcz":
+            operations.extend(mcz_operations(circuit.n, oracle))
+        elif gate.name == "measure":
+            operations.append(("MEASURE", {"targets": list(gate.targets), "outputs": list(gate.targets)}))
+        elif gate.name == "unitary" and len(gate.targets) == 1:
+            angles = ",".join(repr(angle) for angle in circuit_ir.zyz_angles(gate.matrix))
+            operations.append((f"U({angles})", {"targets": gate.targets[0]}))
+        else:
+            operations.extend((part.name.upper(), {"targets": part.targets[0]}) for part in gate.expand())
+    return operations
+
+# Nombre del simulador (caché de ajuste) y opciones propias del runner, que no se pasan al ejecutor
+FRAMEWORK = "qsimov"
+RUNNER_OPTIONS = {'oracle', 'ir_fusion', 'sampler', 'rng'}
+# Opciones que se pasan al ejecutor Drewom (extra); cualquier otra opción es un error
+EXECUTOR_OPTIONS = {'num_threads', 'use_system'}
+
+def make_executor(threads: int, backend_options: dict = None, random_generator=np.random.rand):
+    """Crea el ejecutor Drewom (máquina doki) con el número de hilos y el generador aleatorio indicados."""
+    return Drewom(qmachine="doki",
+                  extra={"num_threads": threads,
+                         "random_generator": random_generator,
+                         "use_system": False,
+                         "return_struct": True,
+                         **(backend_options or {})})
 
 class GroverRunner:
     """Clase para ejecutar el algoritmo de Grover y medir su rendimiento."""
     
-    def __init__(self, n: int, num_iterations: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str):
+    def __init__(self, n: int, num_iterations: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str,
+                 precision: str = "double", backend_options: dict = None, sampling: dict = None, ram_trace=None,
+                 tuned_options: dict = None):
+        if precision != "double":
+            raise ValueError("Qsimov only supports double precision")
+        unsupported = (set(backend_options or {}) | set(tuned_options or {})) - RUNNER_OPTIONS - EXECUTOR_OPTIONS
+        if unsupported:
+            raise ValueError(f"Unsupported Qsimov options: {', '.join(sorted(unsupported))}")
         self.n = n
         self.num_iterations = num_iterations
         self.cores = cores
         self.ram_monitor = ram_monitor
         self.cpu_monitor = cpu_monitor
         self.console = console
+        self.probe = SampleProbe()
+        self.readings = []
+        self.ram_trace = ram_trace
+        self.precision = precision
+        self.backend_options = dict(backend_options or {})
+        # Opciones ajustadas para este nodo (tuning.py); las opciones explícitas tienen prioridad
+        self.tuned_options = dict(tuned_options or {})
+        self.options = {**self.tuned_options, **self.backend_options}
+        self.oracle = self.options.get('oracle', DEFAULT_ORACLE)
+        self.ir_fusion = int(self.options.get('ir_fusion', 0))
+        # Muestreo de los shots: native repite la simulación completa en cada shot (iterations del ejecutor, con una
+        # medida MEASURE por shot); vector simula una vez y extrae todos los shots del vector de estado final
+        self.sampler = self.options.get('sampler', shot_sampler.DEFAULT_SAMPLER)
+        if self.sampler not in shot_sampler.SAMPLERS:
+            raise ValueError(f"Unknown Qsimov sampler '{self.sampler}' (choose from {', '.join(shot_sampler.SAMPLERS)})")
+        self.rng = shot_sampler.make_rng(self.options.get('rng', shot_sampler.DEFAULT_BIT_GENERATOR))
+        self.sampling = {**DEFAULT_SAMPLING, **(sampling or {})}
+        self.timer = SampleTimer(self.sampling['min_sample_time'])
         self.circuit = self._build_circuit()
         self.ram_csv_file = ram_csv_file
 
         # Create the quantum machine
-        self.executor = qj.Drewom(qmachine="doki",
-                            extra={"num_threads": self.cores,
-                                    "random_generator": np.random.rand,
-                                    "use_system": False,
-                                    "return_struct": True})
+        # Un único ejecutor para todas las muestras, con las opciones EXECUTOR_OPTIONS (num_threads, use_system).
+        # Las medidas del ejecutor toman sus números aleatorios del generador de NumPy elegido
+        self.executor = make_executor(self.cores, {key: value for key, value in self.options.items()
+                                                   if key in EXECUTOR_OPTIONS}, self.rng.random)
         
 
     def _build_circuit(self) -> QCircuit:
-        """Construye el circuito cuántico de Grover con iteraciones óptimas."""
-        optimal_num_iterations = math.floor(math.pi / (4 * math.asin(math.sqrt(1 / 2**self.n))))
+        """Construye el circuito de Grover desde el IR común, con el pase de fusión ir_fusion."""
         c = QCircuit(self.n, self.n, name="Grover")
-        
-        # Inicialización con puertas Hadamard
-        for qubit in range(self.n):
-            c.add_operation("H", targets=qubit)
-        
-        # Iteraciones de Grover (oráculo + difusor)
-        for _ in range(optimal_num_iterations):
-            # Oráculo
-            c.add_operation("Z", targets=self.n - 1, controls=[i for i in range(self.n - 1)])
-            # Difusor
-            for qubit in range(self.n):
-                c.add_operation("H", targets=qubit)
-            for qubit in range(self.n):
-                c.add_operation("X", targets=qubit)
-            c.add_operation("Z", targets=self.n - 1, controls=[i for i in range(self.n - 1)])
-            for qubit in range(self.n):
-                c.add_operation("X", targets=qubit)
-            for qubit in range(self.n):
-                c.add_operation("H", targets=qubit)
-        
-        # Medición
-        targets = [i for i in range(self.n)]
-        c.add_operation("MEASURE", targets=targets, outputs=targets)
-        
+        self.gates = []
+        circuit = circuit_ir.grover_circuit(self.n)
+        if self.sampler == "vector":
+            # Los shots se extraen del estado final, sin medir en el circuito
+            circuit = circuit_ir.without_measurements(circuit)
+        for gate, kwargs in lower(circuit_ir.optimize(circuit, self.ir_fusion), self.oracle):
+            self._add_operation(c, gate, **kwargs)
         return c
+
+    def _add_operation(self, c: QCircuit, gate: str, **kwargs) -> None:
+        """Añade una operación al circuito y la registra en la lista de puertas."""
+        c.add_operation(gate, **kwargs)
+        self.gates.append((gate, len(kwargs.get('controls') or [])))
+
+    def gate_list(self) -> list:
+        """Puertas del circuito como (nombre, número de controles), para estimar el tráfico de memoria."""
+        return list(self.gates)
+
+    def _final_state(self) -> np.ndarray:
+        """Ejecuta el circuito una vez (sin medidas) y devuelve el vector de estado final."""
+        qstruct, _ = self.executor.execute(self.circuit, iterations=1)[0]
+        state = qstruct.get_state()
+        qstruct.free()
+        return state
+
+    def _sample(self, state: np.ndarray) -> np.ndarray:
+        """Conteos de todos los shots, extraídos del vector de estado con shot_sampler."""
+        return shot_sampler.sample_counts(state, self.num_iterations, self.rng)
+
     def _run_simulation(self, num_executions: int) -> List[float]:
         """Ejecuta la simulación num_executions veces y devuelve los tiempos."""
+        def execute():
+            if self.sampler == "vector":
+                self._sample(self._final_state())
+            else:
+                self.executor.execute(self.circuit, iterations=self.num_iterations)
+
+        # La primera vez se calibran las repeticiones internas de cada muestra
+        if self.timer.inner_repeats is None:
+            self.timer.calibrate(execute)
         times = []
         for _ in range(num_executions):
-            t1 = time.perf_counter_ns()
-            self.executor.execute(self.circuit, iterations=self.num_iterations)
-            t2 = time.perf_counter_ns()
-            times.append(t2 - t1)
+            self.probe.reset()
+            times.append(self.timer.measure(execute))
+            self.readings.append(self.probe.read())
         return times
 
+    def sample_times(self, count: int) -> list[float]:
+        """Tiempos (ns) de count muestras, medidas como en run() pero sin monitores (tuning.py, cold_start.py)."""
+        return self._run_simulation(count)
+
+    def _mark(self, phase: str) -> None:
+        """Marca una fase en la traza de memoria, si está activa."""
+        if self.ram_trace:
+            self.ram_trace.mark(phase)
+
     def run(self) -> dict:
         """Ejecuta el algoritmo de Grover y devuelve los resultados."""
         self.console.print(f"Comienza la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
@@ -77,32 +176,34 @@ class GroverRunner:
         if self.cpu_monitor:
             self.cpu_monitor.start()
         
-        # monitor_thread = None
         if self.ram_monitor:
             self.ram_monitor.start()
-            # Hilo para escribir en el archivo CSV (ajusta según tu implementación)
-            # monitor_thread = threading.Thread(target=self.ram_monitor.real_time_memory_usage, 
-            #                                 args=(self.ram_csv_file,))
-            # monitor_thread.daemon = True
-            # monitor_thread.start()
+        # Desde el arranque del proceso hasta la primera ejecución medida (importaciones, inicialización...);
+        # None en las ejecuciones siguientes del mismo proceso
+        time_to_first_sample_s = time_to_first_sample()
+        self._mark("warmup")
         # Iteraciones iniciales
-        n_iterations_in = 10
+        n_iterations_in = self.sampling['min_samples']
         t_for_loop = self._run_simulation(n_iterations_in)
         t_grover = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
-        std_grover = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
         
         #Si t_grover es mayot que 2,4 horas significa que el algoritmo tarda mas de un dia en ejecutar y se detiene de forma segura
-        if t_grover > 8640:
+        if t_grover > self.sampling['time_limit']:
             self.console.print(f"El algoritmo tarda más de un día en ejecutarse. Deteniendo la ejecución a las {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="red")
             exit(0)
 
         # Calcular iteraciones óptimas
-        iterations_number = (math.ceil((2 * 1.96 * std_grover) / (0.05 * t_grover)) ** 2 
+        iterations_number = (bench_stats.required_samples(t_for_loop, self.sampling['z'], self.sampling['rel_error'])
                              if t_grover > 0 else n_iterations_in)
+        if self.sampling['max_samples']:
+            iterations_number = min(iterations_number, self.sampling['max_samples'])
         self.console.print(f"Optimal number of iterations: {iterations_number}", style="blue")
+        self._mark("sampling")
 
         # Más iteraciones si es necesario
         if iterations_number > n_iterations_in:
+            # Las muestras de calentamiento se descartan junto con sus lecturas
+            self.readings = []
             t_for_loop = (self._run_simulation(iterations_number - n_iterations_in) + 
                           self._run_simulation(n_iterations_in))
         else:
@@ -110,7 +211,21 @@ class GroverRunner:
 
         t_grover_final = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
         std_grover_final = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
+        timing_stats = bench_stats.summarize(t_for_loop)
+        traffic = memory_traffic.circuit_traffic(self.gate_list(), self.n, self.precision)
+        achieved_gbs = memory_traffic.achieved_bandwidth(traffic['bytes_total'], timing_stats['t_median'] or t_grover_final)
+        # Coste extra de la primera llamada de la calibración (la única en frío) sobre la mediana
+        first_touch_s = max(self.timer.first_call_ns / 1e9 - (timing_stats['t_median'] or t_grover_final), 0)
+
+        t_exec_s = t_sampling_s = None
+        if self.sampler == "vector":
+            self._mark("split")
+            t_exec_s, t_sampling_s = shot_sampler.split_times(self._final_state, self._sample,
+                                                              self.sampling['min_samples'])
+            self.console.print(f"Execution: {t_exec_s:.6f} s, sampling {self.num_iterations} shots: {t_sampling_s:.6f} s",
+                               style="blue")
 
+        self._mark("done")
         # Obtener métricas de recursos
         cpu_avg = self.cpu_monitor.average() if self.cpu_monitor else 0
         ram_avg = self.ram_monitor.average() if self.ram_monitor else 0
@@ -121,8 +236,6 @@ class GroverRunner:
             self.cpu_monitor.stop()
         if self.ram_monitor:
             self.ram_monitor.stop()
-            # if monitor_thread and monitor_thread.is_alive():
-            #     monitor_thread.join()
             
         self.console.print(f"Termina la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
 
@@ -131,9 +244,42 @@ class GroverRunner:
             'iterations_number': iterations_number,  
             't_grover': t_grover_final,
             'std_grover': std_grover_final,
+            **timing_stats,
+            'inner_repeats': self.timer.inner_repeats,
+            'timer_overhead_ns': self.timer.overhead_ns,
+            **traffic,
+            'achieved_gbs': achieved_gbs,
             'cpu_avg': cpu_avg,
             'ram_avg': ram_avg,
             'ram_mb': ram_mb,
             'max_ram_peak': max_ram_peak,
-            'cores': self.cores
-        }
\ No newline at end of file
+            'cores': self.cores,
+            'backend': 'qsimov',
+            'shots': self.num_iterations,
+            'precision': self.precision,
+            'options': self.backend_options,
+            'tuned_options': self.tuned_options or None,
+            'oracle': self.oracle,
+            'ir_fusion': self.ir_fusion,
+            'sampler': self.sampler,
+            't_exec_s': t_exec_s,
+            't_sampling_s': t_sampling_s,
+            'first_touch_s': first_touch_s,
+            'time_to_first_sample_s': time_to_first_sample_s,
+            'samples': {
+                't_ns': t_for_loop,
+                'rss_mb': [rss for rss, _ in self.readings],
+                'cpu_s': [cpu for _, cpu in self.readings],
+            }
+        }
+
+def tuning_space(n: int, cores: int) -> list[dict]:
+    """Configuraciones candidatas para tuning.py (la primera es la de defecto): hilos del ejecutor y use_system."""
+    return [{'num_threads': threads, 'use_system': use_system} for use_system in (False, True)
+            for threads in sorted(tuning.thread_candidates(cores), key=lambda threads: threads != cores)]
+
+def build_runner(n: int, cores: int, options: dict, shots: int = 1024, precision: str = "double",
+                 console: Console = None) -> GroverRunner:
+    """Runner sin monitores con las opciones dadas, para tuning.py y shot_scaling.py."""
+    return GroverRunner(n, shots, cores, None, None, console or Console(), None, precision=precision,
+                        backend_options=options)
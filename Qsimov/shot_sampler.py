@@ -0,0 +1,104 @@
+import statistics
+import time
+import numpy as np
+
+# Los shots se extraen por bloques para acotar la memoria (un float64 aleatorio y un índice int64 por shot)
+CHUNK_SHOTS = 1 << 22
+
+# Muestreadores de los runners: native usa el muestreo propio del simulador (o ninguno);
+# vector extrae todos los shots del vector de estado final con ShotSampler
+SAMPLERS = ("native", "vector")
+DEFAULT_SAMPLER = "native"
+
+# Generadores de bits de NumPy para los números aleatorios del muestreo
+BIT_GENERATORS = {"pcg64": np.random.PCG64, "philox": np.random.Philox}
+DEFAULT_BIT_GENERATOR = "pcg64"
+
+
+def make_rng(name: str = DEFAULT_BIT_GENERATOR, seed: int = None) -> np.random.Generator:
+    """Generador de NumPy con el generador de bits indicado (pcg64 o philox)."""
+    if name not in BIT_GENERATORS:
+        raise ValueError(f"Unknown random generator '{name}' (choose from {', '.join(BIT_GENERATORS)})")
+    return np.random.Generator(BIT_GENERATORS[name](seed))
+
+
+def probabilities(state, num_qubits: int = None) -> np.ndarray:
+    """
+    Probabilidades |a|^2 del vector de estado, sin copiarlo si ya es un array de NumPy.
+
+    Parámetros:
+    state: array - Amplitudes del estado final (get_vector(), Statevector, state()...).
+    num_qubits: int - Si el estado tiene más qubits (ancillas en los bits altos), se marginaliza a los num_qubits bajos.
+    """
+    state = np.asarray(state)
+    probs = state.real ** 2 + state.imag ** 2
+    if num_qubits is not None and probs.size > 2**num_qubits:
+        probs = probs.reshape(-1, 2**num_qubits).sum(axis=0)
+    return probs
+
+
+class ShotSampler:
+    """Muestreo de shots de una distribución fija: la tabla de probabilidad acumulada se construye una sola vez."""
+
+    def __init__(self, probs: np.ndarray):
+        self.size = probs.size
+        self.cdf = np.cumsum(probs, dtype=np.float64)
+        self.total = self.cdf[-1]
+        self._probs = probs
+
+    def sample(self, shots: int, rng: np.random.Generator) -> np.ndarray:
+        """Índices de los resultados de shots medidas: una búsqueda binaria por shot sobre la tabla acumulada."""
+        outcomes = np.searchsorted(self.cdf, rng.random(shots) * self.total, side='right')
+        # Un número aleatorio igual al total por redondeo caería fuera de la tabla
+        return np.minimum(outcomes, self.size - 1, out=outcomes)
+
+    def counts(self, shots: int, rng: np.random.Generator, method: str = "auto") -> np.ndarray:
+        """
+        Número de veces que sale cada resultado (array de longitud 2^n).
+
+        Parámetros:
+        shots: int - Número de medidas.
+        rng: Generator - Generador de NumPy.
+        method: str - searchsorted (coste O(shots log 2^n)), multinomial (coste O(2^n), independiente
+                      de los shots) o auto: multinomial cuando hay al menos tantos shots como resultados.
+        """
+        if method == "auto":
+            method = "multinomial" if shots >= self.size else "searchsorted"
+        if method == "multinomial":
+            return rng.multinomial(shots, self._probs / self.total)
+        if method != "searchsorted":
+            raise ValueError(f"Unknown sampling method '{method}' (choose from auto, searchsorted, multinomial)")
+        counts = np.zeros(self.size, dtype=np.int64)
+        for start in range(0, shots, CHUNK_SHOTS):
+            counts += np.bincount(self.sample(min(CHUNK_SHOTS, shots - start), rng), minlength=self.size)
+        return counts
+
+
+def sample_counts(state, shots: int, rng: np.random.Generator, num_qubits: int = None,
+                  method: str = "auto") -> np.ndarray:
+    """Conteos de shots medidas sobre el vector de estado final (ver ShotSampler.counts)."""
+    return ShotSampler(probabilities(state, num_qubits)).counts(shots, rng, method)
+
+
+def split_times(final_state, sample, repeats: int, reset=None) -> tuple:
+    """
+    Medianas (s) de la simulación y del muestreo, medidos por separado.
+
+    Parámetros:
+    final_state: callable - Ejecuta el circuito y devuelve el vector de estado final.
+    sample: callable - sample(estado) extrae los shots.
+    repeats: int - Repeticiones medidas.
+    reset: callable - Reinicio del estado antes de cada simulación, fuera de la medida (opcional).
+    """
+    exec_times, sampling_times = [], []
+    for _ in range(repeats):
+        if reset:
+            reset()
+        t1 = time.perf_counter_ns()
+        state = final_state()
+        t2 = time.perf_counter_ns()
+        sample(state)
+        t3 = time.perf_counter_ns()
+        exec_times.append(t2 - t1)
+        sampling_times.append(t3 - t2)
+    return statistics.median(exec_times) / 1e9, statistics.median(sampling_times) / 1e9
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+import shot_sampler
+from sweep_config import parse_int_axis
+from thread_env import pin_cores, thread_env
+
+# Mayor número de shots muestreado por defecto
+DEFAULT_MAX_SHOTS = 10**7
+
+# Prefijo de las líneas con las que el proceso hijo de cada número de núcleos devuelve sus curvas
+RESULT_PREFIX = "SHOT_SCALING "
+
+CSV_FIELDS = ['framework', 'n', 'cores', 'shots', 't_exec_s', 't_sampling_s', 't_cdf_s']
+
+
+def geometric_shots(max_shots: int = DEFAULT_MAX_SHOTS, per_decade: int = 1) -> list[int]:
+    """Números de shots en progresión geométrica de 1 a max_shots, con per_decade puntos por década."""
+    points = round(math.log10(max_shots) * per_decade) + 1
+    return sorted({int(round(shots)) for shots in np.logspace(0, math.log10(max_shots), points)})
+
+
+def _median_s(call, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        t1 = time.perf_counter_ns()
+        call()
+        t2 = time.perf_counter_ns()
+        times.append(t2 - t1)
+    return statistics.median(times) / 1e9
+
+
+def shot_curve(runner, shot_counts: list[int], repeats: int = 5) -> tuple:
+    """
+    Simula el estado una vez y mide solo el muestreo para cada número de shots.
+
+    La tabla acumulada (ShotSampler) se construye una vez por estado, fuera de las medidas de cada
+    número de shots; su coste se devuelve aparte.
+
+    Parámetros:
+    runner: GroverRunner - Runner con sampler=vector (su circuito no mide y _final_state() devuelve el estado).
+    shot_counts: list - Números de shots.
+    repeats: int - Repeticiones medidas de la simulación y de cada muestreo (se toma la mediana).
+
+    Devuelve (t_exec_s, t_cdf_s, [(shots, t_sampling_s), ...]).
+    """
+    t_exec = _median_s(runner._final_state, repeats)
+    probs = shot_sampler.probabilities(runner._final_state(), runner.n)
+    t_cdf = _median_s(lambda: shot_sampler.ShotSampler(probs), repeats)
+    sampler = shot_sampler.ShotSampler(probs)
+    curve = [(shots, _median_s(lambda: sampler.counts(shots, runner.rng), repeats)) for shots in shot_counts]
+    return t_exec, t_cdf, curve
+
+
+def crossover(t_exec: float, curve: list) -> int:
+    """Primer número de shots cuyo muestreo cuesta al menos lo mismo que la simulación, o None."""
+    return next((shots for shots, t_sampling in curve if t_sampling >= t_exec), None)
+
+
+def print_curves(console: Console, framework: str, rows: list) -> None:
+    table = Table(title=f"Sampling vs simulation cost ({framework})")
+    for column in ("n", "Cores", "Simulation (s)", "CDF (s)", "1 shot (s)", "Max shots", "Max shots (s)",
+                   "Crossover shots"):
+        table.add_column(column, justify="right")
+    for n, cores, t_exec, t_cdf, curve in rows:
+        point = crossover(t_exec, curve)
+        table.add_row(str(n), str(cores), f"{t_exec:.6f}", f"{t_cdf:.6f}", f"{curve[0][1]:.6f}", f"{curve[-1][0]:,}",
+                      f"{curve[-1][1]:.6f}", f"{point:,}" if point else "-")
+    console.print(table)
+
+
+def measure_cores(framework: str, build_runner, n_values: list[int], cores: int, shot_counts: list[int], args,
+                  console: Console) -> list:
+    """Curvas de cada n con un número de núcleos fijo, como filas (n, cores, t_exec_s, t_cdf_s, curva)."""
+    rows = []
+    for n in n_values:
+        console.print(f"Sampling {framework} n={n}, {cores} cores, {len(shot_counts)} shot counts...",
+                      style="bright_magenta")
+        runner = build_runner(n, cores, {'sampler': 'vector'}, 1, args.precision, console)
+        rows.append((n, cores, *shot_curve(runner, shot_counts, args.repeats)))
+        del runner
+    return rows
+
+
+def run_child(cores: int, args) -> list:
+    """Mide un número de núcleos en un proceso hijo con las variables de hilos fijadas antes de importar el simulador."""
+    command = [sys.executable, os.path.abspath(__file__), args.n, "--child", "--cores", str(cores),
+               "--max-shots", str(args.max_shots), "--per-decade", str(args.per_decade),
+               "--repeats", str(args.repeats), "--precision", args.precision]
+    output = subprocess.run(command, env=thread_env(cores), stdout=subprocess.PIPE, text=True, check=True).stdout
+    return [json.loads(line[len(RESULT_PREFIX):]) for line in output.splitlines() if line.startswith(RESULT_PREFIX)]
+
+
+def main():
+    # El simulador declara cómo construir un runner con unas opciones
+    from grover_runner import FRAMEWORK, build_runner
+
+    parser = argparse.ArgumentParser(description=f"Time {FRAMEWORK} shot sampling against geometric shot counts, "
+                                                 "simulating the state once per n")
+    parser.add_argument("n", type=str, help="Qubit counts (e.g. '20', '20-24' or '20,22,24')")
+    parser.add_argument("--cores", type=str, default=str(os.cpu_count()), help="Core counts (e.g. '8,16')")
+    parser.add_argument("--max-shots", type=float, default=DEFAULT_MAX_SHOTS, help="Largest shot count (default: 1e7)")
+    parser.add_argument("--per-decade", type=int, default=1, help="Shot counts per decade (default: 1)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per point (default: 5)")
+    parser.add_argument("--precision", type=str, default="double", choices=["double", "single"])
+    parser.add_argument("--out", type=str, default=f"shot_scaling_{FRAMEWORK}.csv", help="Output CSV file")
+    parser.add_argument("--child", action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    try:
+        n_values = parse_int_axis(args.n, "n")
+        cores_values = parse_int_axis(args.cores, "cores")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    shot_counts = geometric_shots(int(args.max_shots), args.per_decade)
+
+    if args.child:
+        # Proceso hijo: un único número de núcleos; las filas salen como JSON por la salida estándar
+        pin_cores(cores_values[0])
+        for row in measure_cores(FRAMEWORK, build_runner, n_values, cores_values[0], shot_counts, args,
+                                 Console(stderr=True)):
+            print(RESULT_PREFIX + json.dumps(row), flush=True)
+        return
+
+    console = Console()
+    rows = []
+    with open(args.out, "w", newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for cores in cores_values:
+            try:
+                child_rows = run_child(cores, args)
+            except subprocess.CalledProcessError as e:
+                console.print(f"Sampling with {cores} cores failed with exit code {e.returncode}", style="red")
+                continue
+            for n, _, t_exec, t_cdf, curve in child_rows:
+                for shots, t_sampling in curve:
+                    writer.writerow({'framework': FRAMEWORK, 'n': n, 'cores': cores, 'shots': shots,
+                                     't_exec_s': t_exec, 't_sampling_s': t_sampling, 't_cdf_s': t_cdf})
+            csv_file.flush()
+            rows.extend(child_rows)
+    if not rows:
+        sys.exit(1)
+    print_curves(console, FRAMEWORK, rows)
+    console.print(f"Shot scaling saved to {args.out}", style="bold green")
+
+if __name__ == "__main__":
+    main()
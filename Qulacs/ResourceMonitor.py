@@ -3,12 +3,11 @@ import time
 import psutil
 import csv
 import os
-import matplotlib.pyplot as plt
 import rich
 from rich.console import Console
-from matplotlib.ticker import MaxNLocator
-import matplotlib
 import datetime
+import json
+import numpy as np
 
 
 console = Console()
@@ -60,7 +59,6 @@ class RAMMonitor:
         self.thread.join()
 
     def average(self):
-        print("Readings for the memory avg", self.readings)
         return sum(self.readings) / len(self.readings) if self.readings else 0.0
             
     def max_memory_usage(self):
@@ -73,26 +71,143 @@ class RAMMonitor:
 
     def max_memory_usage_in_mb(self):
         return max(self.readings) * psutil.virtual_memory().total / (1024 * 1024 * 100) if self.readings else 0.0
-    
-    
-    def real_time_memory_usage(self, file_name):
+
+# Registro binario de la traza de memoria: segundos desde el inicio, RSS en bytes y
+# marcador de fase (0 = sin marcador, k = k-ésima etiqueta del fichero .markers.json)
+TRACE_DTYPE = np.dtype([('t', '<f8'), ('rss', '<u8'), ('marker', '<u4')])
+
+class MemoryTraceRecorder:
+    """Traza de memoria a alta frecuencia (hasta 1 kHz) en registros binarios de ancho fijo."""
+    def __init__(self, file_name, rate_hz=1000, block_size=4096):
+        self.file_name = file_name
+        self.interval = 1.0 / min(rate_hz, 1000)
+        # Buffer preasignado: el hilo de muestreo no reserva memoria y vuelca bloques completos
+        self.buffer = np.zeros(block_size, dtype=TRACE_DTYPE)
+        self.markers = []
+        self._pending_marker = 0
+        self._lock = threading.Lock()
+        self._monitoring = False
+        self._start_time = None
+
+    def _monitor(self):
         process = psutil.Process()
-        if not os.path.isfile(file_name):
-            with open(file_name, mode='w', newline='') as csv_file:
-                csv_writer = csv.writer(csv_file)
-                csv_writer.writerow(['Time', 'RAM Usage (MB)'])
-        
-        with open(file_name, mode='a', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file)
-            start_time = time.perf_counter()
+        count = 0
+        next_time = time.perf_counter()
+        with open(self.file_name, 'ab') as trace_file:
             while self._monitoring:
-                elapsed = time.perf_counter() - start_time
-                mem_usage = process.memory_info().rss / (1024 * 1024)
-                current_time = f"{elapsed:.3f}"  # Tiempo relativo en segundos
-                csv_writer.writerow([current_time, mem_usage])
-                csv_file.flush()
-                next_time = elapsed + self.interval
-                time.sleep(max(0, next_time - (time.perf_counter() - start_time)))
+                now = time.perf_counter()
+                with self._lock:
+                    marker, self._pending_marker = self._pending_marker, 0
+                self.buffer[count] = (now - self._start_time, process.memory_info().rss, marker)
+                count += 1
+                if count == len(self.buffer):
+                    self.buffer.tofile(trace_file)
+                    count = 0
+                next_time += self.interval
+                time.sleep(max(0, next_time - time.perf_counter()))
+            self.buffer[:count].tofile(trace_file)
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        self._monitoring = True
+        self.thread = threading.Thread(target=self._monitor)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def mark(self, label):
+        """Marca el comienzo de una fase; se asocia al siguiente registro de la traza."""
+        if not self._monitoring:
+            return
+        with self._lock:
+            self.markers.append({'id': len(self.markers) + 1, 'label': label,
+                                 't': time.perf_counter() - self._start_time})
+            self._pending_marker = len(self.markers)
+
+    def stop(self):
+        self._monitoring = False
+        self.thread.join()
+        with open(self.file_name + '.markers.json', 'w') as f:
+            json.dump({'dtype': TRACE_DTYPE.descr, 'interval': self.interval,
+                       'markers': self.markers}, f, indent=2)
+
+def _pyplot():
+    """Importa matplotlib.pyplot al dibujar la primera gráfica, no al cargar el módulo (retrasa el arranque)."""
+    import matplotlib.pyplot as plt
+    return plt
+
+def load_ram_trace(file_name):
+    """Carga una traza binaria de memoria y sus marcadores de fase."""
+    trace = np.fromfile(file_name, dtype=TRACE_DTYPE)
+    markers = []
+    if os.path.isfile(file_name + '.markers.json'):
+        with open(file_name + '.markers.json') as f:
+            markers = json.load(f)['markers']
+    return trace, markers
+
+def plot_ram_trace(file_name):
+    """
+    Crea una gráfica de la traza binaria de memoria con las fases marcadas.
+
+    Parámetros:
+    file_name: str - Nombre del archivo .bin generado por MemoryTraceRecorder.
+    """
+    plt = _pyplot()
+    trace, markers = load_ram_trace(file_name)
+    if len(trace) < 2:
+        console.print("Not enough data to plot.", style="bold red")
+        return
+
+    plt.figure(figsize=(10, 5))
+    plt.plot(trace['t'], trace['rss'] / (1024 * 1024), linestyle='-', color='b')
+    for marker in markers:
+        plt.axvline(marker['t'], color='gray', linestyle='--', linewidth=0.8)
+        plt.text(marker['t'], plt.ylim()[1], marker['label'], rotation=90, va='top', ha='right', fontsize=8)
+    plt.xlabel('Elapsed Time (seconds)')
+    plt.ylabel('RAM Usage (MB)')
+    plt.title('RAM Usage Over Time')
+    plt.tight_layout()
+
+    png_file_name = os.path.splitext(file_name)[0] + '.png'
+    plt.savefig(png_file_name)
+    plt.close()
+    console.print(f"Graph saved as {png_file_name}", style="bold green")
+
+class SampleProbe:
+    """Lecturas de recursos asociadas a cada muestra de tiempo (RSS y CPU del proceso)."""
+    def __init__(self):
+        self.process = psutil.Process()
+        self._last_cpu = self._cpu_time()
+
+    def _cpu_time(self):
+        cpu_times = self.process.cpu_times()
+        return cpu_times.user + cpu_times.system
+
+    def reset(self):
+        """Marca el inicio de una muestra."""
+        self._last_cpu = self._cpu_time()
+
+    def read(self):
+        """Devuelve (RSS en MB, segundos de CPU consumidos desde reset())."""
+        rss_mb = self.process.memory_info().rss / (1024 * 1024)
+        return rss_mb, self._cpu_time() - self._last_cpu
+
+def process_uptime():
+    """Segundos desde la creación del proceso (create_time de psutil, con la resolución del reloj del sistema)."""
+    return time.time() - psutil.Process().create_time()
+
+# Si ya se ha registrado la primera ejecución medida del proceso
+_first_sample_done = False
+
+def time_to_first_sample():
+    """
+    process_uptime() en la primera llamada del proceso y None en las siguientes: en un barrido solo la
+    primera ejecución paga el arranque (importaciones, inicialización del simulador).
+    """
+    global _first_sample_done
+    if _first_sample_done:
+        return None
+    _first_sample_done = True
+    return process_uptime()
 
 def create_ram_usage_csv(file_name, time, ram_usage):
 
@@ -110,6 +225,8 @@ def plot_ram_usage_from_csv(file_name):
     Parámetros:
     file_name: str - Nombre del archivo CSV.
     """
+    plt = _pyplot()
+    from matplotlib.ticker import MaxNLocator
     print(file_name)
     times = []
     ram_usages = []
@@ -120,11 +237,14 @@ def plot_ram_usage_from_csv(file_name):
         start_time = None
         for row in csv_reader:
             try:
-                current_time = time.strptime(row[0], "%H:%M:%S")
+                # Segundos transcurridos; los ficheros más antiguos usan %H:%M:%S
+                if ':' in row[0]:
+                    current_time = time.mktime(time.strptime(row[0], "%H:%M:%S"))
+                else:
+                    current_time = float(row[0])
                 if start_time is None:
                     start_time = current_time
-                elapsed_time = time.mktime(current_time) - time.mktime(start_time)
-                times.append(elapsed_time)
+                times.append(current_time - start_time)
                 ram_usages.append(float(row[1]))
             except ValueError as e:
                 console.print(f"Skipping row due to error: {e}", style="bold red")
@@ -154,6 +274,7 @@ def plot_ram_avg_from_results(file_name):
     Parámetros:
     file_name: str - Nombre del archivo CSV.
     """
+    plt = _pyplot()
     try:
         qubits = []
         ram_mb = []
@@ -190,6 +311,7 @@ def plot_t_grover_from_csv(file_name):
     Parámetros:
     file_name: str - Nombre
     """
+    plt = _pyplot()
     try:
         n_values = []
         t_grover_values = []
@@ -0,0 +1,130 @@
+import math
+import numpy as np
+
+# Factor que convierte la MAD en un estimador de la desviación típica (distribución normal)
+MAD_TO_STD = 1.4826
+
+# Umbral del z-score modificado (Iglewicz y Hoaglin) para marcar una muestra como atípica
+OUTLIER_THRESHOLD = 3.5
+
+# Número máximo de valores remuestreados por bloque en el bootstrap (acota la memoria)
+BOOTSTRAP_CHUNK = 1 << 22
+
+# Ventana de muestras y variación relativa máxima entre ventanas consecutivas del régimen estacionario
+STEADY_WINDOW = 5
+STEADY_REL_TOL = 0.05
+
+# Claves añadidas al diccionario de resultados por summarize(), en segundos
+STAT_KEYS = ('t_median', 't_p5', 't_p95', 't_p99', 't_mad', 't_ci_low', 't_ci_high', 'n_outliers')
+
+
+def mad(values) -> float:
+    """Desviación absoluta mediana."""
+    values = np.asarray(values, dtype=np.float64)
+    return float(np.median(np.abs(values - np.median(values))))
+
+
+def outlier_mask(values, threshold: float = OUTLIER_THRESHOLD) -> np.ndarray:
+    """
+    Marca las muestras atípicas según el z-score modificado basado en la MAD.
+
+    Parámetros:
+    values: array - Muestras de tiempo.
+    threshold: float - Valor del z-score modificado a partir del cual una muestra es atípica.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    deviation = mad(values)
+    if deviation == 0:
+        return np.zeros(len(values), dtype=bool)
+    return np.abs(values - np.median(values)) / (MAD_TO_STD * deviation) > threshold
+
+
+def bootstrap_ci(values, statistic=np.median, n_boot: int = 2000, confidence: float = 0.95,
+                 seed: int = None) -> tuple:
+    """
+    Intervalo de confianza por bootstrap percentil, remuestreando con NumPy por bloques.
+
+    Parámetros:
+    values: array - Muestras de tiempo.
+    statistic: callable - Estadístico con argumento axis (np.median, np.mean...).
+    n_boot: int - Número de remuestreos.
+    confidence: float - Nivel de confianza del intervalo.
+    seed: int - Semilla del generador (reproducibilidad).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        value = float(statistic(values)) if len(values) else math.nan
+        return value, value
+    rng = np.random.default_rng(seed)
+    # Cada bloque remuestrea a la vez tantas réplicas como quepan en BOOTSTRAP_CHUNK valores
+    chunk = max(1, BOOTSTRAP_CHUNK // len(values))
+    estimates = np.empty(n_boot)
+    for start in range(0, n_boot, chunk):
+        stop = min(start + chunk, n_boot)
+        indices = rng.integers(0, len(values), size=(stop - start, len(values)))
+        estimates[start:stop] = statistic(values[indices], axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(estimates, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def summarize(times_ns, n_boot: int = 2000, confidence: float = 0.95, seed: int = None) -> dict:
+    """Resumen robusto de las muestras (en segundos): mediana, percentiles, MAD, IC y atípicos."""
+    if len(times_ns) == 0:
+        return {key: None for key in STAT_KEYS}
+    seconds = np.asarray(times_ns, dtype=np.float64) / 1e9
+    p5, p95, p99 = np.percentile(seconds, [5, 95, 99])
+    ci_low, ci_high = bootstrap_ci(seconds, np.median, n_boot, confidence, seed)
+    return {
+        't_median': float(np.median(seconds)),
+        't_p5': float(p5),
+        't_p95': float(p95),
+        't_p99': float(p99),
+        't_mad': mad(seconds),
+        't_ci_low': ci_low,
+        't_ci_high': ci_high,
+        'n_outliers': int(outlier_mask(seconds).sum()),
+    }
+
+
+def required_samples(times_ns, z: float, rel_error: float) -> int:
+    """
+    Número de muestras para estimar el tiempo con el error relativo pedido.
+
+    Usa la mediana y la MAD escalada en lugar de la media y la desviación típica, de modo
+    que unas pocas ejecuciones interrumpidas no disparan el número de iteraciones.
+
+    Parámetros:
+    times_ns: list - Muestras iniciales en nanosegundos.
+    z: float - Valor z del nivel de confianza.
+    rel_error: float - Error relativo admitido.
+    """
+    center = float(np.median(times_ns))
+    if center <= 0:
+        return len(times_ns)
+    spread = MAD_TO_STD * mad(times_ns)
+    return math.ceil((2 * z * spread) / (rel_error * center)) ** 2
+
+
+def steady_state_start(times, window: int = STEADY_WINDOW, rel_tol: float = STEADY_REL_TOL) -> int:
+    """
+    Índice de la primera muestra del régimen estacionario, o None si la serie aún no se ha estabilizado.
+
+    Se busca la primera ventana de window muestras cuya mediana difiere menos de rel_tol (relativo)
+    de la mediana de la ventana siguiente, y se descartan sus primeras muestras mientras sigan siendo
+    más lentas que esa mediana: todo lo anterior es calentamiento.
+
+    Parámetros:
+    times: list - Muestras de tiempo en orden de ejecución.
+    window: int - Muestras por ventana.
+    rel_tol: float - Variación relativa admitida entre las medianas de dos ventanas consecutivas.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    for start in range(len(times) - 2 * window + 1):
+        current = np.median(times[start:start + window])
+        following = np.median(times[start + window:start + 2 * window])
+        if abs(current - following) <= rel_tol * following:
+            while times[start] > (1 + rel_tol) * following:
+                start += 1
+            return start
+    return None
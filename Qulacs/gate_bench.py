@@ -0,0 +1,29 @@
+from qulacs import QuantumState
+from qulacs.gate import H, X
+import microbench
+from grover_runner import mcz_gates, available_oracles, diagonal_bytes
+
+
+def kernels(n: int, threads: int) -> dict:
+    """Puertas del circuito de Grover aplicadas directamente sobre un estado de n qubits."""
+    state = QuantumState(n)
+
+    def apply(gate_list):
+        for gate in gate_list:
+            gate.update_quantum_state(state)
+
+    h, x = H(0), X(0)
+    result = {
+        'H': (lambda: h.update_quantum_state(state), None),
+        'X': (lambda: x.update_quantum_state(state), None),
+    }
+    # Una variante de la Z multicontrolada por cada implementación del oráculo que cabe con n qubits
+    for oracle in available_oracles(n):
+        mcz = mcz_gates(n, oracle)
+        result[f'MCZ ({oracle})'] = ((lambda mcz=mcz: apply(mcz)), None)
+    result['measure'] = (lambda: state.sampling(microbench.MEASURE_SHOTS), None)
+    return result
+
+
+if __name__ == "__main__":
+    microbench.main("qulacs", kernels, extra_bytes=diagonal_bytes)
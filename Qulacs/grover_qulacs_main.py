@@ -1,94 +1,210 @@
 import argparse
+import json
 import os
+import subprocess
 import sys
-import threading
-from rich.console import Console
 import ResourceMonitor
-from grover_runner import GroverRunner
-from results_handler import ResultsHandler
-import psutil
-
-def set_active_cores(cores: int) -> int:
-    """Configura el número de núcleos activos."""
-    os.environ["OMP_NUM_THREADS"] = str(cores)
-    os.environ["MKL_NUM_THREADS"] = str(cores)
-    os.environ["NUMEXPR_NUM_THREADS"] = str(cores)
-    os.environ["VECLIB_MAXIMUM_THREADS"] = str(cores)
-    os.environ["OPENBLAS_NUM_THREADS"] = str(cores)
-    
-    actual_cores = os.cpu_count()
-    if cores < actual_cores:
-
-        p = psutil.Process()
-        cores_to_use = list(range(cores))
-        p.cpu_affinity(cores_to_use)
-        console.print(f"Disabled {actual_cores - cores} cores, using cores: {cores_to_use}", style="bold blue")
-        return cores
-    return actual_cores
+import memory_traffic
+import tuning
+from results_handler import ResultsHandler, StreamingConsole
+import sweep_config
+import results_db
+from thread_env import pin_cores, thread_env
+
+# Prefijo de las líneas con el resumen de cada ejecución que un proceso hijo escribe en la salida estándar
+RESULT_PREFIX = "SWEEP "
+
+def active_cores(run: dict) -> int:
+    """Número de núcleos con el que se ejecuta una configuración del barrido (None = todos)."""
+    return min(run['cores'] or os.cpu_count(), os.cpu_count())
+
+def run_child(cores: int, results_dir: str, db_run_id: int) -> list:
+    """
+    Ejecuta las configuraciones con cores núcleos en un proceso hijo con las variables de hilos fijadas antes de
+    importar el simulador (Qulacs toma sus hilos de OMP_NUM_THREADS al cargarse), y devuelve sus resúmenes.
+    """
+    command = [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--child-cores", str(cores),
+               "--results-dir", results_dir]
+    if db_run_id is not None:
+        command += ["--db-run-id", str(db_run_id)]
+    output = subprocess.run(command, env=thread_env(cores), stdout=subprocess.PIPE, text=True, check=True).stdout
+    return [json.loads(line[len(RESULT_PREFIX):]) for line in output.splitlines() if line.startswith(RESULT_PREFIX)]
+
+def run_cores(cores: int, runs: list, spec: dict, args, times_file_name: str) -> None:
+    """Proceso hijo: ejecuta las configuraciones de un número de núcleos y escribe sus resúmenes como JSON."""
+    results_dir = args.results_dir
+    # La salida estándar queda para los resúmenes; la consola escribe en stderr y en el registro del barrido
+    console = StreamingConsole(os.path.join(results_dir, "out.txt"), stderr=True)
+    pin_cores(cores)
+    console.print(f"Using cores: {list(range(cores))}", style="bold blue")
+    # El simulador se importa con la afinidad y las variables de hilos ya fijadas
+    from grover_runner import GroverRunner, FRAMEWORK
+    spec_hash = sweep_config.spec_hash(spec)
+
+    # Inicializar manejador de resultados
+    results_handler = ResultsHandler(times_file_name, results_dir, console, db_path=args.db,
+                                     flush_every=args.flush_every, fsync=args.fsync, db_run_id=args.db_run_id)
+
+    namespace = tuning.framework_namespace(FRAMEWORK)
+    stream_gbs = None
+    # Ejecutar cada configuración del barrido
+    for i, run in runs:
+        n = run['n']
+        console.print(f"Running Grover's algorithm with {n} qubits and {cores} cores...", style="bright_magenta")
+        cpu_monitor = ResourceMonitor.CPUMonitor(interval=0.1) if args.cpu else None
+        ram_monitor = ResourceMonitor.RAMMonitor(interval=0.1) if args.ram else None
+        
+        ram_csv_file = os.path.join(results_dir, f"ram_usage_n{n}.csv")
+        ram_trace = None
+        if args.ram_trace_hz > 0:
+            ram_trace = ResourceMonitor.MemoryTraceRecorder(os.path.join(results_dir, f"ram_trace_{i:03d}_n{n}.bin"),
+                                                            rate_hz=args.ram_trace_hz)
+            ram_trace.start()
+            ram_trace.mark("build")
+        tuned_options = tuning.lookup(namespace, n, cores, run['precision'], args.tuning_cache) if args.tuning_cache else {}
+        if tuned_options:
+            console.print(f"Applying tuned options: {tuned_options}", style="bold blue")
+        grover_runner = GroverRunner(n, cores, ram_monitor, cpu_monitor, console, ram_csv_file,
+                                     precision=run['precision'], backend_options=run['options'],
+                                     sampling=spec['sampling'], ram_trace=ram_trace, tuned_options=tuned_options)
+        results = grover_runner.run()
+        if ram_trace:
+            ram_trace.stop()
+            ResourceMonitor.plot_ram_trace(ram_trace.file_name)
+        results['spec_hash'] = spec_hash
+        if args.roofline:
+            if stream_gbs is None:
+                stream_gbs = memory_traffic.stream_triad(cores)
+                console.print(f"NumPy triad bandwidth with {cores} cores: {stream_gbs:.2f} GB/s", style="bold blue")
+            results['stream_gbs'] = stream_gbs
+        
+        results_handler.display_timing_table(results)
+        results_handler.display_usage_table(results)
+        results_handler.display_bandwidth_table(results)
+        results_handler.display_circuit_table(results)
+        results_handler.save_samples(results)
+        results_handler.save_to_csv(results)
+        results_handler.save_to_db(results)
+        summary = {key: results.get(key) for key in ('n', 'cores', 'shots', 't_grover', 't_median', 'options')}
+        print(RESULT_PREFIX + json.dumps(summary), flush=True)
+
+    results_handler.close()
+    results_handler.save_console_output()
 
 def main():
     parser = argparse.ArgumentParser(description="Run Grover's algorithm with a specified number of qubits")
-    parser.add_argument("n", type=str, help="Number of qubits or range (e.g., '4' or '4-7')")
+    parser.add_argument("n", type=str, nargs='?', help="Number of qubits or range (e.g., '4' or '4-7')")
     parser.add_argument("--cores", type=int, default=os.cpu_count(), help="Number of CPU cores to use")
     parser.add_argument("--no-ram", action='store_false', dest='ram', default=True, help="Do not monitor RAM")
     parser.add_argument("--no-cpu", action='store_false', dest='cpu', default=True, help="Do not monitor CPU")
+    parser.add_argument("--db", type=str, default=results_db.DEFAULT_DB, help="SQLite results database shared by all frameworks")
+    parser.add_argument("--no-db", action='store_const', const=None, dest='db', help="Do not write results to the database")
+    parser.add_argument("--flush-every", type=int, default=1, help="Write results to disk every N rows")
+    parser.add_argument("--fsync", action='store_true', default=False, help="fsync results files on every flush")
+    parser.add_argument("--ram-trace-hz", type=int, default=0, help="Record a binary RAM trace of every run at this rate (max 1000 Hz, 0 = off)")
+    parser.add_argument("--min-sample-time", type=float, default=None,
+                        help="Minimum duration of each timed sample in seconds; faster runs are repeated inside the sample (default: 0.01)")
+    parser.add_argument("--roofline", action='store_true', default=False,
+                        help="Run a STREAM-like NumPy triad per core count and report the fraction of it each run achieves")
+    parser.add_argument("--oracle", type=str, default=None,
+                        help="Multi-controlled Z implementation(s) for the oracle and diffuser, compared side by side "
+                             "(e.g. 'dense,diagonal,mcx_h'; default: dense)")
+    parser.add_argument("--optimizer", type=str, default=None,
+                        help="Circuit optimizer pass(es) applied before running, compared side by side "
+                             "(e.g. 'none,light,merge'; default: none)")
+    parser.add_argument("--block-size", type=str, default=None,
+                        help="Maximum block size(s) in qubits for the 'merge' optimizer (e.g. '2,3'; default: 2)")
+    parser.add_argument("--ir-fusion", type=str, default=None,
+                        help="Fusion pass(es) of the shared circuit IR, compared side by side: 0 = off, 1 = fuse the "
+                             "single-qubit gates of each qubit, k = also group them into k-qubit dense blocks (e.g. '0,1,2')")
+    parser.add_argument("--sampler", type=str, default=None,
+                        help="Shot sampling mode(s), compared side by side: 'native' runs the circuit without sampling, "
+                             "'vector' reads the final state once and draws all shots with shot_sampler.py (default: native)")
+    parser.add_argument("--rng", type=str, default=None,
+                        help="NumPy bit generator(s) used by the vector sampler: 'pcg64' or 'philox' (default: pcg64)")
+    parser.add_argument("--shots", type=str, default=None,
+                        help="Shot count(s) drawn by the vector sampler after every execution (default: 1024)")
+    parser.add_argument("--tuning-cache", type=str, default=tuning.DEFAULT_CACHE,
+                        help="Tuning cache written by tuning.py; tuned options for this host are applied automatically")
+    parser.add_argument("--no-tuning", action='store_const', const=None, dest='tuning_cache',
+                        help="Run with the default options even if tuned ones are cached")
+    parser.add_argument("--config", type=str, default=None, help="Sweep file (TOML/YAML) describing the runs to execute")
+    parser.add_argument("--child-cores", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--results-dir", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--db-run-id", type=int, default=None, help=argparse.SUPPRESS)
     args = parser.parse_args()
+    if args.config is None and args.n is None:
+        parser.error("n is required unless --config is given")
 
-    # Parsear qubits
-    if '-' in args.n:
-        start, end = map(int, args.n.split('-'))
-        if start >= end:
-            print("Error: Invalid range of qubits.")
-            sys.exit(1)
-        qubits_list = range(start, end + 1)
-    else:
-        n = int(args.n)
-        if n <= 2:
-            print("Error: Number of qubits must be greater than 2.")
-            sys.exit(1)
-        qubits_list = [n]
+    # Construir el barrido (fichero de configuración o argumentos clásicos)
+    try:
+        if args.config:
+            spec = sweep_config.load_sweep(args.config)
+        else:
+            options = {key: value.split(',') for key, value in (('oracle', args.oracle),
+                                                                  ('optimizer', args.optimizer), ('sampler', args.sampler),
+                                                                  ('rng', args.rng)) if value}
+            if args.block_size:
+                options['block_size'] = [int(size) for size in args.block_size.split(',')]
+            if args.ir_fusion:
+                options['ir_fusion'] = [int(fusion) for fusion in args.ir_fusion.split(',')]
+            if args.shots:
+                options['shots'] = [int(shots) for shots in args.shots.split(',')]
+            spec = sweep_config.spec_from_args("qulacs", args.n, cores=args.cores, options=options)
+        runs = sweep_config.expand_sweep(spec, "qulacs", axes=("cores", "precision", "n"))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not runs:
+        print("Nothing to run for qulacs in this sweep.")
+        sys.exit(0)
+    if args.min_sample_time is not None:
+        spec['sampling']['min_sample_time'] = args.min_sample_time
+    times_file_name = f"Grover_data_qulacs_{spec['name']}"
+    if args.child_cores is not None:
+        # Proceso hijo: solo las configuraciones de su número de núcleos, en la carpeta creada por el padre
+        run_cores(args.child_cores, [(i, run) for i, run in enumerate(runs) if active_cores(run) == args.child_cores],
+                  spec, args, times_file_name)
+        return
+    spec_hash = sweep_config.spec_hash(spec)
 
     # Configurar directorio de resultados
-    results_dir = f"results_{args.n}_qubits_{args.cores}_cores"
+    if args.config:
+        results_dir = f"results_sweep_{spec['name']}_{spec_hash[:8]}"
+    else:
+        results_dir = f"results_{args.n}_qubits_{args.cores}_cores"
     index = 0
     base_dir = results_dir
     while os.path.exists(results_dir):
         index += 1
         results_dir = f"{base_dir}({index})"
     os.makedirs(results_dir)
+    sweep_config.save_spec(spec, results_dir)
 
     # Configurar núcleos
-    actual_cores = os.cpu_count()
-    args.cores = min(args.cores, actual_cores)
-    console = Console(record=True)
+    args.cores = min(args.cores, os.cpu_count())
+    console = StreamingConsole(os.path.join(results_dir, "out.txt"))
     console.print(f"Using {args.cores} cores", style="bold green")
-    set_active_cores(args.cores)
 
-    # Inicializar manejador de resultados
-    times_file_name = f'Grover_data_qulacs_{args.n}'
-    results_handler = ResultsHandler(times_file_name, results_dir, console)
+    # Todos los procesos hijos añaden sus filas a una misma ejecución de la base de datos
+    db_run_id = None
+    if args.db:
+        db = results_db.ResultsDB(args.db)
+        db_run_id = db.start_run(results_dir)
+        db.close()
 
-    # Monitoreo continuo de RAM
-    # file_name = os.path.join(results_dir, f"grover_qulacs_{args.n}_qubits_{args.cores}_cores.csv")
-    # if args.ram:
-    #     ram_monitor_continuous = ResourceMonitor.RAMMonitor()
-    #     monitor_thread = threading.Thread(target=ram_monitor_continuous.real_time_memory_usage, args=(file_name,))
-    #     monitor_thread.daemon = True
-    #     monitor_thread.start()
-
-    # Ejecutar para cada n
-    for n in qubits_list:
-        console.print(f"Running Grover's algorithm with {n} qubits and {args.cores} cores...", style="bright_magenta")
-        cpu_monitor = ResourceMonitor.CPUMonitor(interval=0.1) if args.cpu else None
-        ram_monitor = ResourceMonitor.RAMMonitor(interval=0.1) if args.ram else None
-        
-        ram_csv_file = os.path.join(results_dir, f"ram_usage_n{n}.csv")
-        grover_runner = GroverRunner(n, args.cores, ram_monitor, cpu_monitor, console, ram_csv_file)
-        results = grover_runner.run()
-        
-        results_handler.display_timing_table(results)
-        results_handler.display_usage_table(results)
-        results_handler.save_to_csv(results)
+    # Cada número de núcleos se ejecuta en su propio proceso hijo, con sus hilos y su afinidad
+    # Resumen ligero de cada ejecución para elegir la configuración más rápida por n
+    summaries = []
+    for cores in dict.fromkeys(active_cores(run) for run in runs):
+        try:
+            summaries.extend(run_child(cores, results_dir, db_run_id))
+        except subprocess.CalledProcessError as e:
+            console.print(f"Runs with {cores} cores failed with exit code {e.returncode}", style="red")
+
+    results_handler = ResultsHandler(times_file_name, results_dir, console)
+    results_handler.display_fastest_options(summaries)
+    results_handler.close()
 
     # Finalizar
     if args.ram:
@@ -100,5 +216,4 @@ def main():
     results_handler.save_console_output()
 
 if __name__ == "__main__":
-    console = Console(record=True)
-    main()
\ No newline at end of file
+    main()
@@ -1,71 +1,280 @@
 from qulacs import QuantumState, QuantumCircuit
-from qulacs.gate import Z, H, X, to_matrix_gate
-import math
+from qulacs.circuit import QuantumCircuitOptimizer
+from qulacs.gate import Z, H, X, to_matrix_gate, DiagonalMatrix, DenseMatrix
+import numpy as np
 import statistics
 import time
 from rich.console import Console
-import threading
 from datetime import datetime
+from sweep_config import DEFAULT_SAMPLING
+import bench_stats
+import circuit_ir
+import memory_traffic
+import shot_sampler
+from timing import SampleTimer
+from ResourceMonitor import SampleProbe, time_to_first_sample
+
+def _controlled(gate, n: int):
+    """
+    Puerta de un qubit sobre el último qubit, controlada por los demás.
+
+    Las puertas de Qulacs con nombre (Z, X) no admiten controles desde Python: solo QuantumGateMatrix tiene
+    add_control_qubit. La matriz es la 2x2 de la puerta y solo se aplica a las amplitudes con todos los
+    controles a 1, así que con Z es el cambio de fase de |1...1> sin ninguna matriz de 2^n.
+    """
+    controlled = to_matrix_gate(gate)
+    for i in range(n - 1):
+        controlled.add_control_qubit(i, 1)
+    return controlled
+
+# La diagonal de la MCZ ocupa tanto como el vector de estado: por encima de este tamaño no se admite
+DIAGONAL_MAX_QUBITS = 26
+
+def diagonal_bytes(n: int) -> int:
+    """Bytes de la diagonal de la MCZ sobre n qubits (complex128), o 0 si el oráculo diagonal no se admite."""
+    return 16 * 2**n if n <= DIAGONAL_MAX_QUBITS else 0
+
+def _diagonal_mcz(n: int):
+    """Cambio de fase de |1...1> como matriz diagonal sobre todos los qubits."""
+    if n > DIAGONAL_MAX_QUBITS:
+        raise ValueError(f"The diagonal oracle stores a 2^n diagonal: at most {DIAGONAL_MAX_QUBITS} qubits (got {n})")
+    diagonal = np.ones(2**n, dtype=np.complex128)
+    diagonal[-1] = -1
+    return DiagonalMatrix(list(range(n)), diagonal)
+
+# Implementaciones de la Z multicontrolada usada por el oráculo y el difusor. dense es la Z controlada
+# (matriz 2x2 con n-1 controles); diagonal es la única que guarda una matriz de 2^n elementos
+ORACLES = {
+    "dense": lambda n: [_controlled(Z(n - 1), n)],
+    "diagonal": lambda n: [_diagonal_mcz(n)],
+    "mcx_h": lambda n: [H(n - 1), _controlled(X(n - 1), n), H(n - 1)],
+}
+DEFAULT_ORACLE = "dense"
+# Oráculos cuya MCZ se construye una sola vez y comparten todas las apariciones (SharedGateCircuit)
+SHARED_ORACLES = {"diagonal"}
+
+def mcz_gates(n: int, oracle: str = DEFAULT_ORACLE) -> list:
+    """Puertas de la Z sobre el último qubit controlada por los demás, con la implementación indicada."""
+    if oracle not in ORACLES:
+        raise ValueError(f"Unknown Qulacs oracle '{oracle}' (choose from {', '.join(ORACLES)})")
+    return ORACLES[oracle](n)
+
+def available_oracles(n: int) -> list[str]:
+    """Oráculos que se pueden construir con n qubits (el diagonal, solo hasta DIAGONAL_MAX_QUBITS)."""
+    return [oracle for oracle in ORACLES if oracle != "diagonal" or n <= DIAGONAL_MAX_QUBITS]
+
+class SharedGateCircuit:
+    """
+    Circuito de Qulacs partido en tramos separados por una misma puerta, que se aplica sin copiarla.
+
+    QuantumCircuit.add_gate copia cada puerta y una copia de la MCZ diagonal ocupa tanto como el
+    vector de estado; aquí se construye una vez y se aplica entre cada par de tramos consecutivos.
+    Ofrece la parte de la interfaz de QuantumCircuit que usa el runner.
+    """
+
+    def __init__(self, n: int, shared_gate, segments: list = None):
+        self.n = n
+        self.shared_gate = shared_gate
+        self.segments = segments or [QuantumCircuit(n)]
+
+    def add_gate(self, gate) -> None:
+        self.segments[-1].add_gate(gate)
+
+    def add_shared_gate(self) -> None:
+        """Añade la puerta compartida: empieza un tramo nuevo tras ella."""
+        self.segments.append(QuantumCircuit(self.n))
+
+    def update_quantum_state(self, state: QuantumState) -> None:
+        self.segments[0].update_quantum_state(state)
+        for segment in self.segments[1:]:
+            self.shared_gate.update_quantum_state(state)
+            segment.update_quantum_state(state)
+
+    def get_gate_count(self) -> int:
+        return sum(segment.get_gate_count() for segment in self.segments) + len(self.segments) - 1
+
+    def copy(self) -> "SharedGateCircuit":
+        """Copia los tramos; la puerta compartida no se copia."""
+        return SharedGateCircuit(self.n, self.shared_gate, [segment.copy() for segment in self.segments])
+
+    def gates(self) -> list:
+        """Puertas en orden de aplicación (la compartida aparece una vez por uso)."""
+        gates = []
+        for i, segment in enumerate(self.segments):
+            if i:
+                gates.append(self.shared_gate)
+            gates.extend(segment.get_gate(j) for j in range(segment.get_gate_count()))
+        return gates
+
+def circuit_segments(circuit) -> list:
+    """Tramos de QuantumCircuit de un circuito (uno solo si no es un SharedGateCircuit)."""
+    return circuit.segments if isinstance(circuit, SharedGateCircuit) else [circuit]
+
+def circuit_gates(circuit) -> list:
+    """Puertas de un QuantumCircuit o de un SharedGateCircuit, en orden de aplicación."""
+    if isinstance(circuit, SharedGateCircuit):
+        return circuit.gates()
+    return [circuit.get_gate(i) for i in range(circuit.get_gate_count())]
+
+# Puertas de un qubit con nombre propio del IR (circuit_ir)
+IR_GATES = {"h": H, "x": X}
+
+def lower(circuit: circuit_ir.Circuit, oracle: str = DEFAULT_ORACLE):
+    """
+    Traduce un circuito del IR a Qulacs (la medida se omite: el estado final no se muestrea).
+
+    Con los oráculos de SHARED_ORACLES devuelve un SharedGateCircuit con una sola MCZ para todo el circuito.
+    """
+    if oracle in SHARED_ORACLES:
+        qc = SharedGateCircuit(circuit.n, *mcz_gates(circuit.n, oracle))
+    else:
+        qc = QuantumCircuit(circuit.n)
+    for gate in circuit.gates:
+        if gate.name == "mcz":
+            if oracle in SHARED_ORACLES:
+                qc.add_shared_gate()
+            else:
+                for mcz in mcz_gates(circuit.n, oracle):
+                    qc.add_gate(mcz)
+        elif gate.name == "unitary":
+            qc.add_gate(DenseMatrix(list(gate.targets), gate.matrix))
+        elif gate.name != "measure":
+            qc.add_gate(IR_GATES[gate.name](gate.targets[0]))
+    return qc
+
+# Pases del optimizador de circuitos de Qulacs: light fusiona puertas consecutivas sobre los mismos qubits
+# sin ampliar su soporte; merge agrupa puertas en bloques densos de hasta block_size qubits
+OPTIMIZERS = ("none", "light", "merge")
+DEFAULT_OPTIMIZER = "none"
+DEFAULT_BLOCK_SIZE = 2
+
+# Nombre del simulador (caché de ajuste) y opciones propias del runner
+FRAMEWORK = "qulacs"
+RUNNER_OPTIONS = {'oracle', 'optimizer', 'block_size', 'ir_fusion', 'sampler', 'shots', 'rng'}
 
 class GroverRunner:
     """Clase para ejecutar el algoritmo de Grover y medir su rendimiento."""
     
-    def __init__(self, n: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str):
+    def __init__(self, n: int, cores: int, ram_monitor, cpu_monitor, console: Console, ram_csv_file: str,
+                 precision: str = "double", backend_options: dict = None, sampling: dict = None, ram_trace=None,
+                 tuned_options: dict = None):
+        if precision != "double":
+            raise ValueError("Qulacs only supports double precision")
+        unsupported = (set(backend_options or {}) | set(tuned_options or {})) - RUNNER_OPTIONS
+        if unsupported:
+            raise ValueError(f"Unsupported Qulacs options: {', '.join(sorted(unsupported))}")
         self.n = n
         self.cores = cores
         self.ram_monitor = ram_monitor
         self.cpu_monitor = cpu_monitor
         self.console = console
+        self.probe = SampleProbe()
+        self.readings = []
+        self.ram_trace = ram_trace
+        self.precision = precision
+        self.backend_options = dict(backend_options or {})
+        # Opciones ajustadas para este nodo (tuning.py); las opciones explícitas tienen prioridad
+        self.tuned_options = dict(tuned_options or {})
+        self.options = {**self.tuned_options, **self.backend_options}
+        self.oracle = self.options.get('oracle', DEFAULT_ORACLE)
+        self.optimizer = self.options.get('optimizer', DEFAULT_OPTIMIZER)
+        if self.optimizer not in OPTIMIZERS:
+            raise ValueError(f"Unknown Qulacs optimizer '{self.optimizer}' (choose from {', '.join(OPTIMIZERS)})")
+        self.block_size = int(self.options.get('block_size', DEFAULT_BLOCK_SIZE))
+        self.ir_fusion = int(self.options.get('ir_fusion', 0))
+        # Qulacs no mide el circuito (native); con vector se extraen shots del estado final tras cada ejecución
+        self.sampler = self.options.get('sampler', shot_sampler.DEFAULT_SAMPLER)
+        if self.sampler not in shot_sampler.SAMPLERS:
+            raise ValueError(f"Unknown Qulacs sampler '{self.sampler}' (choose from {', '.join(shot_sampler.SAMPLERS)})")
+        self.shots = int(self.options.get('shots', 1024)) if self.sampler == "vector" else None
+        self.rng = shot_sampler.make_rng(self.options.get('rng', shot_sampler.DEFAULT_BIT_GENERATOR))
+        self.sampling = {**DEFAULT_SAMPLING, **(sampling or {})}
+        self.timer = SampleTimer(self.sampling['min_sample_time'])
         self.state = QuantumState(n)
         self.circuit = self._build_circuit()
+        self.gate_count_raw = self.circuit.get_gate_count()
+        # Se conserva el circuito sin optimizar para medir la aceleración del optimizador
+        self.raw_circuit = self.circuit.copy() if self.optimizer != "none" else None
+        self.optimize_s = self._optimize() if self.raw_circuit else None
         self.ram_csv_file = ram_csv_file
 
-    def _build_circuit(self) -> QuantumCircuit:
-        """Construye el circuito cuántico de Grover con iteraciones óptimas."""
-        qc = QuantumCircuit(self.n)
-        optimal_num_iterations = math.floor(math.pi / (4 * math.asin(math.sqrt(1 / 2**self.n))))
-        print(optimal_num_iterations)
-        # Inicialización
-        for i in range(self.n):
-            qc.add_gate(H(i))
-        
-        # Iteraciones de Grover (oráculo + difusor)
-        for _ in range(optimal_num_iterations):
-            # Oráculo
-            cnz = to_matrix_gate(Z(self.n - 1))
-            for i in range(self.n - 1):
-                cnz.add_control_qubit(i, 1)
-            qc.add_gate(cnz)
-            
-            # Difusor
-            for i in range(self.n):
-                qc.add_gate(H(i))
-                qc.add_gate(X(i))
-            cnz = to_matrix_gate(Z(self.n - 1))
-            for i in range(self.n - 1):
-                cnz.add_control_qubit(i, 1)
-            qc.add_gate(cnz)
-            for i in range(self.n):
-                qc.add_gate(X(i))
-                qc.add_gate(H(i))
-        
-        return qc
+    def _build_circuit(self):
+        """Construye el circuito de Grover desde el IR común, con el pase de fusión ir_fusion."""
+        return lower(circuit_ir.optimize(circuit_ir.grover_circuit(self.n), self.ir_fusion), self.oracle)
+
+    def _optimize(self) -> float:
+        """Aplica el optimizador de circuitos de Qulacs sobre self.circuit y devuelve su duración (s)."""
+        optimizer = QuantumCircuitOptimizer()
+        t1 = time.perf_counter_ns()
+        # Con una MCZ compartida se optimiza cada tramo: la MCZ sobre todos los qubits no se fusiona con nada
+        for segment in circuit_segments(self.circuit):
+            if self.optimizer == "light":
+                optimizer.optimize_light(segment)
+            else:
+                optimizer.optimize(segment, self.block_size)
+        t2 = time.perf_counter_ns()
+        return (t2 - t1) / 1e9
+
+    def optimizer_label(self) -> str:
+        """Pase de optimización aplicado (con el tamaño de bloque en merge), o None."""
+        if self.optimizer == "none":
+            return None
+        return f"merge:{self.block_size}" if self.optimizer == "merge" else self.optimizer
+
+    def gate_list(self) -> list:
+        """Puertas del circuito como (nombre, número de controles), para estimar el tráfico de memoria."""
+        return [(gate.get_name(), len(gate.get_control_index_list())) for gate in circuit_gates(self.circuit)]
+
+    def _execute(self, circuit) -> None:
+        """Una ejecución: aplica el circuito al estado y, con el muestreador vectorizado, extrae los shots."""
+        circuit.update_quantum_state(self.state)
+        if self.sampler == "vector":
+            self._sample(self.state.get_vector())
+
+    def _sample(self, state: np.ndarray) -> np.ndarray:
+        """Conteos de todos los shots, extraídos del vector de estado con shot_sampler."""
+        return shot_sampler.sample_counts(state, self.shots, self.rng)
+
+    def _final_state(self) -> np.ndarray:
+        """Ejecuta el circuito desde |0> y devuelve el vector de estado final."""
+        self.state.set_zero_state()
+        self.circuit.update_quantum_state(self.state)
+        return self.state.get_vector()
 
     def _run_simulation(self, num_iterations: int) -> list[float]:
         """Ejecuta la simulación num_iterations veces y devuelve los tiempos."""
         
+        def execute():
+            self._execute(self.circuit)
+
+        # La primera vez se calibran las repeticiones internas de cada muestra
+        if self.timer.inner_repeats is None:
+            self.timer.calibrate(execute, self.state.set_zero_state)
+        # El estado se reinicia a |0> antes de cada ejecución
         times = []
         for _ in range(num_iterations):
-            self.state.set_zero_state()  # Reiniciar el estado a |0>
-            t1 = time.perf_counter_ns()
-            self.circuit.update_quantum_state(self.state)
-            t2 = time.perf_counter_ns()
-            #print(self.state.get_vector())
-            #t3 = time.perf_counter_ns()
-            times.append(t2 - t1)
-            #print(f"t2: {t3 - t2} ns")
+            self.probe.reset()
+            times.append(self.timer.measure(execute, reset=self.state.set_zero_state))
+            self.readings.append(self.probe.read())
         return times
 
+    def sample_times(self, count: int) -> list[float]:
+        """Tiempos (ns) de count muestras, medidas como en run() pero sin monitores (tuning.py, cold_start.py)."""
+        return self._run_simulation(count)
+
+    def _raw_median(self) -> float:
+        """Mediana (ns) del circuito sin optimizar, medida con las mismas repeticiones internas."""
+        def execute():
+            self._execute(self.raw_circuit)
+
+        return statistics.median(self.timer.measure(execute, reset=self.state.set_zero_state)
+                                 for _ in range(self.sampling['min_samples']))
+
+    def _mark(self, phase: str) -> None:
+        """Marca una fase en la traza de memoria, si está activa."""
+        if self.ram_trace:
+            self.ram_trace.mark(phase)
+
     def run(self) -> dict:
         """Ejecuta el algoritmo de Grover y devuelve los resultados."""
         self.console.print(f"Comienza la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
@@ -73,34 +282,36 @@ class GroverRunner:
         if self.cpu_monitor:
             self.cpu_monitor.start()
         
-        # monitor_thread = None
         if self.ram_monitor:
             self.ram_monitor.start()
-            # # Hilo para escribir en el archivo CSV (ajusta según tu implementación)
-            # monitor_thread = threading.Thread(target=self.ram_monitor.real_time_memory_usage, 
-            #                                 args=(self.ram_csv_file,))
-            # monitor_thread.daemon = True
-            # monitor_thread.start()
             
+        # Desde el arranque del proceso hasta la primera ejecución medida (importaciones, inicialización...);
+        # None en las ejecuciones siguientes del mismo proceso
+        time_to_first_sample_s = time_to_first_sample()
+        self._mark("warmup")
         # Iteraciones iniciales
-        n_iterations_in = 10
+        n_iterations_in = self.sampling['min_samples']
         t_for_loop = self._run_simulation(n_iterations_in)
         t_grover = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
-        std_grover = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
         
         #Si t_grover es mayor que 2,4 horas significa que el algoritmo tarda mas de un dia en ejecutar y se detiene de forma segura
-        if t_grover > 8640:
+        if t_grover > self.sampling['time_limit']:
             self.console.print(f"El algoritmo tarda más de un día en ejecutarse. Deteniendo la ejecución a las {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="red")
             exit(0)
             
         #Calcular iteraciones óptimas
-        iterations_number = (math.ceil((2 * 1.96 * std_grover) / (0.05 * t_grover)) ** 2 
-                            if t_grover > 0 else n_iterations_in)
+        iterations_number = (bench_stats.required_samples(t_for_loop, self.sampling['z'], self.sampling['rel_error'])
+                             if t_grover > 0 else n_iterations_in)
         #iterations_number = 500
+        if self.sampling['max_samples']:
+            iterations_number = min(iterations_number, self.sampling['max_samples'])
         self.console.print(f"Optimal number of iterations: {iterations_number}", style="blue")
+        self._mark("sampling")
 
         # Más iteraciones si es necesario
         if iterations_number > n_iterations_in:
+            # Las muestras de calentamiento se descartan junto con sus lecturas
+            self.readings = []
             t_for_loop = (self._run_simulation(iterations_number - n_iterations_in) + 
                           self._run_simulation(n_iterations_in))
         else:
@@ -108,7 +319,30 @@ class GroverRunner:
 
         t_grover_final = statistics.mean(t_for_loop) / 1e9 if t_for_loop else 0
         std_grover_final = statistics.stdev(t_for_loop) / 1e9 if len(t_for_loop) > 1 else 0
+        timing_stats = bench_stats.summarize(t_for_loop)
+        traffic = memory_traffic.circuit_traffic(self.gate_list(), self.n, self.precision)
+        achieved_gbs = memory_traffic.achieved_bandwidth(traffic['bytes_total'], timing_stats['t_median'] or t_grover_final)
+        # Coste extra de la primera llamada de la calibración (la única en frío) sobre la mediana
+        first_touch_s = max(self.timer.first_call_ns / 1e9 - (timing_stats['t_median'] or t_grover_final), 0)
+
+        optimizer_speedup = None
+        if self.raw_circuit:
+            self._mark("baseline")
+            # Aceleración del optimizador: circuito sin optimizar frente al optimizado, ambos por mediana
+            t_optimized = timing_stats['t_median'] or t_grover_final
+            optimizer_speedup = self._raw_median() / 1e9 / t_optimized if t_optimized else None
+            self.console.print(f"Optimizer ({self.optimizer_label()}): {self.gate_count_raw} -> "
+                               f"{self.circuit.get_gate_count()} gates in {self.optimize_s:.3f} s", style="blue")
+
+        t_exec_s = t_sampling_s = None
+        if self.sampler == "vector":
+            self._mark("split")
+            t_exec_s, t_sampling_s = shot_sampler.split_times(self._final_state, self._sample,
+                                                              self.sampling['min_samples'])
+            self.console.print(f"Execution: {t_exec_s:.6f} s, sampling {self.shots} shots: {t_sampling_s:.6f} s",
+                               style="blue")
 
+        self._mark("done")
         # Obtener métricas de recursos
         cpu_avg = self.cpu_monitor.average() if self.cpu_monitor else 0
         ram_avg = self.ram_monitor.average() if self.ram_monitor else 0
@@ -119,8 +353,6 @@ class GroverRunner:
             self.cpu_monitor.stop()
         if self.ram_monitor:
             self.ram_monitor.stop()
-            # if monitor_thread and monitor_thread.is_alive():
-            #     monitor_thread.join()
                 
         self.console.print(f"Termina la ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="green")
 
@@ -129,9 +361,51 @@ class GroverRunner:
             'iterations_number': iterations_number,
             't_grover': t_grover_final,
             'std_grover': std_grover_final,
+            **timing_stats,
+            'inner_repeats': self.timer.inner_repeats,
+            'timer_overhead_ns': self.timer.overhead_ns,
+            **traffic,
+            'achieved_gbs': achieved_gbs,
             'cpu_avg': cpu_avg,
             'ram_avg': ram_avg,
             'ram_mb': ram_mb,
             'max_ram_peak': max_ram_peak,
-            'cores': self.cores
-        }
\ No newline at end of file
+            'cores': self.cores,
+            'backend': 'qulacs',
+            'shots': self.shots,
+            'precision': self.precision,
+            'options': self.backend_options,
+            'tuned_options': self.tuned_options or None,
+            'oracle': self.oracle,
+            'gate_count': self.circuit.get_gate_count(),
+            'optimizer': self.optimizer_label(),
+            'gate_count_raw': self.gate_count_raw if self.raw_circuit else None,
+            'optimize_s': self.optimize_s,
+            'optimizer_speedup': optimizer_speedup,
+            'ir_fusion': self.ir_fusion,
+            'sampler': self.sampler,
+            't_exec_s': t_exec_s,
+            't_sampling_s': t_sampling_s,
+            'first_touch_s': first_touch_s,
+            'time_to_first_sample_s': time_to_first_sample_s,
+            'samples': {
+                't_ns': t_for_loop,
+                'rss_mb': [rss for rss, _ in self.readings],
+                'cpu_s': [cpu for _, cpu in self.readings],
+            }
+        }
+
+def tuning_space(n: int, cores: int) -> list[dict]:
+    """Configuraciones candidatas para tuning.py (la primera es la de defecto): oráculo y pase de optimización."""
+    optimizers = ([{}, {'optimizer': 'light'}] +
+                  [{'optimizer': 'merge', 'block_size': size} for size in (2, 3, 4) if size <= n])
+    return [{'oracle': oracle, **optimizer} for optimizer in optimizers
+            for oracle in sorted(available_oracles(n), key=lambda oracle: oracle != DEFAULT_ORACLE)]
+
+def build_runner(n: int, cores: int, options: dict, shots: int = 1024, precision: str = "double",
+                 console: Console = None) -> GroverRunner:
+    """Runner sin monitores con las opciones dadas, para tuning.py y shot_scaling.py (Qulacs solo usa shots al muestrear)."""
+    if options.get('sampler') == "vector":
+        options = {'shots': shots, **options}
+    return GroverRunner(n, cores, None, None, console or Console(), None, precision=precision,
+                        backend_options=options)
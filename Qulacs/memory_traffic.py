@@ -0,0 +1,99 @@
+import math
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes por amplitud del vector de estado según la precisión
+AMPLITUDE_BYTES = {"double": 16, "single": 8}
+
+# Nombres con los que cada simulador identifica las medidas (o la lectura del estado final) y las operaciones sin coste
+MEASURE_NAMES = {"measure", "m", "MEASURE", "save_statevector"}
+IGNORED_NAMES = {"barrier"}
+
+# Tamaño por defecto de cada vector del triad (float64): 128 MB, muy por encima de la caché
+TRIAD_ELEMENTS = 1 << 24
+
+
+def grover_iterations(n: int) -> int:
+    """Número óptimo de iteraciones de Grover para n qubits."""
+    return math.floor(math.pi / (4 * math.asin(math.sqrt(1 / 2**n))))
+
+
+def gate_bytes(n: int, controls: int, precision: str = "double") -> int:
+    """
+    Bytes movidos por una puerta de un qubit con controls controles sobre un estado de n qubits.
+
+    La puerta lee y escribe solo las amplitudes con todos los controles a 1, es decir,
+    una fracción 2^-controls del vector de estado.
+    """
+    state_bytes = AMPLITUDE_BYTES.get(precision, 16) * 2**n
+    return 2 * state_bytes >> controls
+
+
+def circuit_traffic(gates: list, n: int, precision: str = "double", state_qubits: int = None) -> dict:
+    """
+    Tráfico de memoria estimado de un circuito de Grover a partir de su lista de puertas.
+
+    Parámetros:
+    gates: list - Tuplas (nombre, número de controles) generadas por GroverRunner.gate_list().
+    n: int - Número de qubits de búsqueda.
+    precision: str - Precisión del vector de estado.
+    state_qubits: int - Qubits del vector de estado, si el circuito añade ancillas (por defecto n).
+    """
+    state_qubits = state_qubits or n
+    total = 0
+    measured = False
+    for name, controls in gates:
+        if name in IGNORED_NAMES:
+            continue
+        if name in MEASURE_NAMES:
+            # El muestreo final lee el vector de estado una vez, sea cual sea el número de medidas
+            measured = True
+            continue
+        total += gate_bytes(state_qubits, controls, precision)
+    if measured:
+        total += AMPLITUDE_BYTES.get(precision, 16) * 2**state_qubits
+    return {
+        'bytes_total': total,
+        # La capa inicial y la medida se reparten entre las iteraciones
+        'bytes_per_iteration': total // max(1, grover_iterations(n)),
+    }
+
+
+def achieved_bandwidth(bytes_total: int, seconds: float) -> float:
+    """Ancho de banda conseguido en GB/s."""
+    return bytes_total / seconds / 1e9 if seconds else 0.0
+
+
+def stream_triad(threads: int = 1, elements: int = TRIAD_ELEMENTS, repeats: int = 5) -> float:
+    """
+    Ancho de banda (GB/s) de un triad a = b + s·c al estilo STREAM, con NumPy.
+
+    El vector se reparte en bloques entre threads hilos (NumPy libera el GIL en las
+    operaciones), y se devuelve el mejor de repeats intentos. Cada triad mueve cinco
+    vectores completos: c → a (multiplicación) y a, b → a (suma).
+
+    Parámetros:
+    threads: int - Hilos usados (normalmente los núcleos activos).
+    elements: int - Elementos float64 de cada vector.
+    repeats: int - Repeticiones del triad.
+    """
+    a = np.zeros(elements)
+    b = np.ones(elements)
+    c = np.full(elements, 2.0)
+    scalar = 3.0
+    bounds = np.linspace(0, elements, threads + 1, dtype=np.int64)
+    chunks = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def triad(chunk):
+        np.multiply(c[chunk], scalar, out=a[chunk])
+        np.add(a[chunk], b[chunk], out=a[chunk])
+
+    best = math.inf
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(repeats):
+            t1 = time.perf_counter_ns()
+            list(pool.map(triad, chunks))
+            t2 = time.perf_counter_ns()
+            best = min(best, t2 - t1)
+    return 5 * a.nbytes / best
@@ -1,40 +1,181 @@
 import os
 import csv
+import json
 from rich.console import Console
 from rich.table import Table
+from datetime import datetime
+from sample_store import SampleStore
+from results_db import ResultsDB
+from bench_stats import STAT_KEYS
+
+# Columnas del CSV y clave correspondiente en el diccionario de resultados
+CSV_COLUMNS = [
+    ('n', 'n'),
+    ('iterations_number', 'iterations_number'),
+    ('t_grover', 't_grover'),
+    ('std_grover', 'std_grover'),
+    ('cpu_avg', 'cpu_avg'),
+    ('ram_avg', 'ram_avg'),
+    ('ram_mb', 'ram_mb'),
+    ('ram_peak', 'max_ram_peak'),
+    ('cores', 'cores'),
+    ('backend', 'backend'),
+    ('shots', 'shots'),
+    ('precision', 'precision'),
+    ('options', 'options'),
+    ('spec_hash', 'spec_hash'),
+    ('samples_row', 'samples_row'),
+    *((key, key) for key in STAT_KEYS),
+    ('inner_repeats', 'inner_repeats'),
+    ('timer_overhead_ns', 'timer_overhead_ns'),
+    ('bytes_per_iteration', 'bytes_per_iteration'),
+    ('bytes_total', 'bytes_total'),
+    ('achieved_gbs', 'achieved_gbs'),
+    ('stream_gbs', 'stream_gbs'),
+    ('oracle', 'oracle'),
+    ('mcx_mode', 'mcx_mode'),
+    ('ancillas', 'ancillas'),
+    ('gate_count', 'gate_count'),
+    ('depth', 'depth'),
+    ('transpile_s', 'transpile_s'),
+    ('engine', 'engine'),
+    ('fusion', 'fusion'),
+    ('jit_warmup_s', 'jit_warmup_s'),
+    ('tuned_options', 'tuned_options'),
+    ('optimizer', 'optimizer'),
+    ('gate_count_raw', 'gate_count_raw'),
+    ('optimize_s', 'optimize_s'),
+    ('optimizer_speedup', 'optimizer_speedup'),
+    ('ir_fusion', 'ir_fusion'),
+    ('sampler', 'sampler'),
+    ('t_exec_s', 't_exec_s'),
+    ('t_sampling_s', 't_sampling_s'),
+    ('state_reuse', 'state_reuse'),
+    ('state_alloc_s', 'state_alloc_s'),
+    ('first_touch_s', 'first_touch_s'),
+    ('time_to_first_sample_s', 'time_to_first_sample_s'),
+]
+
+
+def _csv_value(value):
+    """Serializa los valores compuestos (opciones del backend) como JSON."""
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return '' if value is None else value
+
+
+class StreamingConsole(Console):
+    """Consola que escribe cada salida en un fichero según se produce, en lugar de grabarla en memoria."""
+
+    def __init__(self, log_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.log_path = log_path
+        # Con buffer de línea: si el trabajo se cancela, el registro llega hasta la última línea
+        self.log_file = open(log_path, "a", encoding="utf-8", buffering=1)
+        self._log_console = Console(file=self.log_file, width=self.width, no_color=True,
+                                    highlight=False, soft_wrap=True)
+
+    def print(self, *objects, **kwargs) -> None:
+        super().print(*objects, **kwargs)
+        if not self.log_file.closed:
+            self._log_console.print(*objects, **kwargs)
+
+    def close(self) -> None:
+        self.log_file.close()
+
 
 class ResultsHandler:
     """Clase para manejar la visualización y guardado de resultados."""
-    
-    def __init__(self, file_name: str, results_dir: str, console: Console):
+
+    def __init__(self, file_name: str, results_dir: str, console: Console, db_path: str = None,
+                 flush_every: int = 1, fsync: bool = False, db_run_id: int = None):
         self.file_name = os.path.join(results_dir, file_name + '.csv')
         self.results_dir = results_dir
         self.console = console
+        self.flush_every = max(1, flush_every)
+        self.fsync = fsync
+        self._pending_rows = 0
+        self.sample_store = SampleStore(results_dir, fsync=fsync)
+        self.db = ResultsDB(db_path, batch_size=self.flush_every) if db_path else None
+        if self.db:
+            # Los procesos hijos de un barrido añaden sus filas a la ejecución que registró el padre
+            if db_run_id is None:
+                self.db.start_run(results_dir)
+            else:
+                self.db.run_id = db_run_id
         self._ensure_csv_headers()
+        # El CSV se mantiene abierto durante todo el barrido
+        self._csv_file = open(self.file_name, mode='a', newline='')
+        self._csv_writer = csv.writer(self._csv_file)
 
     def _ensure_csv_headers(self) -> None:
         """Asegura que el archivo CSV tenga encabezados si es nuevo."""
         if not os.path.isfile(self.file_name):
             with open(self.file_name, mode='w', newline='') as csv_file:
                 csv_writer = csv.writer(csv_file)
-                csv_writer.writerow(['n', 'iterations_number', 't_grover', 'std_grover', 
-                                     'cpu_avg', 'ram_avg', 'ram_mb', 'ram_peak', 'cores'])
+                csv_writer.writerow([column for column, _ in CSV_COLUMNS])
 
     def save_to_csv(self, data: dict) -> None:
-        """Guarda los datos en el archivo CSV."""
-        with open(self.file_name, mode='a', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file)
-            csv_writer.writerow([data['n'], data['iterations_number'], data['t_grover'], 
-                                 data['std_grover'], data['cpu_avg'], data['ram_avg'], 
-                                 data['ram_mb'], data['max_ram_peak'], data['cores']])
-        self.console.print(f"Data appended to {self.file_name}", style="bold red")
+        """Guarda los datos en el archivo CSV (se vuelca al disco cada flush_every filas)."""
+        self._csv_writer.writerow([_csv_value(data.get(key)) for _, key in CSV_COLUMNS])
+        self._pending_rows += 1
+        if self._pending_rows >= self.flush_every:
+            self.flush()
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.console.print(f"Data appended to {self.file_name} at {current_time}", style="bold red")
+
+    def flush(self) -> None:
+        """Vuelca las filas pendientes del CSV (y sincroniza con el disco si fsync está activo)."""
+        self._csv_file.flush()
+        if self.fsync:
+            os.fsync(self._csv_file.fileno())
+        self._pending_rows = 0
+
+    def save_samples(self, data: dict) -> None:
+        """Guarda las muestras en bruto y anota su fila en los resultados."""
+        samples = data.get('samples')
+        if not samples:
+            return
+        data['samples_row'] = self.sample_store.append(data, samples['t_ns'],
+                                                       samples.get('rss_mb'), samples.get('cpu_s'))
+
+    def save_to_db(self, data: dict) -> None:
+        """Guarda la fila (y sus muestras) en la base de datos de resultados, si está activa."""
+        if self.db:
+            self.db.add_result(data)
+
+    def close(self) -> None:
+        """Vacía los lotes pendientes y cierra el CSV, las muestras y la base de datos."""
+        if self._csv_file.closed:
+            return
+        self.flush()
+        self._csv_file.close()
+        self.sample_store.close()
+        if self.db:
+            self.db.close()
+            self.console.print(f"Results stored in {self.db.path}", style="bold green")
+            self.db = None
 
     def display_timing_table(self, data: dict) -> None:
-        """Muestra la tabla de tiempos y desviación."""
-        table = Table(title="Tiempo y Desviación")
-        table.add_column("Tiempo Medio Total (s)", justify="center", style="cyan")
-        table.add_column("Desviación Típica (s)", justify="center", style="magenta")
-        table.add_row(f"{data['t_grover']:.6f}", f"{data['std_grover']:.6f}")
+        """Muestra la tabla de tiempos: media, mediana con su IC, percentiles y muestras atípicas."""
+        table = Table(title="Tiempo y Desviación",
+                      caption=f"{data.get('inner_repeats') or 1} llamadas por muestra, "
+                              f"coste del temporizador {data.get('timer_overhead_ns') or 0} ns descontado")
+        table.add_column("Media ± Desv. (s)", justify="center", style="cyan")
+        table.add_column("Mediana (s)", justify="center", style="magenta")
+        table.add_column("IC 95% Mediana (s)", justify="center", style="magenta")
+        table.add_column("p5 / p95 / p99 (s)", justify="center", style="green")
+        table.add_column("MAD (s)", justify="center", style="yellow")
+        table.add_column("Atípicas", justify="center", style="red")
+        if data.get('t_median') is None:
+            table.add_row(f"{data['t_grover']:.6f} ± {data['std_grover']:.6f}", *["-"] * 5)
+        else:
+            table.add_row(f"{data['t_grover']:.6f} ± {data['std_grover']:.6f}",
+                          f"{data['t_median']:.6f}",
+                          f"[{data['t_ci_low']:.6f}, {data['t_ci_high']:.6f}]",
+                          f"{data['t_p5']:.6f} / {data['t_p95']:.6f} / {data['t_p99']:.6f}",
+                          f"{data['t_mad']:.6f}",
+                          f"{data['n_outliers']} / {data['iterations_number']}")
         self.console.print(table)
 
     def display_usage_table(self, data: dict) -> None:
@@ -44,11 +185,82 @@ class ResultsHandler:
         table.add_column("RAM Avg (%)", justify="center", style="red")
         table.add_column("RAM Usage (MB)", justify="center", style="blue")
         table.add_column("Max RAM Peak (%)", justify="center", style="yellow")
-        table.add_row(f"{data['cpu_avg']:.2f}", f"{data['ram_avg']:.2f}", 
+        table.add_row(f"{data['cpu_avg']:.2f}", f"{data['ram_avg']:.2f}",
                      f"{data['ram_mb']:.2f}", f"{data['max_ram_peak']:.2f}")
         self.console.print(table)
 
+    def display_bandwidth_table(self, data: dict) -> None:
+        """Muestra el tráfico de memoria estimado y el ancho de banda conseguido (y su fracción del triad)."""
+        if not data.get('bytes_total'):
+            return
+        table = Table(title="Ancho de banda de memoria")
+        table.add_column("Bytes/Iteración (MB)", justify="center", style="cyan")
+        table.add_column("Conseguido (GB/s)", justify="center", style="green")
+        table.add_column("Triad (GB/s)", justify="center", style="blue")
+        table.add_column("% del Triad", justify="center", style="yellow")
+        stream = data.get('stream_gbs')
+        table.add_row(f"{data['bytes_per_iteration'] / 1e6:.2f}", f"{data['achieved_gbs']:.2f}",
+                      f"{stream:.2f}" if stream else "-",
+                      f"{100 * data['achieved_gbs'] / stream:.1f}" if stream else "-")
+        self.console.print(table)
+
+    def display_circuit_table(self, data: dict) -> None:
+        """Muestra el circuito ejecutado (puertas, profundidad, motor) y sus tiempos de preparación, si el runner los da."""
+        columns = [(title, value) for title, value in (
+            ("Motor", data.get('engine')),
+            ("Fusión", None if data.get('fusion') is None else ("sí" if data['fusion'] else "no")),
+            ("Fusión IR", data.get('ir_fusion') or None),
+            ("Optimizador", data.get('optimizer')),
+            ("Puertas sin optimizar", data.get('gate_count_raw')),
+            ("Puertas", data.get('gate_count')),
+            ("Profundidad", data.get('depth')),
+            ("Ancillas", data.get('ancillas') or None),
+            ("Transpilación (s)", None if data.get('transpile_s') is None else f"{data['transpile_s']:.3f}"),
+            ("Calentamiento JIT (s)", None if data.get('jit_warmup_s') is None else f"{data['jit_warmup_s']:.3f}"),
+            ("Optimización (s)", None if data.get('optimize_s') is None else f"{data['optimize_s']:.3f}"),
+            ("Aceleración", None if data.get('optimizer_speedup') is None else f"{data['optimizer_speedup']:.2f}x"),
+            ("Muestreador", data.get('sampler')),
+            ("Ejecución (s)", None if data.get('t_exec_s') is None else f"{data['t_exec_s']:.6f}"),
+            ("Muestreo (s)", None if data.get('t_sampling_s') is None else f"{data['t_sampling_s']:.6f}"),
+            ("Estado reutilizado", None if data.get('state_reuse') is None else ("sí" if data['state_reuse'] else "no")),
+            ("Reserva del estado (s)", None if data.get('state_alloc_s') is None else f"{data['state_alloc_s']:.6f}"),
+            ("Primer acceso (s)", None if data.get('first_touch_s') is None else f"{data['first_touch_s']:.6f}"),
+            ("Hasta la 1ª muestra (s)", None if data.get('time_to_first_sample_s') is None
+             else f"{data['time_to_first_sample_s']:.2f}"),
+        ) if value is not None]
+        if not columns:
+            return
+        table = Table(title="Circuito ejecutado")
+        for title, _ in columns:
+            table.add_column(title, justify="center", style="cyan")
+        table.add_row(*(str(value) for _, value in columns))
+        self.console.print(table)
+
+    def display_fastest_options(self, results: list) -> None:
+        """Muestra, para cada n, número de núcleos y shots, las opciones del backend con menor mediana de tiempo."""
+        groups = {}
+        for data in results:
+            groups.setdefault((data['n'], data['cores'], data.get('shots') or 0), []).append(data)
+        if all(len(group) < 2 for group in groups.values()):
+            return
+        table = Table(title="Configuración más rápida por n")
+        table.add_column("n", justify="center", style="cyan")
+        table.add_column("Cores", justify="center", style="cyan")
+        table.add_column("Shots", justify="center", style="cyan")
+        table.add_column("Opciones", justify="left", style="green")
+        table.add_column("Mediana (s)", justify="center", style="magenta")
+        table.add_column("Configuraciones", justify="center", style="yellow")
+        for (n, cores, shots), group in sorted(groups.items()):
+            best = min(group, key=lambda data: data.get('t_median') or data['t_grover'])
+            options = best.get('options')
+            table.add_row(str(n), str(cores), str(shots or "-"), _csv_value(options) if options else "-",
+                          f"{best.get('t_median') or best['t_grover']:.6f}", str(len(group)))
+        self.console.print(table)
+
     def save_console_output(self) -> None:
-        """Guarda la salida de la consola en un archivo."""
+        """Guarda la salida de la consola en un archivo (una consola en streaming ya lo ha hecho)."""
+        if isinstance(self.console, StreamingConsole):
+            self.console.close()
+            return
         with open(os.path.join(self.results_dir, "out.txt"), "w") as f:
-            f.write(self.console.export_text())
\ No newline at end of file
+            f.write(self.console.export_text())
@@ -0,0 +1,143 @@
+import argparse
+import math
+import sys
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from results_loader import load_rows, config_key, format_key, SampleLoader
+
+
+def mann_whitney_greater(baseline, candidate) -> tuple:
+    """
+    Test U de Mann–Whitney unilateral (el candidato tarda más que la referencia).
+
+    Usa la aproximación normal con corrección por empates y por continuidad, y devuelve
+    (U, p, delta de Cliff). delta > 0 indica que el candidato es más lento.
+
+    Parámetros:
+    baseline: array - Muestras de la referencia.
+    candidate: array - Muestras del candidato.
+    """
+    x = np.asarray(baseline, dtype=np.float64)
+    y = np.asarray(candidate, dtype=np.float64)
+    n1, n2 = len(x), len(y)
+    data = np.concatenate([x, y])
+    # Rangos medios: cada valor repetido recibe la media de las posiciones que ocupa
+    values, inverse, counts = np.unique(data, return_inverse=True, return_counts=True)
+    ranks = (np.cumsum(counts) - (counts - 1) / 2)[inverse]
+    u = ranks[n1:].sum() - n2 * (n2 + 1) / 2
+    total = n1 + n2
+    tie_term = (counts ** 3 - counts).sum() / (total * (total - 1))
+    variance = n1 * n2 / 12 * ((total + 1) - tie_term)
+    if variance <= 0:
+        p_value = 1.0
+    else:
+        z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+        p_value = 0.5 * math.erfc(z / math.sqrt(2))
+    return float(u), p_value, float(2 * u / (n1 * n2) - 1)
+
+
+def _group(rows: list[dict], loader: SampleLoader) -> dict:
+    """Agrupa las filas por configuración, uniendo las muestras y las medidas de memoria."""
+    groups = {}
+    for row in rows:
+        group = groups.setdefault(config_key(row), {"t_ns": [], "t_grover": [], "ram_mb": []})
+        samples = loader.samples(row)
+        if samples is not None:
+            group["t_ns"].append(np.asarray(samples["t_ns"], dtype=np.float64))
+        group["t_grover"].append(row["t_grover"])
+        group["ram_mb"].append(row["ram_mb"])
+    for group in groups.values():
+        group["t_ns"] = np.concatenate(group["t_ns"]) if group["t_ns"] else None
+    return groups
+
+
+def compare(baseline_rows: list[dict], candidate_rows: list[dict], alpha: float,
+            min_slowdown: float, mem_threshold: float) -> list[dict]:
+    """Compara las configuraciones comunes de dos conjuntos de resultados."""
+    loader = SampleLoader()
+    baseline = _group(baseline_rows, loader)
+    candidate = _group(candidate_rows, loader)
+    comparisons = []
+    for key in sorted(set(baseline) & set(candidate), key=lambda k: tuple(map(str, k))):
+        base, cand = baseline[key], candidate[key]
+        result = {"key": key, "status": "ok", "p_value": None, "delta": None}
+        if base["t_ns"] is not None and cand["t_ns"] is not None:
+            result["n_base"], result["n_cand"] = len(base["t_ns"]), len(cand["t_ns"])
+            result["t_base"] = float(np.median(base["t_ns"])) / 1e9
+            result["t_cand"] = float(np.median(cand["t_ns"])) / 1e9
+            _, result["p_value"], result["delta"] = mann_whitney_greater(base["t_ns"], cand["t_ns"])
+        else:
+            # Sin muestras en bruto solo se pueden comparar las medias del CSV, sin test
+            result["n_base"], result["n_cand"] = len(base["t_grover"]), len(cand["t_grover"])
+            result["t_base"] = float(np.nanmedian(base["t_grover"]))
+            result["t_cand"] = float(np.nanmedian(cand["t_grover"]))
+            result["status"] = "no samples"
+        result["ratio"] = result["t_cand"] / result["t_base"] if result["t_base"] else math.nan
+        ram_base, ram_cand = np.nanmax(base["ram_mb"]), np.nanmax(cand["ram_mb"])
+        result["mem_change"] = ram_cand / ram_base - 1 if ram_base > 0 else math.nan
+
+        regressions = []
+        if (result["p_value"] is not None and result["p_value"] < alpha
+                and result["ratio"] > 1 + min_slowdown):
+            regressions.append("slower")
+        if result["mem_change"] > mem_threshold:
+            regressions.append("memory")
+        if regressions:
+            result["status"] = "REGRESSION: " + ", ".join(regressions)
+        comparisons.append(result)
+    return comparisons
+
+
+def print_report(console: Console, comparisons: list[dict]) -> None:
+    table = Table(title="Baseline vs candidate")
+    for column in ("Configuration", "Samples", "Median base (s)", "Median cand (s)", "Ratio",
+                   "Cliff's δ", "p-value", "Memory", "Status"):
+        table.add_column(column, justify="left" if column in ("Configuration", "Status") else "right")
+    for result in comparisons:
+        style = "bold red" if result["status"].startswith("REGRESSION") else None
+        table.add_row(
+            format_key(result["key"]),
+            f"{result['n_base']} / {result['n_cand']}",
+            f"{result['t_base']:.6g}", f"{result['t_cand']:.6g}",
+            f"{result['ratio']:.3f}x",
+            "-" if result["delta"] is None else f"{result['delta']:+.3f}",
+            "-" if result["p_value"] is None else f"{result['p_value']:.2e}",
+            "-" if math.isnan(result["mem_change"]) else f"{result['mem_change']:+.1%}",
+            result["status"], style=style)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect performance regressions between two result sets")
+    parser.add_argument("baseline", nargs="+", help="Baseline results directories or CSV files")
+    parser.add_argument("--candidate", nargs="+", required=True, help="Candidate results directories or CSV files")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level of the Mann-Whitney U test (default: 0.01)")
+    parser.add_argument("--min-slowdown", type=float, default=0.05,
+                        help="Smallest median slowdown reported as a regression, e.g. 0.05 = 5%% (default: 0.05)")
+    parser.add_argument("--mem-threshold", type=float, default=0.10,
+                        help="Relative growth of ram_mb reported as a regression (default: 0.10)")
+    parser.add_argument("--backend", type=str, default=None, help="Only compare this backend")
+    args = parser.parse_args()
+
+    baseline_rows = load_rows(args.baseline)
+    candidate_rows = load_rows(args.candidate)
+    if args.backend:
+        baseline_rows = [row for row in baseline_rows if row["backend"] == args.backend]
+        candidate_rows = [row for row in candidate_rows if row["backend"] == args.backend]
+    comparisons = compare(baseline_rows, candidate_rows, args.alpha, args.min_slowdown, args.mem_threshold)
+    if not comparisons:
+        print("Error: No common configurations between baseline and candidate")
+        sys.exit(2)
+
+    console = Console()
+    print_report(console, comparisons)
+    regressions = [result for result in comparisons if result["status"].startswith("REGRESSION")]
+    if regressions:
+        console.print(f"{len(regressions)} of {len(comparisons)} configurations regressed", style="bold red")
+        sys.exit(1)
+    console.print(f"No regressions in {len(comparisons)} configurations", style="bold green")
+
+
+if __name__ == "__main__":
+    main()
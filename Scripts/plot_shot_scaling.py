@@ -0,0 +1,78 @@
+import argparse
+import csv
+import os
+import sys
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+
+def find_curve_files(paths: list[str]) -> list[str]:
+    """Busca recursivamente los CSV shot_scaling_*.csv bajo las rutas dadas (ficheros o directorios)."""
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            files.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                         if name.startswith("shot_scaling_") and name.endswith(".csv"))
+    return files
+
+
+def load_curves(paths: list[str]) -> dict:
+    """Curvas por (n, núcleos, simulador): tiempo de simulación y lista de (shots, tiempo de muestreo)."""
+    curves = {}
+    for file_name in find_curve_files(paths):
+        with open(file_name, newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                key = (int(row['n']), int(row['cores']), row['framework'])
+                curve = curves.setdefault(key, {'t_exec_s': float(row['t_exec_s']), 'points': []})
+                curve['points'].append((int(row['shots']), float(row['t_sampling_s'])))
+    for curve in curves.values():
+        curve['points'].sort()
+    return curves
+
+
+def plot_curves(curves: dict, n: int, cores: int, file_name: str) -> None:
+    """Tiempo de muestreo frente a shots de cada simulador, con su tiempo de simulación como referencia."""
+    plt.figure(figsize=(10, 6))
+    for (curve_n, curve_cores, framework), curve in sorted(curves.items()):
+        if (curve_n, curve_cores) != (n, cores):
+            continue
+        shots = [point[0] for point in curve['points']]
+        line, = plt.plot(shots, [point[1] for point in curve['points']], marker="o", label=f"{framework} sampling")
+        # La simulación no depende de los shots: línea horizontal del mismo color
+        plt.axhline(curve['t_exec_s'], linestyle="--", linewidth=1, color=line.get_color(),
+                    label=f"{framework} simulation")
+    plt.xscale("log")
+    plt.yscale("log")
+    plt.xlabel("Shots")
+    plt.ylabel("Time (s)")
+    plt.title(f"Sampling vs simulation cost (n={n}, {cores} cores)")
+    plt.legend()
+    plt.grid(True, which="both", linestyle=":", linewidth=0.5)
+    plt.savefig(file_name, bbox_inches="tight")
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot shot sampling time against shot count (shot_scaling.py output)")
+    parser.add_argument("paths", nargs="+", help="shot_scaling_*.csv files or directories searched recursively")
+    parser.add_argument("--out", type=str, default="shot_scaling", help="Output directory for the plots")
+    args = parser.parse_args()
+
+    curves = load_curves(args.paths)
+    if not curves:
+        print("No shot_scaling_*.csv files found.")
+        sys.exit(1)
+    os.makedirs(args.out, exist_ok=True)
+    for n, cores in sorted({(n, cores) for n, cores, _ in curves}):
+        file_name = os.path.join(args.out, f"shot_scaling_n{n}_{cores}cores.png")
+        plot_curves(curves, n, cores, file_name)
+        print(f"Saved {file_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import html
+import os
+import sys
+from datetime import datetime
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from results_loader import load_table, series_labels
+from scaling_fit import fit_results, predict, save_fits
+
+# Métricas representadas: columna del CSV, etiqueta del eje y sufijo del fichero
+METRICS = {
+    "time": ("t_grover", "Grover time (s)", "t_grover"),
+    "memory": ("ram_mb", "RAM usage (MB)", "ram_mb"),
+}
+
+
+def aggregate(table: dict, column: str, labels: np.ndarray) -> dict:
+    """
+    Mediana de una métrica por (núcleos, serie, n), agrupando con NumPy.
+
+    Parámetros:
+    table: dict - Columnas cargadas con load_table.
+    column: str - Columna a agregar.
+    labels: array - Etiqueta de serie de cada fila.
+    """
+    values = table[column]
+    if column == "t_grover":
+        # Se prefiere la mediana robusta cuando el CSV la incluye
+        values = np.where(np.isnan(table["t_median"]), values, table["t_median"])
+    valid = ~np.isnan(values) & ~np.isnan(table["n"]) & (values > 0)
+    cores = np.nan_to_num(table["cores"][valid], nan=0).astype(np.int64)
+    n = table["n"][valid].astype(np.int64)
+    keys = np.rec.fromarrays([cores, labels[valid].astype(str), n], names="cores,series,n")
+    unique, inverse = np.unique(keys, return_inverse=True)
+    # Ordenar por grupo una sola vez y calcular la mediana de cada tramo
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.flatnonzero(np.diff(inverse[order])) + 1
+    groups = np.split(values[valid][order], bounds)
+    return {(int(key.cores), str(key.series), int(key.n)): float(np.median(group))
+            for key, group in zip(unique, groups)}
+
+
+def plot_metric(data: dict, cores: int, ylabel: str, file_name: str, fits: dict = None) -> None:
+    """Curvas superpuestas de todas las series para un número de núcleos, en escala logarítmica."""
+    plt.figure(figsize=(10, 6))
+    for series in sorted({series for c, series, _ in data if c == cores}):
+        points = sorted((n, value) for (c, s, n), value in data.items() if c == cores and s == series)
+        line, = plt.plot([n for n, _ in points], [value for _, value in points], marker="o", label=series)
+        fit = (fits or {}).get(series)
+        if fit:
+            # Modelo ajustado (discontinuo) con su intervalo de predicción
+            n_fit = np.linspace(points[0][0], points[-1][0] + 2, 100)
+            value, low, high = predict(fit, n_fit)
+            plt.plot(n_fit, value, linestyle="--", color=line.get_color(), linewidth=1)
+            plt.fill_between(n_fit, np.clip(low, value / 10, None), high, color=line.get_color(), alpha=0.15)
+    plt.yscale("log")
+    plt.xlabel("Number of Qubits")
+    plt.ylabel(ylabel)
+    plt.title(f"{ylabel} vs Number of Qubits ({cores} cores)")
+    plt.grid(True, which="both", alpha=0.3)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(file_name)
+    plt.close()
+
+
+def speedups(data: dict, cores: int, reference: str) -> tuple:
+    """Speedup de cada serie frente a la de referencia (tiempo de referencia / tiempo de la serie)."""
+    series = sorted({s for c, s, _ in data if c == cores and s != reference})
+    rows = []
+    for n in sorted({n for c, s, n in data if c == cores}):
+        ref = data.get((cores, reference, n))
+        rows.append((n, [ref / data[(cores, s, n)] if ref and (cores, s, n) in data else None for s in series]))
+    return series, rows
+
+
+def _html_table(header: list, rows: list) -> str:
+    cells = "".join(f"<th>{html.escape(str(column))}</th>" for column in header)
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(value)}</td>" for value in row) + "</tr>" for row in rows)
+    return f"<table><tr>{cells}</tr>{body}</table>"
+
+
+def build_report(paths: list[str], out_dir: str, reference: str = None, fit: bool = False) -> str:
+    """
+    Genera las figuras y el resumen HTML de todas las carpetas de resultados dadas.
+
+    Parámetros:
+    paths: list - Carpetas (o árboles de carpetas) de resultados de cualquier simulador.
+    out_dir: str - Carpeta de salida del informe.
+    reference: str - Serie usada como referencia para los speedups (p. ej. 'qulacs').
+    fit: bool - Superponer los modelos de escalado ajustados (se guardan en la carpeta del informe).
+    """
+    table = load_table(paths)
+    if len(table["n"]) == 0:
+        raise ValueError("No results found")
+    os.makedirs(out_dir, exist_ok=True)
+    labels = series_labels(table)
+    aggregated = {name: aggregate(table, column, labels) for name, (column, _, _) in METRICS.items()}
+    core_counts = sorted({cores for data in aggregated.values() for cores, _, _ in data})
+    fits = {}
+    if fit:
+        fit_list = fit_results(paths)
+        save_fits(fit_list, out_dir)
+        for entry in fit_list:
+            for name in METRICS:
+                if name in entry:
+                    fits.setdefault((name, entry["cores"]), {})[entry["series"]] = entry[name]
+
+    sections = []
+    for cores in core_counts:
+        parts = [f"<h2>{cores} cores</h2>"]
+        for name, (column, ylabel, suffix) in METRICS.items():
+            data = aggregated[name]
+            if not any(c == cores for c, _, _ in data):
+                continue
+            image = f"{suffix}_{cores}_cores.png"
+            plot_metric(data, cores, ylabel, os.path.join(out_dir, image), fits.get((name, cores)))
+            parts.append(f'<img src="{image}" alt="{html.escape(ylabel)}">')
+            series = sorted({s for c, s, _ in data if c == cores})
+            rows = [[str(n)] + [f"{data[(cores, s, n)]:.6g}" if (cores, s, n) in data else "-" for s in series]
+                    for n in sorted({n for c, _, n in data if c == cores})]
+            parts.append(f"<h3>{html.escape(ylabel)}</h3>" + _html_table(["n"] + series, rows))
+        if reference:
+            series, rows = speedups(aggregated["time"], cores, reference)
+            if series:
+                rows = [[str(n)] + ["-" if value is None else f"{value:.2f}x" for value in values]
+                        for n, values in rows]
+                parts.append(f"<h3>Speedup vs {html.escape(reference)}</h3>" + _html_table(["n"] + series, rows))
+        sections.append("\n".join(parts))
+
+    sources = sorted(set(table["results_dir"]))
+    source_items = "".join(f"<li>{html.escape(source)}</li>" for source in sources)
+    body = "".join(sections)
+    report = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Grover benchmark report</title>
+<style>body{{font-family:sans-serif;margin:2em}} table{{border-collapse:collapse;margin-bottom:1em}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}} img{{max-width:100%}}</style></head>
+<body><h1>Grover benchmark report</h1>
+<p>Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} from {len(table['n'])} rows in {len(sources)} results directories.</p>
+{body}
+<h2>Sources</h2><ul>{source_items}</ul>
+</body></html>
+"""
+    report_file = os.path.join(out_dir, "index.html")
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write(report)
+    return report_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a cross-framework comparison report from results directories")
+    parser.add_argument("results", nargs="+", help="Results directories (searched recursively) or CSV files")
+    parser.add_argument("--out", type=str, default="report", help="Output directory (default: report)")
+    parser.add_argument("--reference", type=str, default=None,
+                        help="Series used as reference for speedups, e.g. 'qulacs'")
+    parser.add_argument("--fit", action="store_true", default=False,
+                        help="Overlay the fitted scaling laws (see scaling_fit.py) on the figures")
+    args = parser.parse_args()
+
+    try:
+        report_file = build_report(args.results, args.out, args.reference, args.fit)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Report saved as {report_file}")
+
+
+if __name__ == "__main__":
+    main()
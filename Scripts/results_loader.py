@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+import numpy as np
+from sample_store import SampleSet, SAMPLES_DIR, SCHEMA_FILE
+
+# Campos que identifican una configuración al cruzar resultados de distintas ejecuciones
+CONFIG_FIELDS = ("backend", "n", "cores", "precision", "shots", "options")
+
+# Columnas numéricas de los CSV de resultados (las que faltan en ficheros antiguos quedan a NaN)
+NUMERIC_COLUMNS = ("n", "iterations_number", "t_grover", "std_grover", "cpu_avg", "ram_avg", "ram_mb",
+                   "ram_peak", "cores", "shots", "samples_row", "t_median", "t_p5", "t_p95", "t_p99",
+                   "t_mad", "t_ci_low", "t_ci_high", "n_outliers", "inner_repeats", "timer_overhead_ns",
+                   "bytes_per_iteration", "bytes_total", "achieved_gbs", "stream_gbs", "ancillas", "gate_count",
+                   "depth", "transpile_s", "fusion", "jit_warmup_s", "gate_count_raw", "optimize_s",
+                   "optimizer_speedup", "ir_fusion", "t_exec_s", "t_sampling_s", "state_reuse",
+                   "state_alloc_s", "first_touch_s", "time_to_first_sample_s")
+
+
+def find_result_files(paths: list[str]) -> list[str]:
+    """Busca recursivamente los CSV Grover_data_*.csv bajo las rutas dadas (ficheros o directorios)."""
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            files.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                         if name.startswith("Grover_data_") and name.endswith(".csv"))
+    return files
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def load_rows(paths: list[str]) -> list[dict]:
+    """
+    Carga las filas de todos los CSV de resultados encontrados.
+
+    Parámetros:
+    paths: list - Carpetas de resultados, árboles de carpetas o ficheros CSV.
+    """
+    rows = []
+    for file_name in find_result_files(paths):
+        # Los CSV antiguos no tienen columna backend: se deduce del nombre del fichero
+        backend = os.path.basename(file_name)[len("Grover_data_"):].split("_")[0]
+        with open(file_name, newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                row = {key: value for key, value in row.items() if key is not None}
+                for column in NUMERIC_COLUMNS:
+                    row[column] = _number(row.get(column))
+                row["backend"] = row.get("backend") or backend
+                row["precision"] = row.get("precision") or "double"
+                row["options"] = row.get("options") or ""
+                row["results_dir"] = os.path.dirname(os.path.abspath(file_name))
+                rows.append(row)
+    return rows
+
+
+def load_table(paths: list[str]) -> dict:
+    """Carga los resultados como columnas NumPy (una entrada por columna, todas con la misma longitud)."""
+    rows = load_rows(paths)
+    table = {column: np.array([row[column] for row in rows], dtype=np.float64) for column in NUMERIC_COLUMNS}
+    for column in ("backend", "precision", "options", "results_dir", "spec_hash", "oracle", "mcx_mode", "engine",
+                   "tuned_options", "optimizer", "sampler"):
+        table[column] = np.array([row.get(column) or "" for row in rows], dtype=object)
+    return table
+
+
+def series_labels(table: dict) -> np.ndarray:
+    """Etiqueta de la serie de cada fila: backend, más la precisión y las opciones si no son las de defecto."""
+    labels = table["backend"].astype(object)
+    single = table["precision"] == "single"
+    labels[single] = labels[single] + " single"
+    with_options = table["options"] != ""
+    labels[with_options] = labels[with_options] + " " + table["options"][with_options]
+    return labels
+
+
+def config_key(row: dict) -> tuple:
+    """Clave de configuración de una fila (los campos numéricos ausentes se normalizan a None)."""
+    key = []
+    for field in CONFIG_FIELDS:
+        value = row.get(field)
+        if isinstance(value, float):
+            value = None if np.isnan(value) else int(value)
+        elif field == "options" and value:
+            value = json.dumps(json.loads(value), sort_keys=True)
+        key.append(value or None)
+    return tuple(key)
+
+
+def format_key(key: tuple) -> str:
+    return " ".join(f"{field}={value}" for field, value in zip(CONFIG_FIELDS, key) if value is not None)
+
+
+class SampleLoader:
+    """Acceso a las muestras en bruto de las filas, abriendo cada almacén una sola vez."""
+
+    def __init__(self):
+        self._sets = {}
+
+    def samples(self, row: dict):
+        """Devuelve las columnas de muestras de una fila, o None si no se guardaron."""
+        if np.isnan(row.get("samples_row", np.nan)):
+            return None
+        path = os.path.join(row["results_dir"], SAMPLES_DIR)
+        if path not in self._sets:
+            self._sets[path] = (SampleSet(path) if os.path.isfile(os.path.join(path, SCHEMA_FILE))
+                                else None)
+        sample_set = self._sets[path]
+        row_id = int(row["samples_row"])
+        if sample_set is None or row_id >= len(sample_set):
+            return None
+        return sample_set.samples(row_id)
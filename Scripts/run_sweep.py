@@ -0,0 +1,62 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Carpeta y script principal de cada simulador
+FRAMEWORKS = {
+    "qiskit": ("Qiskit", "grover_qiskit_main.py"),
+    "qibo": ("Qibo", "grover_qibo_main.py"),
+    "qulacs": ("Qulacs", "grover_qulacs_main.py"),
+    "qsimov": ("Qsimov", "grover_qsimov_main.py"),
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_python_overrides(values: list[str]) -> dict:
+    """Convierte entradas 'backend=/ruta/python' en un diccionario."""
+    overrides = {}
+    for value in values:
+        backend, _, python = value.partition("=")
+        if backend not in FRAMEWORKS or not python:
+            raise ValueError(f"Invalid --python entry: '{value}'")
+        overrides[backend] = python
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sweep file on every framework it lists")
+    parser.add_argument("config", type=str, help="Sweep file (TOML/YAML)")
+    parser.add_argument("--backends", type=str, default=",".join(FRAMEWORKS),
+                        help="Comma-separated frameworks to launch (each one skips runs not listed in the sweep)")
+    parser.add_argument("--python", action="append", default=[],
+                        help="Interpreter for a framework, e.g. 'qibo=/opt/envs/qibo/bin/python' (repeatable)")
+    args = parser.parse_args()
+
+    try:
+        interpreters = parse_python_overrides(args.python)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    config = os.path.abspath(args.config)
+    failed = []
+    for backend in args.backends.split(","):
+        if backend not in FRAMEWORKS:
+            print(f"Error: Unknown backend '{backend}'")
+            sys.exit(1)
+        folder, script = FRAMEWORKS[backend]
+        # Cada simulador se ejecuta en su propio proceso (y entorno) desde su carpeta
+        command = [interpreters.get(backend, sys.executable), script, "--config", config]
+        print(f"[{backend}] {' '.join(command)}")
+        if subprocess.call(command, cwd=os.path.join(REPO_ROOT, folder)) != 0:
+            failed.append(backend)
+
+    if failed:
+        print(f"Failed backends: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
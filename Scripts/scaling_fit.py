@@ -0,0 +1,194 @@
+import argparse
+import json
+import math
+import os
+import sys
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from results_loader import load_table, series_labels
+
+FITS_FILE = "scaling_fits.json"
+
+# Modelos ajustados: columna medida y exponente k del término 2^(k·n)
+MODELS = {
+    "time": ("t_grover", 1.5),
+    "memory": ("ram_mb", 1.0),
+}
+
+# Bytes por amplitud del vector de estado según la precisión
+AMPLITUDE_BYTES = {"double": 16, "single": 8}
+
+
+def _quantile(confidence: float, dof: int) -> float:
+    """Cuantil bilateral de la t de Student (normal si SciPy no está disponible)."""
+    try:
+        from scipy.stats import t
+        return float(t.ppf(0.5 + confidence / 2, dof))
+    except ImportError:
+        from statistics import NormalDist
+        return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def fit_model(n, y, exponent: float) -> dict:
+    """
+    Ajuste por mínimos cuadrados ponderados de y ≈ a·2^(exponent·n) + b.
+
+    Se supone error relativo constante (peso 1/y²), ya que las medidas abarcan
+    varios órdenes de magnitud.
+
+    Parámetros:
+    n: array - Número de qubits de cada medida.
+    y: array - Valor medido.
+    exponent: float - Exponente k del término 2^(k·n).
+    """
+    n = np.asarray(n, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    X = np.column_stack([np.exp2(exponent * n), np.ones_like(n)])
+    sqrt_w = 1 / y
+    A = X * sqrt_w[:, None]
+    # Escalar las columnas mejora el condicionamiento (2^(1.5n) crece muy deprisa)
+    scale = np.linalg.norm(A, axis=0)
+    solution = np.linalg.lstsq(A / scale, y * sqrt_w, rcond=None)[0]
+    params = solution / scale
+    dof = len(y) - 2
+    residuals = (y - X @ params) * sqrt_w
+    sigma2 = float(residuals @ residuals / dof) if dof > 0 else math.nan
+    inverse = np.linalg.pinv((A / scale).T @ (A / scale)) / np.outer(scale, scale)
+    return {
+        "exponent": exponent,
+        "a": float(params[0]),
+        "b": float(params[1]),
+        "cov": (sigma2 * inverse).tolist(),
+        "rel_sigma": math.sqrt(sigma2) if dof > 0 else math.nan,
+        "dof": dof,
+        "points": len(y),
+        "n_range": [int(n.min()), int(n.max())],
+    }
+
+
+def predict(fit: dict, n, confidence: float = 0.95) -> tuple:
+    """Predicción e intervalo de predicción del modelo para los n dados."""
+    n = np.asarray(n, dtype=np.float64)
+    X = np.column_stack([np.exp2(fit["exponent"] * n), np.ones_like(n)])
+    value = X @ np.array([fit["a"], fit["b"]])
+    if fit["dof"] <= 0:
+        return value, value, value
+    cov = np.array(fit["cov"])
+    # Varianza del modelo más la de una nueva medida (error relativo rel_sigma)
+    variance = np.einsum("ij,jk,ik->i", X, cov, X) + (fit["rel_sigma"] * value) ** 2
+    half = _quantile(confidence, fit["dof"]) * np.sqrt(variance)
+    return value, value - half, value + half
+
+
+def gate_count(n: int) -> int:
+    """Puertas de un circuito de Grover: n Hadamard iniciales y, por iteración, oráculo y difusor (4n + 2)."""
+    iterations = math.floor(math.pi / (4 * math.asin(math.sqrt(1 / 2**n))))
+    return n + iterations * (4 * n + 2)
+
+
+def effective_bandwidth(n: int, seconds: float, precision: str = "double") -> float:
+    """Ancho de banda efectivo (GB/s) suponiendo que cada puerta lee y escribe el vector de estado completo."""
+    state_bytes = AMPLITUDE_BYTES.get(precision, 16) * 2**n
+    return gate_count(n) * 2 * state_bytes / seconds / 1e9
+
+
+def fit_results(paths: list[str], min_points: int = 3) -> list[dict]:
+    """
+    Ajusta los modelos de tiempo y memoria por backend (serie) y número de núcleos.
+
+    Parámetros:
+    paths: list - Carpetas (o árboles) de resultados.
+    min_points: int - Valores distintos de n necesarios para ajustar una serie.
+    """
+    table = load_table(paths)
+    labels = series_labels(table).astype(str)
+    cores = np.nan_to_num(table["cores"], nan=0).astype(np.int64)
+    fits = []
+    for series, core_count in sorted(set(zip(labels, cores))):
+        rows = (labels == series) & (cores == core_count)
+        entry = {"series": series, "cores": int(core_count),
+                 "precision": str(table["precision"][rows][0]) or "double"}
+        for name, (column, exponent) in MODELS.items():
+            y = table[column][rows]
+            if column == "t_grover":
+                y = np.where(np.isnan(table["t_median"][rows]), y, table["t_median"][rows])
+            n = table["n"][rows]
+            valid = ~np.isnan(y) & ~np.isnan(n) & (y > 0)
+            if len(np.unique(n[valid])) >= min_points:
+                entry[name] = fit_model(n[valid], y[valid], exponent)
+        if "time" in entry:
+            n_max = entry["time"]["n_range"][1]
+            t_max, _, _ = predict(entry["time"], [n_max])
+            entry["bandwidth_gbs"] = effective_bandwidth(n_max, float(t_max[0]), entry["precision"])
+        if "time" in entry or "memory" in entry:
+            fits.append(entry)
+    return fits
+
+
+def save_fits(fits: list[dict], out_dir: str) -> str:
+    file_name = os.path.join(out_dir, FITS_FILE)
+    with open(file_name, "w") as f:
+        json.dump(fits, f, indent=2)
+    return file_name
+
+
+def load_fits(file_name: str) -> list[dict]:
+    with open(file_name) as f:
+        return json.load(f)
+
+
+def print_predictions(console: Console, fits: list[dict], n_values: list[int], confidence: float) -> None:
+    """Muestra los parámetros ajustados y la extrapolación a los n pedidos."""
+    table = Table(title=f"Scaling fits and predictions ({confidence:.0%} prediction intervals)")
+    for column in ("Series", "Cores", "a (s)", "b (s)", "BW (GB/s)", "n", "Time (s)", "Memory (MB)"):
+        table.add_column(column, justify="left" if column == "Series" else "right")
+    for fit in fits:
+        time_fit, memory_fit = fit.get("time"), fit.get("memory")
+        for i, n in enumerate(n_values):
+            cells = [fit["series"], str(fit["cores"])] if i == 0 else ["", ""]
+            cells += ([f"{time_fit['a']:.3e}" if time_fit else "-", f"{time_fit['b']:.3e}" if time_fit else "-",
+                       f"{fit['bandwidth_gbs']:.2f}" if "bandwidth_gbs" in fit else "-"] if i == 0 else ["", "", ""])
+            cells.append(str(n))
+            for model in (time_fit, memory_fit):
+                if model is None:
+                    cells.append("-")
+                    continue
+                value, low, high = (float(v[0]) for v in predict(model, [n], confidence))
+                cells.append(f"{value:.4g} [{low:.3g}, {high:.3g}]")
+            table.add_row(*cells)
+    console.print(table)
+
+
+def parse_n_values(value: str) -> list[int]:
+    """Convierte '28,30' o '28-32' en una lista de enteros."""
+    if "-" in value:
+        start, end = map(int, value.split("-"))
+        return list(range(start, end + 1))
+    return [int(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit scaling laws t(n) = a*2^(1.5n) + b and mem(n) = c*2^n + d")
+    parser.add_argument("results", nargs="+", help="Results directories (searched recursively) or CSV files")
+    parser.add_argument("--predict", type=str, default=None, help="Qubit counts to extrapolate to, e.g. '28,30' or '28-32'")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Prediction interval level (default: 0.95)")
+    parser.add_argument("--out", type=str, default=None,
+                        help=f"Directory for {FITS_FILE} (default: the first results directory)")
+    args = parser.parse_args()
+
+    fits = fit_results(args.results)
+    if not fits:
+        print("Error: Not enough distinct qubit counts to fit any series")
+        sys.exit(1)
+    out_dir = args.out or (args.results[0] if os.path.isdir(args.results[0]) else os.path.dirname(args.results[0]))
+    os.makedirs(out_dir, exist_ok=True)
+    console = Console()
+    console.print(f"Fits saved as {save_fits(fits, out_dir)}", style="bold green")
+    n_values = parse_n_values(args.predict) if args.predict else sorted({fit["time"]["n_range"][1] + 2
+                                                                          for fit in fits if "time" in fit})
+    print_predictions(console, fits, n_values, args.confidence)
+
+
+if __name__ == "__main__":
+    main()